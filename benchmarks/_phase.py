@@ -0,0 +1,69 @@
+"""
+Runs one benchmark phase in a fresh interpreter, so its peak RSS is
+its own. Started by run_benchmarks.py with HOME pointing at a scratch
+directory whose preferences aim every client at the fake servers.
+
+    python _phase.py <download|enhance|commit> <config.json>
+
+Writes {"seconds": ..., "max_rss_kb": ...} to config["result_path"].
+"""
+
+import json
+import resource
+import sys
+import time
+
+from refactor_ai.configuration_manager import secrets_manager
+
+
+def _fake_key(provider_id):
+    # The stand-ins accept any credential; the keychain is not touched.
+    return "benchmark-key"
+
+
+def main(phase: str, config_path: str) -> None:
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    secrets_manager.get_key = _fake_key
+
+    from refactor_ai.enhancer.code_enhancer import code_enhancer
+    from refactor_ai.github_manager import repo_files_loader
+
+    started = time.perf_counter()
+
+    if phase == "download":
+        res = repo_files_loader.download_repo_content(
+            url=config["repo_url"],
+            output_folder=config["download_dir"],
+        )
+        if res["status"] != "success":
+            raise SystemExit(res["message"])
+    else:
+        code_enhancer.process_repo(
+            provider=config["provider"],
+            repo_url=config["repo_url"],
+            mode="enhance",
+            auto_commit=(phase == "commit"),
+            workers=config["workers"],
+            use_cache=False,
+            stream=config["stream"],
+            batch=config["batch"],
+            commit_batch=config["commit_batch"],
+            open_pr=config["pr"],
+            resume=config["run_id"],
+        )
+
+    seconds = time.perf_counter() - started
+
+    with open(config["result_path"], "w", encoding="utf-8") as f:
+        json.dump({
+            "seconds": seconds,
+            # Kilobytes on Linux, bytes on macOS.
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            // (1024 if sys.platform == "darwin" else 1),
+        }, f)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2])
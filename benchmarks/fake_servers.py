@@ -0,0 +1,854 @@
+"""
+Local stand-ins for the GitHub REST API and the OpenAI, Anthropic and
+Gemini endpoints, served from one threaded HTTP server.
+
+Routes:
+    /github/...                       GitHub REST (repos, branches, contents,
+                                      git trees and blobs, tarball redirects)
+    /codeload/{owner}/{repo}/tar.gz/{ref}   Archive downloads
+    /openai/v1/chat/completions       OpenAI chat completions (+ SSE stream)
+    /anthropic/v1/messages            Anthropic messages (+ SSE stream)
+    /v1beta/models/{m}:generateContent, :streamGenerateContent   Gemini
+
+GitHub GETs carry an ETag and answer a matching If-None-Match with 304
+(tallied as "github 304"). Every response waits `latency` (+ up to
+`jitter`) seconds. A share of
+the requests fail: GitHub with 502 (PyGithub retries those), the model
+endpoints with 429 and a Retry-After, as the real services do.
+
+The fake model answers with the file it was sent, prefixed by a review
+comment, so every file comes back "changed" and passes validation.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import tarfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+from synthetic_repo import git_blob_sha
+
+REVIEW_LINE = "# Reviewed by RefactorAI.\n"
+
+STREAM_PIECE_CHARS = 400
+
+# Categories with GitHub's latency and error rate; the rest are models.
+GITHUB_CATEGORIES = ("github", "codeload")
+
+_SECTION_RE = re.compile(
+    r'\[FILE_START path="(?P<path>[^"]+)"\]\n?(?P<body>.*?)\n?\[FILE_END\]',
+    re.DOTALL,
+)
+
+
+# =====================================================
+# FAKE MODEL
+# =====================================================
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _answer_one(code: str) -> str:
+    return (
+        f"[CODE_START]\n{REVIEW_LINE}{code}\n[CODE_END]\n"
+        "[COMMIT_MESSAGE]\ndocs: add review note"
+    )
+
+
+def fake_answer(prompt: str) -> str:
+    """
+    Answers a single-file, chunk or batch prompt. The source is whatever
+    follows the prompt's first ':\\n\\n' (see code_enhancer's prompts).
+    """
+    sections = list(_SECTION_RE.finditer(prompt))
+    if sections:
+        return "\n\n".join(
+            f'[FILE_START path="{m.group("path")}"]\n{_answer_one(m.group("body"))}\n[FILE_END]'
+            for m in sections
+        )
+
+    _, sep, code = prompt.partition(":\n\n")
+    return _answer_one(code if sep else prompt)
+
+
+def _pieces(text: str) -> List[str]:
+    return [text[i:i + STREAM_PIECE_CHARS] for i in range(0, len(text), STREAM_PIECE_CHARS)] or [""]
+
+
+# =====================================================
+# FAKE GITHUB REPOSITORY
+# =====================================================
+
+class FakeRepo:
+    """
+    One in-memory repository. Any ref reads the default branch head;
+    every file update creates a new head commit. Branches, trees and
+    commits made through the git data API are kept apart (`refs`,
+    `trees`, `git_commits`) and never change the default branch.
+    `modes` gives files a git mode other than 100644 (e.g. 100755).
+    """
+
+    def __init__(
+        self,
+        owner: str,
+        name: str,
+        files: Dict[str, bytes],
+        branch: str = "main",
+        modes: Optional[Dict[str, str]] = None,
+    ):
+        self.owner = owner
+        self.name = name
+        self.branch = branch
+        self.modes: Dict[str, str] = dict(modes or {})
+        self.files: Dict[str, bytes] = {}
+        self.shas: Dict[str, str] = {}
+        self.blobs: Dict[str, bytes] = {}
+        self.children: Dict[str, Dict[str, str]] = {"": {}}
+        self.commits = 0
+        self.head = self._commit_sha()
+        self.lock = threading.Lock()
+
+        # git data API: branch -> commit, tree -> {path: blob sha} (and
+        # {path: mode}) of the files it changes, commit -> {"tree",
+        # "parents", "message"}, and the opened pull requests.
+        self.refs: Dict[str, str] = {}
+        self.trees: Dict[str, Dict[str, str]] = {}
+        self.tree_modes: Dict[str, Dict[str, str]] = {}
+        self.git_commits: Dict[str, Dict[str, Any]] = {}
+        self.pulls: List[Dict[str, Any]] = []
+
+        for path, data in files.items():
+            self._store(path, data)
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.owner}/{self.name}"
+
+    def _commit_sha(self) -> str:
+        return hashlib.sha1(f"commit {self.full_name} {self.commits}".encode()).hexdigest()
+
+    def _store(self, path: str, data: bytes) -> None:
+        self.files[path] = data
+        self.shas[path] = git_blob_sha(data)
+        self.blobs[self.shas[path]] = data
+
+        parts = path.split("/")
+        for depth in range(len(parts)):
+            parent = "/".join(parts[:depth])
+            child = "/".join(parts[:depth + 1])
+            kind = "file" if depth == len(parts) - 1 else "dir"
+            self.children.setdefault(parent, {})[child] = kind
+            if kind == "dir":
+                self.children.setdefault(child, {})
+
+    def tree_sha(self, folder: str) -> str:
+        """A stable stand-in SHA for a folder ("" is the root)."""
+        return hashlib.sha1(f"tree {self.full_name} {folder}".encode()).hexdigest()
+
+    def folder_of(self, sha: str) -> Optional[str]:
+        """The folder a tree SHA, commit SHA or branch name refers to."""
+        if sha in (self.head, self.branch):
+            return ""
+        return next((d for d in self.children if self.tree_sha(d) == sha), None)
+
+    def update(self, path: str, data: bytes, expected_sha: Optional[str]) -> Optional[str]:
+        """Writes a file and returns the new head, or None on a SHA conflict."""
+        with self.lock:
+            if path in self.files and expected_sha != self.shas[path]:
+                return None
+            self._store(path, data)
+            self.commits += 1
+            self.head = self._commit_sha()
+            return self.head
+
+    def ref_sha(self, branch: str) -> Optional[str]:
+        """The commit a branch points to, or None if there is no such branch."""
+        return self.head if branch == self.branch else self.refs.get(branch)
+
+    def commit_tree(self, sha: str) -> Optional[str]:
+        """The tree of a git data commit, or the root tree for the branch head."""
+        if sha in self.git_commits:
+            return self.git_commits[sha]["tree"]
+        return self.tree_sha("") if sha == self.head else None
+
+    def create_tree(self, base_tree: Optional[str], entries: List[Dict[str, Any]]) -> str:
+        """Stores the entries' contents as blobs and returns the new tree SHA."""
+        with self.lock:
+            paths = dict(self.trees.get(base_tree or "", {}))
+            modes = dict(self.tree_modes.get(base_tree or "", {}))
+            for entry in entries:
+                data = entry.get("content", "").encode("utf-8")
+                sha = git_blob_sha(data)
+                self.blobs[sha] = data
+                paths[entry["path"]] = sha
+                modes[entry["path"]] = entry.get("mode", "100644")
+            raw = "\n".join(
+                [base_tree or ""] + [f"{modes[p]} {p} {b}" for p, b in sorted(paths.items())]
+            )
+            tree = hashlib.sha1(f"tree {raw}".encode()).hexdigest()
+            self.trees[tree] = paths
+            self.tree_modes[tree] = modes
+            return tree
+
+    def tree_files(self, tree: str) -> Dict[str, Tuple[str, str]]:
+        """{path: (mode, blob sha)} of every file in a git data tree."""
+        files = {p: (self.modes.get(p, "100644"), sha) for p, sha in self.shas.items()}
+        files.update((p, (self.tree_modes[tree][p], sha)) for p, sha in self.trees[tree].items())
+        return files
+
+    def create_commit(self, message: str, tree: str, parents: List[str]) -> str:
+        with self.lock:
+            sha = hashlib.sha1(f"commit {tree} {parents} {message}".encode()).hexdigest()
+            self.git_commits[sha] = {"tree": tree, "parents": parents, "message": message}
+            return sha
+
+    def tarball(self) -> bytes:
+        """The branch head as GitHub serves it: a .tar.gz with every file
+        under one "<owner>-<repo>-<sha>/" folder."""
+        buf = io.BytesIO()
+        root = f"{self.owner}-{self.name}-{self.head[:7]}"
+        with self.lock, tarfile.open(fileobj=buf, mode="w:gz", compresslevel=1) as archive:
+            for path, data in sorted(self.files.items()):
+                info = tarfile.TarInfo(f"{root}/{path}")
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        return buf.getvalue()
+
+
+# =====================================================
+# SERVER
+# =====================================================
+
+class FakeServices(ThreadingHTTPServer):
+    """
+    The shared server. `counts` tallies requests per category
+    ("github", "codeload", "openai", "anthropic", "google") including
+    failed ones;
+    `errors` tallies the injected failures.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(
+        self,
+        repos: Iterable[FakeRepo],
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        github_latency: Optional[float] = None,
+        github_error_rate: float = 0.0,
+        llm_error_rate: float = 0.0,
+        retry_after_ms: int = 200,
+        seed: int = 7,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        super().__init__((host, port), _Handler)
+        self.repos = {r.full_name: r for r in repos}
+        self.latency = latency
+        self.jitter = jitter
+        self.github_latency = latency if github_latency is None else github_latency
+        self.github_error_rate = github_error_rate
+        self.llm_error_rate = llm_error_rate
+        self.retry_after_ms = retry_after_ms
+        self.counts: Counter = Counter()
+        self.errors: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def preferences(self) -> Dict[str, Dict[str, Any]]:
+        """The preferences.json entries that point the CLI at this server."""
+        return {
+            "github": {"base_url": f"{self.base}/github"},
+            "openai": {"base_url": f"{self.base}/openai/v1"},
+            "anthropic": {"base_url": f"{self.base}/anthropic"},
+            "google": {"base_url": self.base},
+        }
+
+    def start(self) -> "FakeServices":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def snapshot(self) -> Tuple[Counter, Counter]:
+        with self._lock:
+            return Counter(self.counts), Counter(self.errors)
+
+    # -------------------------------------------------
+
+    def reclassify(self, old: str, new: str) -> None:
+        """Moves one already counted request to another category."""
+        with self._lock:
+            self.counts[old] -= 1
+            self.counts[new] += 1
+
+    def admit(self, category: str) -> bool:
+        """Counts a request, waits the configured latency, and decides
+        whether this one fails."""
+        github = category in GITHUB_CATEGORIES
+        rate = self.github_error_rate if github else self.llm_error_rate
+        base = self.github_latency if github else self.latency
+        with self._lock:
+            self.counts[category] += 1
+            delay = base + self._rng.uniform(0, self.jitter) if (base or self.jitter) else 0.0
+            fail = rate > 0 and self._rng.random() < rate
+            if fail:
+                self.errors[category] += 1
+        if delay:
+            time.sleep(delay)
+        return not fail
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, delayed
+    # ACKs would add tens of milliseconds to every keep-alive response.
+    disable_nagle_algorithm = True
+    server: FakeServices
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    # ----- plumbing -----
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json_body(self) -> Dict[str, Any]:
+        raw = self._body()
+        return json.loads(raw) if raw else {}
+
+    def _send(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+
+        if status == 200 and self.command == "GET" and self.path.startswith("/github/"):
+            etag = f'"{hashlib.sha1(data).hexdigest()}"'
+            headers = dict(headers or {}, ETag=etag)
+            if self.headers.get("If-None-Match") == etag:
+                self.server.reclassify("github", "github 304")
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, events: Iterable[str]) -> None:
+        """Server-sent events, one HTTP chunk per event."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in events:
+            data = event.encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _route(self, method: str) -> None:
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        try:
+            if path.startswith("/github/"):
+                self._github(method, path[len("/github"):], query)
+            elif path.startswith("/codeload/"):
+                self._codeload(path[len("/codeload"):])
+            elif path.startswith("/openai/"):
+                self._openai(path)
+            elif path.startswith("/anthropic/"):
+                self._anthropic(path)
+            elif path.startswith("/v1beta/models/"):
+                self._google(path, query)
+            else:
+                self._send(404, {"message": "Not Found"})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self) -> None:
+        self._route("GET")
+
+    def do_POST(self) -> None:
+        self._route("POST")
+
+    def do_PUT(self) -> None:
+        self._route("PUT")
+
+    def do_PATCH(self) -> None:
+        self._route("PATCH")
+
+    # =================================================
+    # GITHUB
+    # =================================================
+
+    def _api(self, repo: FakeRepo) -> str:
+        return f"{self.server.base}/github/repos/{repo.full_name}"
+
+    def _repo_json(self, repo: FakeRepo) -> Dict[str, Any]:
+        return {
+            "id": abs(hash(repo.full_name)) % 10 ** 8,
+            "name": repo.name,
+            "full_name": repo.full_name,
+            "owner": {"login": repo.owner, "type": "User"},
+            "private": False,
+            "default_branch": repo.branch,
+            "url": self._api(repo),
+            "html_url": f"{self.server.base}/{repo.full_name}",
+        }
+
+    def _content_json(self, repo: FakeRepo, path: str, kind: str, ref: str, full: bool = False) -> Dict[str, Any]:
+        api_url = f"{self._api(repo)}/contents/{quote(path)}?ref={quote(ref)}"
+        entry = {
+            "type": kind,
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "sha": repo.shas[path] if kind == "file" else repo.tree_sha(path),
+            "size": len(repo.files[path]) if kind == "file" else 0,
+            "url": api_url,
+            "html_url": f"{self.server.base}/{repo.full_name}/blob/{ref}/{quote(path)}",
+            "git_url": None,
+            "download_url": None,
+        }
+        if full and kind == "file":
+            entry["encoding"] = "base64"
+            entry["content"] = base64.b64encode(repo.files[path]).decode("ascii")
+        return entry
+
+    def _github(self, method: str, path: str, query: Dict[str, str]) -> None:
+        body = self._json_body() if method != "GET" else {}
+        if not self.server.admit("github"):
+            self._send(502, {"message": "Server Error"})
+            return
+
+        m = re.match(r"^/repos/([^/]+/[^/]+)(?:/(.*))?$", path)
+        repo = self.server.repos.get(m.group(1)) if m else None
+        if repo is None:
+            self._send(404, {"message": "Not Found"})
+            return
+        rest = m.group(2) or ""
+
+        if rest == "" and method == "GET":
+            self._send(200, self._repo_json(repo))
+            return
+
+        if rest.startswith("branches/") and method == "GET":
+            name = rest[len("branches/"):]
+            sha = repo.ref_sha(name)
+            if sha is None:
+                self._send(404, {"message": "Branch not found"})
+                return
+            self._send(200, {
+                "name": name,
+                "commit": {"sha": sha, "url": f"{self._api(repo)}/commits/{sha}"},
+                "protected": False,
+            })
+            return
+
+        if rest.startswith(("git/ref/", "git/refs", "git/commits")) or rest in ("git/trees", "pulls"):
+            self._git_data(repo, method, rest, body)
+            return
+
+        if rest.startswith("git/trees/") and method == "GET":
+            self._get_tree(repo, rest[len("git/trees/"):], query.get("recursive"))
+            return
+
+        if rest.startswith("git/blobs/") and method == "GET":
+            self._get_blob(repo, rest[len("git/blobs/"):])
+            return
+
+        if rest.startswith("tarball") and method == "GET":
+            self._send(302, {}, {
+                "Location": f"{self.server.base}/codeload/{repo.full_name}/tar.gz/{repo.head}",
+            })
+            return
+
+        if rest == "contents" or rest.startswith("contents/"):
+            file_path = rest[len("contents/"):].strip("/")
+            if method == "GET":
+                self._get_contents(repo, file_path, query.get("ref", repo.branch))
+            elif method == "PUT":
+                self._put_contents(repo, file_path, body)
+            else:
+                self._send(405, {"message": "Method Not Allowed"})
+            return
+
+        self._send(404, {"message": "Not Found"})
+
+    def _get_contents(self, repo: FakeRepo, path: str, ref: str) -> None:
+        if path in repo.files:
+            self._send(200, self._content_json(repo, path, "file", ref, full=True))
+        elif path in repo.children:
+            self._send(200, [
+                self._content_json(repo, child, kind, ref)
+                for child, kind in sorted(repo.children[path].items())
+            ])
+        else:
+            self._send(404, {"message": "Not Found"})
+
+    def _get_tree(self, repo: FakeRepo, sha: str, recursive: Optional[str]) -> None:
+        if sha in repo.trees:
+            # Trees made through the git data API are always listed
+            # recursively, files only.
+            entries = [
+                {"path": path, "mode": mode, "type": "blob", "sha": blob,
+                 "size": len(repo.blobs[blob]), "url": f"{self._api(repo)}/git/blobs/{blob}"}
+                for path, (mode, blob) in sorted(repo.tree_files(sha).items())
+            ]
+            self._send(200, {"sha": sha, "url": f"{self._api(repo)}/git/trees/{sha}", "tree": entries, "truncated": False})
+            return
+
+        folder = repo.folder_of(sha)
+        if folder is None:
+            self._send(404, {"message": "Not Found"})
+            return
+
+        entries = []
+        pending = [folder]
+        while pending:
+            current = pending.pop()
+            for child, kind in sorted(repo.children.get(current, {}).items()):
+                rel = child[len(folder) + 1:] if folder else child
+                if kind == "dir":
+                    entries.append({"path": rel, "mode": "040000", "type": "tree", "sha": repo.tree_sha(child)})
+                    if recursive:
+                        pending.append(child)
+                else:
+                    entries.append({
+                        "path": rel, "mode": repo.modes.get(child, "100644"), "type": "blob", "sha": repo.shas[child],
+                        "size": len(repo.files[child]), "url": f"{self._api(repo)}/git/blobs/{repo.shas[child]}",
+                    })
+
+        self._send(200, {
+            "sha": repo.tree_sha(folder),
+            "url": f"{self._api(repo)}/git/trees/{repo.tree_sha(folder)}",
+            "tree": sorted(entries, key=lambda e: e["path"]),
+            "truncated": False,
+        })
+
+    def _get_blob(self, repo: FakeRepo, sha: str) -> None:
+        data = repo.blobs.get(sha)
+        if data is None:
+            self._send(404, {"message": "Not Found"})
+            return
+
+        if "raw" in (self.headers.get("Accept") or ""):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        self._send(200, {
+            "sha": sha, "size": len(data), "encoding": "base64",
+            "content": base64.b64encode(data).decode("ascii"),
+            "url": f"{self._api(repo)}/git/blobs/{sha}",
+        })
+
+    # ----- git data API (branches, trees, commits, pull requests) -----
+
+    def _ref_json(self, repo: FakeRepo, branch: str, sha: str) -> Dict[str, Any]:
+        return {
+            "ref": f"refs/heads/{branch}",
+            "node_id": f"REF_{branch}",
+            "url": f"{self._api(repo)}/git/refs/heads/{quote(branch)}",
+            "object": {"sha": sha, "type": "commit", "url": f"{self._api(repo)}/git/commits/{sha}"},
+        }
+
+    def _commit_json(self, repo: FakeRepo, sha: str) -> Dict[str, Any]:
+        info = repo.git_commits.get(sha, {"parents": [], "message": "initial"})
+        tree = repo.commit_tree(sha)
+        person = {"name": "bench", "email": "bench@localhost", "date": "2024-01-01T00:00:00Z"}
+        return {
+            "sha": sha,
+            "url": f"{self._api(repo)}/git/commits/{sha}",
+            "message": info["message"],
+            "author": person,
+            "committer": person,
+            "tree": {"sha": tree, "url": f"{self._api(repo)}/git/trees/{tree}"},
+            "parents": [{"sha": p, "url": f"{self._api(repo)}/git/commits/{p}"} for p in info["parents"]],
+        }
+
+    def _git_data(self, repo: FakeRepo, method: str, rest: str, body: Dict[str, Any]) -> None:
+        m = re.match(r"^git/refs?/heads/(.+)$", rest)
+        if m and method in ("GET", "PATCH"):
+            branch = m.group(1)
+            if repo.ref_sha(branch) is None:
+                self._send(404, {"message": "Not Found"})
+            elif method == "PATCH":
+                if branch == repo.branch:
+                    self._send(422, {"message": "The benchmark only writes to new branches"})
+                    return
+                repo.refs[branch] = body["sha"]
+                self._send(200, self._ref_json(repo, branch, body["sha"]))
+            else:
+                self._send(200, self._ref_json(repo, branch, repo.ref_sha(branch)))
+            return
+
+        if rest == "git/refs" and method == "POST":
+            branch = body.get("ref", "")[len("refs/heads/"):]
+            if repo.ref_sha(branch) is not None:
+                self._send(422, {"message": "Reference already exists"})
+                return
+            repo.refs[branch] = body["sha"]
+            self._send(201, self._ref_json(repo, branch, body["sha"]))
+            return
+
+        if rest.startswith("git/commits/") and method == "GET":
+            sha = rest[len("git/commits/"):]
+            if repo.commit_tree(sha) is None:
+                self._send(404, {"message": "Not Found"})
+            else:
+                self._send(200, self._commit_json(repo, sha))
+            return
+
+        if rest == "git/trees" and method == "POST":
+            tree = repo.create_tree(body.get("base_tree"), body.get("tree", []))
+            self._send(201, {
+                "sha": tree,
+                "url": f"{self._api(repo)}/git/trees/{tree}",
+                "tree": [
+                    {"path": path, "mode": repo.tree_modes[tree][path], "type": "blob", "sha": blob}
+                    for path, blob in sorted(repo.trees[tree].items())
+                ],
+                "truncated": False,
+            })
+            return
+
+        if rest == "git/commits" and method == "POST":
+            sha = repo.create_commit(body.get("message", ""), body["tree"], body.get("parents", []))
+            self._send(201, self._commit_json(repo, sha))
+            return
+
+        if rest == "pulls" and method == "POST":
+            if repo.ref_sha(body.get("head", "")) is None:
+                self._send(422, {"message": "Validation Failed: head does not exist"})
+                return
+            number = len(repo.pulls) + 1
+            repo.pulls.append(dict(body, number=number))
+            self._send(201, {
+                "number": number,
+                "state": "open",
+                "title": body.get("title", ""),
+                "body": body.get("body", ""),
+                "url": f"{self._api(repo)}/pulls/{number}",
+                "html_url": f"{self.server.base}/{repo.full_name}/pull/{number}",
+                "head": {"ref": body.get("head"), "sha": repo.ref_sha(body["head"])},
+                "base": {"ref": body.get("base"), "sha": repo.ref_sha(body.get("base", ""))},
+            })
+            return
+
+        self._send(405, {"message": "Method Not Allowed"})
+
+    def _codeload(self, path: str) -> None:
+        if not self.server.admit("codeload"):
+            self._send(502, {"message": "Server Error"})
+            return
+
+        m = re.match(r"^/([^/]+/[^/]+)/tar\.gz/", path)
+        repo = self.server.repos.get(m.group(1)) if m else None
+        if repo is None:
+            self._send(404, {"message": "Not Found"})
+            return
+
+        data = repo.tarball()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _put_contents(self, repo: FakeRepo, path: str, body: Dict[str, Any]) -> None:
+        data = base64.b64decode(body.get("content", ""))
+        head = repo.update(path, data, body.get("sha"))
+        if head is None:
+            self._send(409, {"message": f"{path} does not match {body.get('sha')}"})
+            return
+        self._send(200, {
+            "content": self._content_json(repo, path, "file", repo.branch),
+            "commit": {
+                "sha": head,
+                "message": body.get("message", ""),
+                "url": f"{self._api(repo)}/git/commits/{head}",
+            },
+        })
+
+    # =================================================
+    # OPENAI
+    # =================================================
+
+    def _throttle(self, payload: Dict[str, Any]) -> None:
+        ms = self.server.retry_after_ms
+        self._send(429, payload, {
+            "retry-after-ms": str(ms),
+            "retry-after": str(max(1, ms // 1000)),
+        })
+
+    def _openai(self, path: str) -> None:
+        req = self._json_body()
+        if not path.endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "Not Found"}})
+            return
+        if not self.server.admit("openai"):
+            self._throttle({"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}})
+            return
+
+        prompt = req["messages"][-1]["content"]
+        system = req["messages"][0]["content"] if len(req["messages"]) > 1 else ""
+        answer = fake_answer(prompt)
+        usage = {
+            "prompt_tokens": _tokens(system) + _tokens(prompt),
+            "completion_tokens": _tokens(answer),
+            "total_tokens": _tokens(system) + _tokens(prompt) + _tokens(answer),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": req.get("model", "")}
+
+        if not req.get("stream"):
+            self._send(200, dict(base, object="chat.completion", usage=usage, choices=[{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer},
+                "finish_reason": "stop",
+            }]))
+            return
+
+        def _events():
+            for piece in _pieces(answer):
+                yield "data: " + json.dumps(dict(base, object="chat.completion.chunk", choices=[{
+                    "index": 0, "delta": {"content": piece}, "finish_reason": None,
+                }])) + "\n\n"
+            yield "data: " + json.dumps(dict(base, object="chat.completion.chunk", choices=[{
+                "index": 0, "delta": {}, "finish_reason": "stop",
+            }])) + "\n\n"
+            yield "data: " + json.dumps(dict(base, object="chat.completion.chunk", choices=[], usage=usage)) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        self._send_stream(_events())
+
+    # =================================================
+    # ANTHROPIC
+    # =================================================
+
+    def _anthropic(self, path: str) -> None:
+        req = self._json_body()
+        if not path.endswith("/v1/messages"):
+            self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": "Not Found"}})
+            return
+        if not self.server.admit("anthropic"):
+            self._throttle({"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limited"}})
+            return
+
+        content = req["messages"][-1]["content"]
+        prompt = content if isinstance(content, str) else "".join(b.get("text", "") for b in content)
+        system = req.get("system") or ""
+        if not isinstance(system, str):
+            system = "".join(b.get("text", "") for b in system)
+        answer = fake_answer(prompt)
+        usage = {
+            "input_tokens": _tokens(system) + _tokens(prompt),
+            "output_tokens": _tokens(answer),
+            "cache_read_input_tokens": 0,
+            "cache_creation_input_tokens": 0,
+        }
+        message = {
+            "id": "msg_fake", "type": "message", "role": "assistant",
+            "model": req.get("model", ""), "stop_reason": "end_turn", "stop_sequence": None,
+        }
+
+        if not req.get("stream"):
+            self._send(200, dict(message, content=[{"type": "text", "text": answer}], usage=usage))
+            return
+
+        def _event(kind: str, payload: Dict[str, Any]) -> str:
+            return f"event: {kind}\ndata: {json.dumps(dict(payload, type=kind))}\n\n"
+
+        def _events():
+            yield _event("message_start", {"message": dict(
+                message, content=[], stop_reason=None, usage=dict(usage, output_tokens=1),
+            )})
+            yield _event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+            for piece in _pieces(answer):
+                yield _event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": piece}})
+            yield _event("content_block_stop", {"index": 0})
+            yield _event("message_delta", {
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": usage["output_tokens"]},
+            })
+            yield _event("message_stop", {})
+
+        self._send_stream(_events())
+
+    # =================================================
+    # GEMINI
+    # =================================================
+
+    def _google(self, path: str, query: Dict[str, str]) -> None:
+        req = self._json_body()
+        if not self.server.admit("google"):
+            self._throttle({"error": {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        prompt = "".join(p.get("text", "") for p in req["contents"][-1]["parts"])
+        system = "".join(p.get("text", "") for p in (req.get("systemInstruction") or {}).get("parts", []))
+        answer = fake_answer(prompt)
+        prompt_tokens = _tokens(system) + _tokens(prompt)
+
+        def _chunk(text: str, output_tokens: int) -> Dict[str, Any]:
+            return {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": output_tokens,
+                    "totalTokenCount": prompt_tokens + output_tokens,
+                },
+            }
+
+        if path.endswith(":generateContent"):
+            self._send(200, _chunk(answer, _tokens(answer)))
+            return
+
+        if not path.endswith(":streamGenerateContent"):
+            self._send(404, {"error": {"code": 404, "message": "Not Found", "status": "NOT_FOUND"}})
+            return
+
+        chunks, written = [], 0
+        for piece in _pieces(answer):
+            written += len(piece)
+            chunks.append(_chunk(piece, _tokens(answer[:written])))
+
+        if query.get("alt") == "sse":
+            self._send_stream("data: " + json.dumps(c) + "\n\n" for c in chunks)
+        else:
+            self._send(200, chunks)
@@ -0,0 +1,138 @@
+"""
+Startup-time regression check based on `python -X importtime`.
+
+Runs CLI commands that should start quickly and fails (exit code 1)
+when one of them imports a heavy module it does not need, or when its
+total import time exceeds the budget:
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 400 --repeat 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# (label, CLI arguments). --help resolves the command without running it.
+COMMANDS = [
+    ("refactor --help", ["--help"]),
+    ("refactor configure --help", ["configure", "--help"]),
+    ("refactor help-tags", ["help-tags"]),
+    ("refactor github download --help", ["github", "download", "--help"]),
+    ("refactor enhancer openai --help", ["enhancer", "openai", "--help"]),
+    ("refactor jobs list --help", ["jobs", "list", "--help"]),
+]
+
+# Modules that only the commands actually using them may load.
+FORBIDDEN = (
+    "openai",
+    "anthropic",
+    "google.generativeai",
+    "github",
+    "questionary",
+    "requests",
+)
+
+DEFAULT_BUDGET_MS = 750
+
+console = Console()
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Returns (total ms, {module: cumulative ms}) from -X importtime output.
+    The total is the sum of the top-level (non-nested) imports.
+    """
+    total_us = 0
+    modules: Dict[str, float] = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        try:
+            cumulative_us = int(cumulative)
+        except ValueError:
+            continue  # the header line
+        modules[name.strip()] = cumulative_us / 1000.0
+        if not name.startswith("  "):
+            total_us += cumulative_us
+
+    return total_us / 1000.0, modules
+
+
+def measure(args: List[str], repeat: int) -> Tuple[float, Dict[str, float]]:
+    """Best-of-`repeat` import time for one command, and its modules."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        p for p in (str(REPO_ROOT), os.environ.get("PYTHONPATH")) if p
+    ))
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "refactor_ai.main", *args],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+            env=env, text=True,
+        )
+        result = parse_importtime(proc.stderr)
+        if best is None or result[0] < best[0]:
+            best = result
+    return best
+
+
+def _forbidden(modules: Dict[str, float]) -> List[str]:
+    return sorted(
+        m for m in FORBIDDEN
+        if any(name == m or name.startswith(m + ".") for name in modules)
+    )
+
+
+def main(argv: List[str]) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Import time budget per command")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per command (the fastest counts)")
+    args = p.parse_args(argv)
+
+    table = Table(title=f"Startup imports (budget {args.budget_ms:.0f} ms)")
+    table.add_column("Command")
+    table.add_column("Imports (ms)", justify="right")
+    table.add_column("Slowest top-level import")
+    table.add_column("Result")
+
+    failed = False
+    for label, cli_args in COMMANDS:
+        total_ms, modules = measure(cli_args, max(1, args.repeat))
+        heavy = _forbidden(modules)
+        slowest = max(
+            (m for m in modules if not m.startswith(("encodings", "site", "_"))),
+            key=lambda m: modules[m] if "." not in m else 0.0,
+            default="-",
+        )
+
+        problems = []
+        if heavy:
+            problems.append("loads " + ", ".join(heavy))
+        if total_ms > args.budget_ms:
+            problems.append("over budget")
+        failed = failed or bool(problems)
+
+        table.add_row(
+            label,
+            f"{total_ms:.0f}",
+            f"{slowest} ({modules.get(slowest, 0.0):.0f} ms)" if slowest != "-" else "-",
+            "[red]" + "; ".join(problems) + "[/red]" if problems else "[green]ok[/green]",
+        )
+
+    console.print(table)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
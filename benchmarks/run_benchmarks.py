@@ -0,0 +1,292 @@
+"""
+Offline end-to-end benchmark of download, enhance and commit.
+
+Starts the fake GitHub / model servers with a synthetic repository,
+then runs each phase of the real pipeline in its own process:
+
+    download   repo_files_loader.download_repo_content
+    enhance    code_enhancer.process_repo (every push declined)
+    commit     the same run resumed with --auto, replaying the pushes
+
+and reports files/sec, API calls per file and peak RSS per phase.
+
+    python benchmarks/run_benchmarks.py --files 1000 --workers 8 --latency 0.05
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from rich.console import Console
+from rich.table import Table
+
+from fake_servers import FakeRepo, FakeServices
+from synthetic_repo import build_repo
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+PHASE_SCRIPT = Path(__file__).resolve().parent / "_phase.py"
+
+PHASES = ("download", "enhance", "commit")
+MIN_FILES, MAX_FILES = 10, 10_000
+
+OWNER, REPO = "bench", "synthetic"
+
+console = Console()
+
+
+# =====================================================
+# SETUP
+# =====================================================
+
+def _file_count(value: str) -> int:
+    count = int(value)
+    if not MIN_FILES <= count <= MAX_FILES:
+        raise argparse.ArgumentTypeError(f"must be between {MIN_FILES} and {MAX_FILES}")
+    return count
+
+
+def _rate(value: str) -> float:
+    rate = float(value)
+    if not 0.0 <= rate < 1.0:
+        raise argparse.ArgumentTypeError("must be in [0, 1)")
+    return rate
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--files", type=_file_count, default=100, help=f"Synthetic repo size ({MIN_FILES}-{MAX_FILES})")
+    p.add_argument("--provider", choices=("openai", "anthropic", "google"), default="openai")
+    p.add_argument("--workers", type=int, default=4, help="--workers passed to process_repo")
+    p.add_argument("--stream", action="store_true", help="Use streaming responses")
+    p.add_argument("--batch", action="store_true", help="Pack small files into shared requests")
+    p.add_argument("--commit-batch", type=int, default=None, help="Files per commit on a new branch (commit phase)")
+    p.add_argument("--pr", action="store_true", help="Commit on a new branch and open one pull request")
+    p.add_argument("--engine", choices=("archive", "tree", "contents"), default="archive", help="Download engine (the 'download_engine' preference)")
+    p.add_argument("--latency", type=float, default=0.0, help="Model endpoint latency (seconds)")
+    p.add_argument("--github-latency", type=float, default=None, help="GitHub latency (defaults to --latency)")
+    p.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    p.add_argument("--github-error-rate", type=_rate, default=0.0, help="Share of GitHub requests failing with 502")
+    p.add_argument("--llm-error-rate", type=_rate, default=0.0, help="Share of model requests failing with 429")
+    p.add_argument("--phases", nargs="+", choices=PHASES, default=list(PHASES))
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    p.add_argument("--keep", action="store_true", help="Keep the scratch directory (logs, journals)")
+    return p.parse_args(argv)
+
+
+def _write_preferences(home: Path, services: FakeServices, workers: int, engine: str) -> None:
+    prefs = services.preferences()
+    prefs["github"]["download_engine"] = engine
+    for provider in ("openai", "anthropic", "google"):
+        # The benchmark sets concurrency explicitly, not the provider default.
+        prefs[provider]["max_concurrency"] = workers
+    config_dir = home / ".refactor-ai"
+    config_dir.mkdir(parents=True, exist_ok=True)
+    with open(config_dir / "preferences.json", "w", encoding="utf-8") as f:
+        json.dump(prefs, f, indent=2)
+
+
+def _write_journal(path: Path, events: List[Dict[str, Any]]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(dict(event, ts=time.time())) + "\n")
+
+
+def _read_journal(path: Path) -> List[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+# =====================================================
+# PHASES
+# =====================================================
+
+def _run_phase(phase: str, config: Dict[str, Any], work: Path, home: Path, answers: str) -> Dict[str, Any]:
+    config = dict(config, result_path=str(work / f"{phase}.result.json"))
+    config_path = work / f"{phase}.config.json"
+    with open(config_path, "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+    env = dict(os.environ, HOME=str(home), PYTHONPATH=os.pathsep.join(
+        p for p in (str(REPO_ROOT), os.environ.get("PYTHONPATH")) if p
+    ))
+    log_path = work / f"{phase}.log"
+
+    with open(log_path, "w", encoding="utf-8") as log:
+        proc = subprocess.run(
+            [sys.executable, str(PHASE_SCRIPT), phase, str(config_path)],
+            input=answers, stdout=log, stderr=subprocess.STDOUT, env=env, text=True,
+        )
+
+    if proc.returncode != 0:
+        raise RuntimeError(f"{phase} phase failed (exit {proc.returncode}); see {log_path}")
+
+    with open(config["result_path"], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    work = Path(tempfile.mkdtemp(prefix="refactor-bench-"))
+    home = work / "home"
+    runs_dir = home / ".refactor-ai" / "runs"
+    download_dir = work / "download"
+    repo_url = f"https://github.com/{OWNER}/{REPO}"
+
+    with console.status(f"[green]Building a {args.files}-file repository..."):
+        files = build_repo(args.files, seed=args.seed)
+
+    services = FakeServices(
+        [FakeRepo(OWNER, REPO, files)],
+        latency=args.latency,
+        jitter=args.jitter,
+        github_latency=args.github_latency,
+        github_error_rate=args.github_error_rate,
+        llm_error_rate=args.llm_error_rate,
+        seed=args.seed,
+    ).start()
+    _write_preferences(home, services, args.workers, args.engine)
+
+    config = {
+        "repo_url": repo_url,
+        "provider": args.provider,
+        "workers": args.workers,
+        "stream": args.stream,
+        "batch": args.batch,
+        "commit_batch": args.commit_batch,
+        "pr": args.pr,
+        "download_dir": str(download_dir),
+    }
+    start_event = {"event": "start", "provider": args.provider, "model": None,
+                   "mode": "enhance", "repo_url": repo_url, "protocol": "full"}
+    downloaded_event = {"event": "downloaded",
+                        "metadata": str(download_dir / "repo_metadata.json"),
+                        "local_path": str(download_dir)}
+
+    results = []
+    try:
+        # Each phase works on the previous one's output, so every phase up
+        # to the last requested one runs; only the requested ones are reported.
+        last = max(PHASES.index(p) for p in args.phases)
+        for phase in PHASES[:last + 1]:
+            if phase != "download" and not download_dir.exists():
+                break
+
+            run_id = f"bench-{phase}"
+            journal_path = runs_dir / run_id / "journal.jsonl"
+            if phase == "enhance":
+                _write_journal(journal_path, [start_event, downloaded_event])
+            elif phase == "commit":
+                # Replays what the enhance phase produced, as --resume would.
+                enhanced = [e for e in _read_journal(runs_dir / "bench-enhance" / "journal.jsonl")
+                            if e["event"] == "enhanced"]
+                if not enhanced:
+                    break
+                _write_journal(journal_path, [start_event, downloaded_event] + enhanced)
+
+            before, errors_before = services.snapshot()
+            with console.status(f"[green]{phase}..."):
+                measured = _run_phase(
+                    phase, dict(config, run_id=run_id), work, home,
+                    answers="n\n" * (args.files * 2),
+                )
+            after, errors_after = services.snapshot()
+
+            failed = 0
+            if phase == "download":
+                with open(download_dir / "repo_metadata.json", "r", encoding="utf-8") as f:
+                    done = len(json.load(f)["downloaded_files"])
+            else:
+                events = _read_journal(journal_path)
+                if phase == "enhance":
+                    statuses = [e["status"] for e in events if e["event"] == "enhanced"]
+                    failed = sum(1 for s in statuses if s in ("failed", "invalid"))
+                    done = len(statuses) - failed
+                else:
+                    done = sum(1 for e in events if e["event"] == "committed")
+                    failed = sum(1 for e in events if e["event"] == "push_failed")
+
+            calls = after - before
+            if phase in args.phases:
+                results.append({
+                    "phase": phase,
+                    "files": done,
+                    "failed": failed,
+                    "seconds": measured["seconds"],
+                    "files_per_sec": done / measured["seconds"] if measured["seconds"] else 0.0,
+                    "api_calls": dict(calls),
+                    "calls_per_file": sum(calls.values()) / done if done else 0.0,
+                    "injected_errors": dict(errors_after - errors_before),
+                    "peak_rss_mb": measured["max_rss_kb"] / 1024,
+                })
+    finally:
+        services.stop()
+        if args.keep:
+            console.print(f"[dim]Scratch directory kept: {work}[/dim]")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    return results
+
+
+# =====================================================
+# REPORT
+# =====================================================
+
+def _report(results: List[Dict[str, Any]], args: argparse.Namespace) -> None:
+    title = (
+        f"{args.files} files · {args.provider} · {args.workers} worker(s) · "
+        f"latency {args.latency}s"
+    )
+    table = Table(title=title)
+    for column in ("Phase", "Files", "Seconds", "Files/sec", "API calls", "Calls/file", "Peak RSS (MB)"):
+        table.add_column(column, justify="left" if column == "Phase" else "right")
+
+    for r in results:
+        calls = ", ".join(f"{n} {k}" for k, n in sorted(r["api_calls"].items())) or "0"
+        table.add_row(
+            r["phase"],
+            f"{r['files']} (+{r['failed']} failed)" if r["failed"] else str(r["files"]),
+            f"{r['seconds']:.2f}",
+            f"{r['files_per_sec']:.1f}",
+            calls,
+            f"{r['calls_per_file']:.2f}",
+            f"{r['peak_rss_mb']:.0f}",
+        )
+
+    console.print(table)
+    for r in results:
+        if r["injected_errors"]:
+            errors = ", ".join(f"{n} {k}" for k, n in sorted(r["injected_errors"].items()))
+            console.print(f"[dim]{r['phase']}: injected errors {errors}[/dim]")
+
+
+def main(argv: List[str]) -> int:
+    args = _parse_args(argv)
+    try:
+        results = run(args)
+    except RuntimeError as e:
+        console.print(f"[red]{e}[/red]")
+        return 1
+
+    _report(results, args)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
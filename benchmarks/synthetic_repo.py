@@ -0,0 +1,43 @@
+"""
+Deterministic synthetic repositories for the benchmark servers.
+"""
+
+import hashlib
+import random
+from typing import Dict
+
+FILES_PER_PACKAGE = 50
+
+
+def git_blob_sha(data: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _module(rng: random.Random, index: int) -> str:
+    """A small, valid Python module of 5 to 80 functions."""
+    lines = [f'"""Synthetic module {index}."""', "", "import math", ""]
+    for j in range(rng.randint(5, 80)):
+        lines += [
+            "",
+            f"def func_{index}_{j}(value, scale={j + 1}):",
+            f"    total = value * scale + {rng.randint(0, 999)}",
+            "    if total > 100:",
+            "        total = math.sqrt(total)",
+            "    return total",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def build_repo(file_count: int, seed: int = 7) -> Dict[str, bytes]:
+    """
+    Returns {path: content} for `file_count` files spread over packages
+    of FILES_PER_PACKAGE modules, plus a README.
+    """
+    rng = random.Random(seed)
+    files: Dict[str, bytes] = {"README.md": b"# Synthetic benchmark repository\n"}
+
+    for i in range(max(0, file_count - 1)):
+        path = f"src/pkg_{i // FILES_PER_PACKAGE}/mod_{i}.py"
+        files[path] = _module(rng, i).encode("utf-8")
+
+    return files
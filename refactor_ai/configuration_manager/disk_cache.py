@@ -0,0 +1,148 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class ResultCache:
+    """
+    Content-addressed, size-bounded LRU cache of JSON entries on disk,
+    shared by the enhancer (AI responses) and the GitHub client
+    (conditional-request responses).
+
+    Each entry is a small JSON file. Reads bump the file's mtime, and
+    the least recently used entries are evicted once the directory
+    grows past `max_bytes`. Safe to share between worker threads.
+
+    `read=False` (refresh) skips lookups but still stores new results;
+    `enabled=False` turns the cache off completely.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        enabled: bool = True,
+        read: bool = True,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.read = read and enabled
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    # -------------------------------------------------
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached entry for `key`, or None on a miss."""
+        if not self.read:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path, None)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Stores an entry and evicts old ones if the cache is too big."""
+        if not self.enabled:
+            return
+
+        path = self._path(key)
+        payload = json.dumps(entry).encode("utf-8")
+
+        try:
+            # An overwritten entry no longer counts towards the size.
+            replaced = path.stat().st_size
+        except OSError:
+            replaced = 0
+
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        except OSError:
+            return
+
+        self._count("writes")
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(payload) - replaced
+
+            if self._size > self.max_bytes:
+                self._evict()
+
+    # -------------------------------------------------
+
+    def _entries(self):
+        if not self.root.exists():
+            return []
+        return [p for p in self.root.glob("*/*.json") if p.is_file()]
+
+    def _scan_size(self) -> int:
+        total = 0
+        for p in self._entries():
+            try:
+                total += p.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until 90% of the bound."""
+        files = []
+        for p in self._entries():
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_bytes * 0.9)
+
+        for _, size, p in files:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            total -= size
+            self.stats["evictions"] += 1
+
+        self._size = total
+
+    def summary(self) -> str:
+        """One-line hit/miss report for the end of a run."""
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        rate = (100.0 * s["hits"] / lookups) if lookups else 0.0
+        return (
+            f"cache: {s['hits']} hits, {s['misses']} misses "
+            f"({rate:.0f}% hit rate), {s['writes']} writes, "
+            f"{s['evictions']} evictions"
+        )
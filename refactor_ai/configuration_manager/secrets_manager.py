@@ -1,6 +1,5 @@
 import keyring
 import json
-import requests
 import os
 import stat
 from pathlib import Path
@@ -135,6 +134,8 @@ def verify_github_access(token: str) -> str:
     try:
         # Prepare headers with the Authorization token for GitHub API.
         headers = {"Authorization": f"token {token}"}
+        # Imported here: only this check needs it, and it is slow to import.
+        import requests
         # Send a HEAD request to the user endpoint to check authentication without fetching data.
         response = requests.head("https://api.github.com/user", headers=headers, timeout=5)
         
@@ -0,0 +1,111 @@
+import http.client
+import json
+import socket
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode, urlparse
+
+from refactor_ai.daemon.server import STATE_FILE
+
+# Connection timeout; long-polls add their own wait on top.
+CONNECT_TIMEOUT = 5.0
+
+
+class DaemonError(Exception):
+    """The daemon is unreachable or rejected a request."""
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def read_state() -> Optional[Dict[str, Any]]:
+    """The running daemon's address and token, if it left a state file."""
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class DaemonClient:
+    """Thin client for the `refactor serve` job API."""
+
+    def __init__(self, state: Dict[str, Any]):
+        self.state = state
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        if self.state.get("socket"):
+            return _UnixHTTPConnection(self.state["socket"], timeout)
+        url = urlparse(self.state["url"])
+        return http.client.HTTPConnection(url.hostname, url.port, timeout=timeout)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        body: Optional[Dict[str, Any]] = None,
+        timeout: float = CONNECT_TIMEOUT,
+    ) -> Dict[str, Any]:
+        conn = self._connection(timeout)
+        headers = {"Authorization": f"Bearer {self.state.get('token', '')}"}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        try:
+            conn.request(method, path, body=data, headers=headers)
+            res = conn.getresponse()
+            payload = json.loads(res.read() or b"{}")
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            raise DaemonError(f"Daemon not reachable: {e}") from e
+        finally:
+            conn.close()
+
+        if res.status >= 400:
+            raise DaemonError(payload.get("error") or f"HTTP {res.status}")
+        return payload
+
+    # -------------------------------------------------
+
+    def health(self) -> Dict[str, Any]:
+        return self.request("GET", "/health")
+
+    def submit(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.request("POST", "/jobs", params)["job"]
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        return self.request("GET", "/jobs")["jobs"]
+
+    def job(self, job_id: str) -> Dict[str, Any]:
+        return self.request("GET", f"/jobs/{job_id}")["job"]
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        return self.request("POST", f"/jobs/{job_id}/cancel")["job"]
+
+    def events(self, job_id: str, after: int = 0, wait: float = 0.0) -> Dict[str, Any]:
+        query = urlencode({"after": after, "wait": wait})
+        return self.request("GET", f"/jobs/{job_id}/events?{query}", timeout=CONNECT_TIMEOUT + wait)
+
+    def shutdown(self) -> Dict[str, Any]:
+        return self.request("POST", "/shutdown")
+
+
+def connect() -> Optional[DaemonClient]:
+    """A client for the running daemon, or None if none answers."""
+    state = read_state()
+    if not state:
+        return None
+    client = DaemonClient(state)
+    try:
+        client.health()
+    except DaemonError:
+        return None
+    return client
@@ -0,0 +1,462 @@
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import stat
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from refactor_ai.configuration_manager.secrets_manager import CONFIG_DIR
+
+# Where a running daemon advertises its address and access token.
+STATE_FILE = CONFIG_DIR / "daemon.json"
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Finished jobs kept for status queries.
+JOB_HISTORY = 100
+
+# Output lines kept per job; older ones are dropped.
+MAX_JOB_EVENTS = 20000
+
+# Longest a client may block waiting for new events.
+MAX_WAIT = 30.0
+
+VALID_PROVIDERS = {"google", "openai", "anthropic"}
+
+# process_repo arguments a job may set.
+JOB_FIELDS = {
+    "provider", "repo_url", "mode", "metadata_file", "workers", "use_cache",
+    "refresh", "stream", "batch", "protocol", "incremental", "resume",
+    "prefilter", "max_tokens", "max_cost", "priority", "use_cascade",
+    "dedupe_near", "profile", "commit_batch", "open_pr",
+}
+
+FINAL_STATES = {"succeeded", "failed", "cancelled"}
+
+
+# =====================================================
+# JOBS
+# =====================================================
+
+class Job:
+    """One submitted enhancement run, its output and its progress."""
+
+    def __init__(self, job_id: str, params: Dict[str, Any]):
+        self.id = job_id
+        self.params = params
+        self.state = "queued"
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.run_id: Optional[str] = None
+        self.done = 0
+        self.total: Optional[int] = None
+        self.outcomes: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self.cancel = threading.Event()
+        self.events: deque = deque(maxlen=MAX_JOB_EVENTS)
+        self.seq = 0
+        self.cond = threading.Condition()
+
+    def emit(self, kind: str, **fields: Any) -> None:
+        with self.cond:
+            self.seq += 1
+            self.events.append(dict(fields, seq=self.seq, type=kind))
+            self.cond.notify_all()
+
+    def on_progress(self, event: Dict[str, Any]) -> None:
+        """process_repo progress callback."""
+        kind = event["event"]
+        if kind == "started":
+            self.run_id = event["run_id"]
+        elif kind == "planned":
+            self.total = event["total"]
+        elif kind == "file":
+            self.done = event["done"]
+        elif kind == "finished":
+            self.outcomes = event["outcomes"]
+            if event["failures"]:
+                self.error = f"{event['failures']} file(s) failed"
+        self.emit("progress", **event)
+
+    def events_after(self, after: int, wait: float) -> List[Dict[str, Any]]:
+        """Events newer than `after`, blocking up to `wait` seconds for one."""
+        with self.cond:
+            if self.seq <= after and self.state not in FINAL_STATES:
+                self.cond.wait(timeout=wait)
+            return [e for e in self.events if e["seq"] > after]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "provider": self.params["provider"],
+            "repo_url": self.params["repo_url"],
+            "mode": self.params.get("mode", "enhance"),
+            "run_id": self.run_id,
+            "done": self.done,
+            "total": self.total,
+            "outcomes": self.outcomes,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class _JobOutput:
+    """File-like sink that turns console output into job "log" events."""
+
+    def __init__(self, job: Job):
+        self.job = job
+        self._partial = ""
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            lines = (self._partial + text).split("\n")
+            self._partial = lines.pop()
+        for line in lines:
+            self.job.emit("log", text=line)
+        return len(text)
+
+    def flush(self) -> None:
+        with self._lock:
+            line, self._partial = self._partial, ""
+        if line:
+            self.job.emit("log", text=line)
+
+    def isatty(self) -> bool:
+        return False
+
+
+def validate_job(params: Dict[str, Any]) -> Optional[str]:
+    """Returns why a submitted job is not acceptable, or None."""
+    unknown = set(params) - JOB_FIELDS
+    if unknown:
+        return f"Unknown job field(s): {', '.join(sorted(unknown))}"
+    if params.get("provider") not in VALID_PROVIDERS:
+        return f"Invalid provider: {params.get('provider')}"
+    if not params.get("repo_url") and not params.get("resume"):
+        return "repo_url is required"
+    return None
+
+
+class JobManager:
+    """
+    Runs submitted jobs one at a time on a single runner thread, in the
+    daemon's warm process. Files are already processed in parallel
+    inside a job; running jobs back to back keeps provider quotas and
+    console output per job.
+    """
+
+    def __init__(self):
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: deque = deque()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stopping = False
+        self._runner = threading.Thread(target=self._run_loop, name="refactor-jobs", daemon=True)
+        self._runner.start()
+
+    def submit(self, params: Dict[str, Any]) -> Job:
+        job = Job(secrets.token_hex(4), dict({"mode": "enhance", "repo_url": ""}, **params))
+        with self._wakeup:
+            self.jobs[job.id] = job
+            self._queue.append(job)
+            self._trim()
+            self._wakeup.notify()
+        job.emit("state", state=job.state)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None or job.state in FINAL_STATES:
+            return job
+        with self._lock:
+            if job in self._queue:
+                self._queue.remove(job)
+                self._finish(job, "cancelled")
+                return job
+        job.cancel.set()
+        job.emit("state", state="cancelling")
+        return job
+
+    def stop(self) -> None:
+        with self._wakeup:
+            self._stopping = True
+            for job in list(self._queue):
+                self._finish(job, "cancelled")
+            self._queue.clear()
+            self._wakeup.notify()
+        for job in self.list():
+            job.cancel.set()
+
+    # -------------------------------------------------
+
+    def _trim(self) -> None:
+        finished = [j for j in self.jobs.values() if j.state in FINAL_STATES]
+        for job in finished[:max(0, len(finished) - JOB_HISTORY)]:
+            del self.jobs[job.id]
+
+    def _finish(self, job: Job, state: str) -> None:
+        job.state = state
+        job.finished = time.time()
+        job.emit("state", state=state, error=job.error)
+
+    def _run_loop(self) -> None:
+        while True:
+            with self._wakeup:
+                while not self._queue and not self._stopping:
+                    self._wakeup.wait()
+                if self._stopping:
+                    return
+                job = self._queue.popleft()
+                job.state = "running"
+                job.started = time.time()
+            job.emit("state", state="running")
+            self._finish(job, self._execute(job))
+
+    def _execute(self, job: Job) -> str:
+        from refactor_ai.enhancer.code_enhancer import code_enhancer, provider_clients
+
+        # Keys and preferences may have changed since the last job.
+        provider_clients.refresh_adapters()
+
+        # Only this thread runs jobs, so the enhancer's console can be
+        # pointed at the current job for its whole duration.
+        console = code_enhancer.console
+        previous_file = console.file
+        output = _JobOutput(job)
+        console.file = output
+        try:
+            code_enhancer.process_repo(
+                auto_commit=True,
+                cancel=job.cancel,
+                progress=job.on_progress,
+                **job.params,
+            )
+        except Exception as e:
+            job.error = str(e)
+            return "failed"
+        finally:
+            output.flush()
+            console.file = previous_file
+
+        if job.cancel.is_set():
+            return "cancelled"
+        if not job.outcomes and job.error is None:
+            # process_repo returned before its file loop (bad URL, download error).
+            job.error = "Run stopped before processing files; see the job log."
+        return "failed" if job.error else "succeeded"
+
+
+# =====================================================
+# HTTP API
+# =====================================================
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    GET  /health                      daemon info
+    GET  /jobs                        all jobs
+    POST /jobs                        submit {provider, repo_url, ...}
+    GET  /jobs/<id>                   job status
+    GET  /jobs/<id>/events?after=N&wait=S
+                                      output and progress after event N
+    POST /jobs/<id>/cancel            cancel a queued or running job
+    POST /shutdown                    stop the daemon
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "RefactorAI"
+
+    def setup(self) -> None:
+        # Small responses go out in two writes; avoid delayed-ACK stalls on TCP.
+        self.disable_nagle_algorithm = self.request.family != socket.AF_UNIX
+        super().setup()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        expected = f"Bearer {self.server.token}"
+        given = self.headers.get("Authorization", "")
+        return hmac.compare_digest(given.encode(), expected.encode())
+
+    def _parse(self) -> Tuple[List[str], Dict[str, str], Dict[str, Any]]:
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else {}
+        return parts, query, body
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def _dispatch(self, method: str) -> None:
+        # The body of an unauthenticated request is never read; the
+        # connection is closed instead, since its unread bytes would be
+        # taken for the next request.
+        if not self._authorized():
+            self.close_connection = True
+            self._send(401, {"error": "Missing or wrong daemon token"})
+            return
+
+        try:
+            parts, query, body = self._parse()
+        except ValueError:
+            self._send(400, {"error": "Invalid JSON body"})
+            return
+
+        manager: JobManager = self.server.manager
+
+        if parts == ["health"] and method == "GET":
+            self._send(200, {"status": "ok", "pid": os.getpid(), "jobs": len(manager.list())})
+
+        elif parts == ["jobs"] and method == "GET":
+            self._send(200, {"jobs": [j.to_dict() for j in manager.list()]})
+
+        elif parts == ["jobs"] and method == "POST":
+            error = validate_job(body)
+            if error:
+                self._send(400, {"error": error})
+                return
+            self._send(201, {"job": manager.submit(body).to_dict()})
+
+        elif parts == ["shutdown"] and method == "POST":
+            self._send(200, {"status": "stopping"})
+            threading.Thread(target=self.server.stop, daemon=True).start()
+
+        elif len(parts) >= 2 and parts[0] == "jobs":
+            job = manager.get(parts[1])
+            if job is None:
+                self._send(404, {"error": f"No job '{parts[1]}'"})
+            elif parts[2:] == [] and method == "GET":
+                self._send(200, {"job": job.to_dict()})
+            elif parts[2:] == ["events"] and method == "GET":
+                try:
+                    after = int(query.get("after", 0))
+                    wait = min(MAX_WAIT, max(0.0, float(query.get("wait", 0))))
+                except ValueError:
+                    self._send(400, {"error": "after and wait must be numbers"})
+                    return
+                events = job.events_after(after, wait)
+                self._send(200, {"events": events, "job": job.to_dict()})
+            elif parts[2:] == ["cancel"] and method == "POST":
+                self._send(200, {"job": manager.cancel(job.id).to_dict()})
+            else:
+                self._send(404, {"error": "Not Found"})
+
+        else:
+            self._send(404, {"error": "Not Found"})
+
+
+class _ServerMixin:
+    daemon_threads = True
+    manager: JobManager
+    token: str
+
+    def stop(self) -> None:
+        self.manager.stop()
+        self.shutdown()
+
+
+class _TCPServer(_ServerMixin, ThreadingHTTPServer):
+    pass
+
+
+class _UnixServer(_ServerMixin, socketserver.ThreadingUnixStreamServer):
+    pass
+
+
+# =====================================================
+# DAEMON
+# =====================================================
+
+def _write_state(state: Dict[str, Any]) -> None:
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.chmod(tmp, stat.S_IREAD | stat.S_IWRITE)
+    os.replace(tmp, STATE_FILE)
+
+
+def _remove_state(token: str) -> None:
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            if json.load(f).get("token") != token:
+                return  # another daemon took over
+        STATE_FILE.unlink()
+    except (OSError, ValueError):
+        pass
+
+
+def create_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[str] = None,
+):
+    """
+    Binds the job API on localhost TCP or a Unix socket and writes the
+    state file (address + token, owner-only) clients connect with.
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixServer(socket_path, _Handler)
+        os.chmod(socket_path, stat.S_IREAD | stat.S_IWRITE)
+        address = {"socket": socket_path}
+    else:
+        server = _TCPServer((host, port), _Handler)
+        address = {"url": f"http://{host}:{server.server_address[1]}"}
+
+    server.manager = JobManager()
+    server.token = secrets.token_urlsafe(24)
+    _write_state(dict(address, token=server.token, pid=os.getpid()))
+    return server
+
+
+def serve_forever(server) -> None:
+    """Serves until shutdown; removes the state file and socket afterwards."""
+    try:
+        server.serve_forever()
+    finally:
+        server.manager.stop()
+        server.server_close()
+        _remove_state(server.token)
+        if isinstance(server, _UnixServer):
+            try:
+                os.unlink(server.server_address)
+            except OSError:
+                pass
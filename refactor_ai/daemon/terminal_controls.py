@@ -0,0 +1,233 @@
+import importlib
+import time
+import typer
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+from refactor_ai.daemon import client as daemon_client
+from refactor_ai.daemon import server as daemon_server
+
+app = typer.Typer(help="Inspect and control jobs on a running 'refactor serve' daemon.")
+console = Console()
+
+LOOPBACK_HOSTS = {"127.0.0.1", "localhost", "::1"}
+
+# Seconds each events request may block on the daemon.
+POLL_WAIT = 20.0
+
+STATE_STYLES = {
+    "queued": "dim",
+    "running": "cyan",
+    "succeeded": "green",
+    "failed": "red",
+    "cancelled": "yellow",
+}
+
+
+# =====================================================
+# HELPERS
+# =====================================================
+
+def _require_daemon() -> daemon_client.DaemonClient:
+    client = daemon_client.connect()
+    if client is None:
+        console.print("[red]No daemon running. Start one with 'refactor serve'.[/red]")
+        raise typer.Exit(1)
+    return client
+
+
+def _progress_text(job: Dict[str, Any]) -> str:
+    if job["total"] is None:
+        return "-"
+    return f"{job['done']}/{job['total']}"
+
+
+def follow_job(client: daemon_client.DaemonClient, job_id: str) -> Dict[str, Any]:
+    """
+    Streams a job's output until it ends and returns its final status.
+    Ctrl+C cancels the job (it stays resumable); a second Ctrl+C stops
+    following and leaves the daemon to finish cancelling.
+    """
+    after = 0
+    interrupted = False
+
+    while True:
+        try:
+            res = client.events(job_id, after=after, wait=POLL_WAIT)
+        except KeyboardInterrupt:
+            if interrupted:
+                console.print(f"[yellow]Detached; job {job_id} is being cancelled.[/yellow]")
+                return client.job(job_id)
+            interrupted = True
+            console.print(f"[yellow]Cancelling job {job_id} (Ctrl+C again to detach)...[/yellow]")
+            client.cancel(job_id)
+            continue
+
+        for event in res["events"]:
+            after = event["seq"]
+            if event["type"] == "log":
+                console.print(event["text"], markup=False, highlight=False, soft_wrap=True)
+
+        job = res["job"]
+        if job["state"] in daemon_server.FINAL_STATES and not res["events"]:
+            return job
+
+
+def run_on_daemon(params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Submits an enhancement job to the running daemon and follows it.
+    Returns the final job status, or None when no daemon is running.
+    """
+    client = daemon_client.connect()
+    if client is None:
+        console.print("[yellow]No daemon running; running in this process.[/yellow]")
+        return None
+
+    try:
+        job = client.submit(params)
+        console.print(f"[dim]Submitted job {job['id']} to the daemon[/dim]")
+        job = follow_job(client, job["id"])
+    except daemon_client.DaemonError as e:
+        console.print(f"[red]{e}[/red]")
+        return {"state": "failed", "error": str(e)}
+
+    style = STATE_STYLES.get(job["state"], "white")
+    console.print(f"[{style}]Job {job['id']} {job['state']}[/{style}]"
+                  + (f" [dim]({job['error']})[/dim]" if job.get("error") else ""))
+    return job
+
+
+# =====================================================
+# SERVE
+# =====================================================
+
+def serve(
+    host: str = typer.Option(daemon_server.DEFAULT_HOST, "--host", help="Loopback address for the HTTP API"),
+    port: int = typer.Option(daemon_server.DEFAULT_PORT, "--port", help="Port for the HTTP API (0 picks a free one)"),
+    socket_path: Optional[str] = typer.Option(None, "--socket", help="Serve on this Unix socket instead of HTTP"),
+):
+    """
+    Run a warm daemon for enhancement jobs.
+
+    Provider clients, connection pools, schedulers and the validation
+    pool stay loaded between jobs. While it runs, 'refactor enhancer
+    <provider> <url> --auto --daemon' submits to it instead of running
+    in-process.
+    """
+
+    if not socket_path and host not in LOOPBACK_HOSTS:
+        raise typer.BadParameter("The daemon only listens on loopback addresses")
+
+    if daemon_client.connect() is not None:
+        console.print(f"[yellow]A daemon is already running ({daemon_server.STATE_FILE}).[/yellow]")
+        raise typer.Exit(1)
+
+    with console.status("[green]Loading providers..."):
+        from refactor_ai.enhancer.code_enhancer import provider_clients
+
+        importlib.import_module("refactor_ai.enhancer.code_enhancer.code_enhancer")
+        provider_clients.preload_sdks()
+
+    try:
+        server = daemon_server.create_server(host, port, socket_path)
+    except OSError as e:
+        console.print(f"[red]Could not start the daemon: {e}[/red]")
+        raise typer.Exit(1)
+
+    where = socket_path or f"http://{host}:{server.server_address[1]}"
+    console.print(f"[bold cyan]RefactorAI daemon[/bold cyan] listening on {where}")
+    console.print("[dim]Submit with 'refactor enhancer <provider> <url> --auto --daemon'; Ctrl+C stops.[/dim]")
+
+    try:
+        daemon_server.serve_forever(server)
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Daemon stopped.[/yellow]")
+
+
+# =====================================================
+# JOB COMMANDS
+# =====================================================
+
+@app.command("list")
+def list_jobs():
+    """List queued, running and recent jobs."""
+    client = _require_daemon()
+
+    table = Table(title="Daemon jobs")
+    for column in ("Job", "State", "Provider", "Repository", "Progress", "Run ID", "Submitted"):
+        table.add_column(column)
+
+    for job in client.jobs():
+        style = STATE_STYLES.get(job["state"], "white")
+        table.add_row(
+            job["id"],
+            f"[{style}]{job['state']}[/{style}]",
+            job["provider"],
+            job["repo_url"] or "-",
+            _progress_text(job),
+            job["run_id"] or "-",
+            datetime.fromtimestamp(job["created"]).strftime("%H:%M:%S"),
+        )
+
+    console.print(table)
+
+
+@app.command("status")
+def job_status(job_id: str = typer.Argument(..., help="Job ID")):
+    """Show one job's state and progress."""
+    client = _require_daemon()
+    try:
+        job = client.job(job_id)
+    except daemon_client.DaemonError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    style = STATE_STYLES.get(job["state"], "white")
+    console.print(f"[bold]Job {job['id']}[/bold] [{style}]{job['state']}[/{style}]")
+    console.print(f"Repository: {job['repo_url']} ({job['provider']}, {job['mode']})")
+    console.print(f"Progress:   {_progress_text(job)}")
+    if job["run_id"]:
+        console.print(f"Run ID:     {job['run_id']}")
+    if job["outcomes"]:
+        console.print("Outcomes:   " + ", ".join(f"{n} {s}" for s, n in sorted(job["outcomes"].items())))
+    if job["error"]:
+        console.print(f"[red]Error:      {job['error']}[/red]")
+    if job["started"]:
+        end = job["finished"] or time.time()
+        console.print(f"[dim]Elapsed:    {end - job['started']:.1f}s[/dim]")
+
+
+@app.command("follow")
+def follow(job_id: str = typer.Argument(..., help="Job ID")):
+    """Stream a job's output until it ends."""
+    client = _require_daemon()
+    try:
+        job = follow_job(client, job_id)
+    except daemon_client.DaemonError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    if job["state"] != "succeeded":
+        raise typer.Exit(1)
+
+
+@app.command("cancel")
+def cancel(job_id: str = typer.Argument(..., help="Job ID")):
+    """Cancel a queued or running job (a running one stays resumable)."""
+    client = _require_daemon()
+    try:
+        job = client.cancel(job_id)
+    except daemon_client.DaemonError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    console.print(f"[yellow]Job {job['id']}: cancellation requested ({job['state']})[/yellow]")
+
+
+@app.command("stop")
+def stop():
+    """Stop the daemon, cancelling queued and running jobs."""
+    client = _require_daemon()
+    client.shutdown()
+    console.print("[green]Daemon stopping.[/green]")
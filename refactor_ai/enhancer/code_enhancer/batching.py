@@ -0,0 +1,92 @@
+import re
+from typing import Dict, List, Sequence
+
+from refactor_ai.enhancer.code_enhancer.chunking import CHARS_PER_TOKEN
+
+# Files at or below this estimate are packed together.
+SMALL_FILE_TOKENS = 1500
+
+# Upper bound for the source packed into one request.
+BATCH_TOKEN_BUDGET = 8000
+
+# Keeps a single bad response from costing too many files.
+MAX_BATCH_FILES = 12
+
+_SECTION_RE = re.compile(
+    r'\[FILE_START path="(?P<path>[^"]+)"\](?P<body>.*?)\[FILE_END\]',
+    re.DOTALL,
+)
+
+
+def is_small(size_bytes: int) -> bool:
+    """True if a file of this size qualifies for packing."""
+    return size_bytes // CHARS_PER_TOKEN <= SMALL_FILE_TOKENS
+
+
+def plan_batches(
+    paths: Sequence[str],
+    sizes: Dict[str, int],
+    budget: int = BATCH_TOKEN_BUDGET,
+    max_files: int = MAX_BATCH_FILES,
+) -> List[List[str]]:
+    """
+    Groups paths into work units. Small files are packed greedily (in
+    the given order) up to `budget` tokens; everything else stays solo.
+    Sizes are byte counts from disk, so no file has to be read.
+    """
+    units: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+
+    for path in paths:
+        size = sizes.get(path, 0)
+        if not is_small(size):
+            units.append([path])
+            continue
+
+        tokens = size // CHARS_PER_TOKEN + 1
+        if current and (used + tokens > budget or len(current) >= max_files):
+            units.append(current)
+            current, used = [], 0
+
+        current.append(path)
+        used += tokens
+
+    if current:
+        units.append(current)
+
+    return units
+
+
+def build_batch_prompt(instruction: str, files: Dict[str, str]) -> str:
+    """Packs several files into one request using tagged sections."""
+    sections = [
+        f'[FILE_START path="{path}"]\n{code}\n[FILE_END]'
+        for path, code in files.items()
+    ]
+    return f"{instruction}\n\n" + "\n\n".join(sections)
+
+
+def parse_batch_response(response_text: str) -> Dict[str, str]:
+    """
+    Splits a packed response into per-file sections.
+    Each section keeps its own [CODE_START]/[COMMIT_MESSAGE] tags, so
+    it can be handed to the regular single-file parser.
+    """
+    return {
+        m.group("path"): m.group("body").strip()
+        for m in _SECTION_RE.finditer(response_text)
+    }
+
+
+def check_batch_response(response_text: str, paths: Sequence[str]) -> Dict[str, str]:
+    """
+    Same as parse_batch_response, but raises ValueError unless every
+    file that was sent came back, so incomplete replies are not cached.
+    """
+    sections = parse_batch_response(response_text)
+    missing = [p for p in paths if p not in sections]
+    if missing:
+        raise ValueError(f"Batch response is missing {len(missing)} of {len(paths)} file(s)")
+    return sections
+
@@ -0,0 +1,188 @@
+import fnmatch
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from refactor_ai.enhancer.code_enhancer.chunking import MAX_CHUNK_TOKENS, estimate_tokens
+
+# USD per million tokens (input, output) for the default models.
+# Other models need the provider's "prices" preference.
+MODEL_PRICES = {
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gpt-4o": (2.50, 10.00),
+    "claude-3-5-sonnet-20240620": (3.00, 15.00),
+}
+
+# Output is assumed to be about as long as the input file.
+OUTPUT_RATIO = 1.0
+
+PRIORITY_KEYS = ("size", "-size", "recent")
+
+
+class BudgetExceeded(Exception):
+    """Raised when a work unit does not fit in what is left of the budget."""
+
+
+# =====================================================
+# ESTIMATES
+# =====================================================
+
+def estimate_request(
+    system_tokens: int,
+    text: str,
+    chunk_tokens: int = MAX_CHUNK_TOKENS,
+) -> Tuple[int, int]:
+    """
+    Pre-flight (input, output) token estimate for one file. Large files
+    pay the system prompt once per chunk of `chunk_tokens`.
+    """
+    file_tokens = estimate_tokens(text)
+    requests = max(1, -(-file_tokens // chunk_tokens))
+    return system_tokens * requests + file_tokens, int(file_tokens * OUTPUT_RATIO)
+
+
+def cost_of(prices: Optional[Tuple[float, float]], input_tokens: int, output_tokens: int) -> float:
+    """
+    Dollar cost at list price. Cached input tokens are billed as regular
+    input, so the figure is an upper bound.
+    """
+    if not prices:
+        return 0.0
+    return (input_tokens * prices[0] + output_tokens * prices[1]) / 1_000_000
+
+
+def resolve_prices(model: str, override: Optional[Dict[str, float]] = None) -> Optional[Tuple[float, float]]:
+    """Prices from the "prices" preference, else the built-in table."""
+    if override and "input" in override and "output" in override:
+        return float(override["input"]), float(override["output"])
+    return MODEL_PRICES.get(model)
+
+
+# =====================================================
+# BUDGET
+# =====================================================
+
+class Budget:
+    """
+    Token / dollar ceiling for one run.
+
+    Spending is read from the run's usage meter (actual provider
+    counts). Units in flight hold a reservation of their estimate, so
+    parallel workers cannot overshoot together; until a unit finishes,
+    its usage is counted twice, which errs on the safe side. Once a unit
+    does not fit, the budget closes and every later unit is deferred.
+    """
+
+    def __init__(
+        self,
+        usage_meter,
+        max_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        prices: Optional[Tuple[float, float]] = None,
+    ):
+        self.meter = usage_meter
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.prices = prices
+        self.reserved_tokens = 0
+        self.reserved_cost = 0.0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.max_tokens or self.max_cost)
+
+    def spent(self) -> Tuple[int, float]:
+        t = self.meter.totals
+        return (
+            t["input_tokens"] + t["output_tokens"],
+            cost_of(self.prices, t["input_tokens"], t["output_tokens"]),
+        )
+
+    def reserve(self, input_tokens: int, output_tokens: int) -> Tuple[int, float]:
+        """Books an estimate or raises BudgetExceeded."""
+        tokens = input_tokens + output_tokens
+        cost = cost_of(self.prices, input_tokens, output_tokens)
+
+        with self._lock:
+            if self.closed:
+                raise BudgetExceeded("budget exhausted")
+
+            spent_tokens, spent_cost = self.spent()
+            over_tokens = (
+                self.max_tokens
+                and spent_tokens + self.reserved_tokens + tokens > self.max_tokens
+            )
+            over_cost = (
+                self.max_cost
+                and spent_cost + self.reserved_cost + cost > self.max_cost
+            )
+            if over_tokens or over_cost:
+                self.closed = True
+                raise BudgetExceeded("budget exhausted")
+
+            self.reserved_tokens += tokens
+            self.reserved_cost += cost
+            return tokens, cost
+
+    def release(self, reservation: Tuple[int, float]) -> None:
+        """Drops a reservation once its actual usage is on the meter."""
+        with self._lock:
+            self.reserved_tokens -= reservation[0]
+            self.reserved_cost -= reservation[1]
+
+    def summary(self) -> str:
+        tokens, cost = self.spent()
+        parts = [f"budget: {tokens} tokens"]
+        if self.max_tokens:
+            parts[0] += f" of {self.max_tokens}"
+        if self.prices:
+            parts.append(f"${cost:.2f}" + (f" of ${self.max_cost:.2f}" if self.max_cost else ""))
+        return ", ".join(parts)
+
+
+# =====================================================
+# PRIORITY ORDER
+# =====================================================
+
+def validate_priority(keys: Sequence[str]) -> Optional[str]:
+    """Returns an error message for an unknown priority key."""
+    for key in keys:
+        if key not in PRIORITY_KEYS and not key.startswith("glob:"):
+            return f"Unknown priority '{key}'. Use size, -size, recent or glob:<pattern>."
+    return None
+
+
+def order_paths(
+    paths: Sequence[str],
+    keys: Sequence[str],
+    sizes: Dict[str, int],
+    recency: Optional[Dict[str, float]] = None,
+) -> List[str]:
+    """
+    Sorts paths by the priority keys, most significant first:
+
+    * size / -size   - smallest / largest files first
+    * recent         - most recently changed first
+    * glob:<pattern> - matching paths first
+
+    Ties keep the download order.
+    """
+    recency = recency or {}
+    key_funcs: List[Callable[[str], Any]] = []
+
+    for key in keys:
+        if key == "size":
+            key_funcs.append(lambda p: sizes.get(p, 0))
+        elif key == "-size":
+            key_funcs.append(lambda p: -sizes.get(p, 0))
+        elif key == "recent":
+            key_funcs.append(lambda p: -recency.get(p, 0.0))
+        elif key.startswith("glob:"):
+            pattern = key[5:]
+            key_funcs.append(lambda p, pattern=pattern: not fnmatch.fnmatchcase(p, pattern))
+
+    if not key_funcs:
+        return list(paths)
+
+    return sorted(paths, key=lambda p: tuple(f(p) for f in key_funcs))
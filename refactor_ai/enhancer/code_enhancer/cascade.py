@@ -0,0 +1,73 @@
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# (cheap, strong) model per provider. Overridable with the
+# "cheap_model" and "default_model" preferences.
+CASCADE_MODELS = {
+    "google": ("gemini-1.5-flash", "gemini-1.5-pro"),
+    "openai": ("gpt-4o-mini", "gpt-4o"),
+    "anthropic": ("claude-3-haiku-20240307", "claude-3-5-sonnet-20240620"),
+}
+
+# Modes where an unchanged file means the model did not do its job.
+# improve_code may legitimately find nothing to improve.
+CHANGE_EXPECTED_MODES = {"add_comments", "enhance"}
+
+
+def resolve_tiers(
+    provider: str,
+    cheap_model: Optional[str] = None,
+    strong_model: Optional[str] = None,
+) -> List[str]:
+    """Returns the models to try, cheapest first (deduplicated)."""
+    cheap_default, strong_default = CASCADE_MODELS[provider]
+    tiers = [cheap_model or cheap_default, strong_model or strong_default]
+    return tiers if tiers[0] != tiers[1] else tiers[:1]
+
+
+def escalation_reason(result: Dict[str, Any], mode: str) -> Optional[str]:
+    """
+    Why a file result should go to the next tier, or None to accept it.
+    Skipped and too-large files never escalate: another model won't help.
+    """
+    status = result["status"]
+    if status == "failed":
+        return "failed"
+    if status == "invalid":
+        return "invalid"
+    if status == "unchanged" and mode in CHANGE_EXPECTED_MODES:
+        return "unchanged"
+    return None
+
+
+class TierStats:
+    """Per-tier attempts, accepted results and escalation reasons."""
+
+    def __init__(self, models: List[str]):
+        self.models = models
+        self.attempts: Counter = Counter()
+        self.accepted: Counter = Counter()
+        self.escalated: Dict[str, Counter] = {m: Counter() for m in models}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, reason: Optional[str], final: bool) -> None:
+        with self._lock:
+            self.attempts[model] += 1
+            if reason is None or final:
+                self.accepted[model] += 1
+            if reason is not None and not final:
+                self.escalated[model][reason] += 1
+
+    def summary(self) -> str:
+        total = sum(self.accepted.values())
+        parts = []
+        for model in self.models:
+            share = self.accepted[model] / total if total else 0.0
+            part = f"{model} {share:.0%} ({self.accepted[model]}/{self.attempts[model]})"
+            reasons = self.escalated[model]
+            if reasons:
+                detail = ", ".join(f"{n} {r}" for r, n in reasons.most_common())
+                part += f" escalated {sum(reasons.values())}: {detail}"
+            parts.append(part)
+        return "cascade: " + "; ".join(parts)
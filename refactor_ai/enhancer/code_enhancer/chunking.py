@@ -0,0 +1,189 @@
+import ast
+import textwrap
+from typing import List
+
+# Rough characters-per-token ratio shared by the supported models.
+# Good enough for budgeting; never used for billing.
+CHARS_PER_TOKEN = 4
+
+# Largest piece of source sent in a single request.
+MAX_CHUNK_TOKENS = 10000
+
+# The reply repeats the source plus added comments, a commit message
+# and the response tags, so a chunk must leave that much output room.
+OUTPUT_GROWTH = 1.5
+REPLY_OVERHEAD_TOKENS = 200
+
+# Files that would need more chunks than this are not worth the spend.
+MAX_CHUNKS = 40
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (about 4 characters per token)."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def chunk_budget(output_tokens: int) -> int:
+    """
+    Largest chunk (in source tokens) whose enhanced version still fits in
+    a reply of `output_tokens`, capped at MAX_CHUNK_TOKENS.
+    """
+    room = int((output_tokens - REPLY_OVERHEAD_TOKENS) / OUTPUT_GROWTH)
+    return max(1, min(MAX_CHUNK_TOKENS, room))
+
+
+# =====================================================
+# BOUNDARY DETECTION
+# =====================================================
+
+def _python_boundaries(lines: List[str]) -> List[int]:
+    """
+    Line indexes where a top-level statement starts (decorators and the
+    comment block directly above a def/class are kept with it).
+    """
+    tree = ast.parse("".join(lines))
+    starts = set()
+
+    for node in tree.body:
+        start = node.lineno - 1
+        for deco in getattr(node, "decorator_list", []):
+            start = min(start, deco.lineno - 1)
+
+        # Pull leading comments along with the definition.
+        while start > 0 and lines[start - 1].lstrip().startswith("#"):
+            start -= 1
+
+        starts.add(start)
+
+    return sorted(starts)
+
+
+def _brace_boundaries(lines: List[str]) -> List[int]:
+    """
+    Line indexes right after a blank line at brace depth zero.
+    Falls back to every blank line when braces never close (e.g. YAML).
+    """
+    depth = 0
+    top_level = []
+    any_blank = []
+
+    for i, line in enumerate(lines):
+        if not line.strip():
+            any_blank.append(i + 1)
+            if depth <= 0:
+                top_level.append(i + 1)
+        depth += line.count("{") - line.count("}")
+
+    return top_level if len(top_level) > 1 else any_blank
+
+
+def _segments(lines: List[str], boundaries: List[int]) -> List[List[str]]:
+    cuts = sorted({b for b in boundaries if 0 < b < len(lines)})
+    segments = []
+    prev = 0
+    for cut in cuts:
+        segments.append(lines[prev:cut])
+        prev = cut
+    segments.append(lines[prev:])
+    return [s for s in segments if s]
+
+
+# =====================================================
+# CHUNKING
+# =====================================================
+
+def _split_oversized(lines: List[str], max_tokens: int) -> List[List[str]]:
+    """Splits one segment at blank lines, then at plain line breaks."""
+    out: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    limit = max_tokens * CHARS_PER_TOKEN
+
+    for line in lines:
+        # Prefer a blank line once the chunk is mostly full; cut hard at the limit.
+        soft_cut = not line.strip() and size > limit * 3 // 4
+        if current and (soft_cut or size + len(line) > limit):
+            out.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+
+    if current:
+        out.append(current)
+    return out
+
+
+def split_source(path: str, text: str, max_tokens: int = MAX_CHUNK_TOKENS) -> List[str]:
+    """
+    Splits a source file into chunks of at most `max_tokens` (estimated).
+
+    Python is cut at top-level function/class boundaries; other files
+    at blank lines outside braces. "".join(chunks) == text always holds,
+    so enhanced chunks can be stitched back in order.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    lines = text.splitlines(keepends=True)
+
+    boundaries: List[int] = []
+    if path.endswith(".py"):
+        try:
+            boundaries = _python_boundaries(lines)
+        except (SyntaxError, ValueError):
+            boundaries = []
+    if not boundaries:
+        boundaries = _brace_boundaries(lines)
+
+    limit = max_tokens * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current = ""
+
+    for segment in _segments(lines, boundaries):
+        seg_text = "".join(segment)
+
+        if len(seg_text) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.extend("".join(part) for part in _split_oversized(segment, max_tokens))
+            continue
+
+        if current and len(current) + len(seg_text) > limit:
+            chunks.append(current)
+            current = ""
+        current += seg_text
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+def _indent(text: str) -> str:
+    """Leading whitespace of the first non-blank line."""
+    for line in text.splitlines():
+        if line.strip():
+            return line[:len(line) - len(line.lstrip())]
+    return ""
+
+
+def stitch(originals: List[str], enhanced: List[str]) -> str:
+    """
+    Joins enhanced chunks back into one file, keeping the original
+    leading and trailing newlines of every chunk so definitions stay
+    separated. A chunk from inside a class or function gets its original
+    indentation back if the reply came back dedented.
+    """
+    parts = []
+    for orig, new in zip(originals, enhanced):
+        leading = orig[:len(orig) - len(orig.lstrip("\n"))]
+        trailing = orig[len(orig.rstrip("\n")):]
+        new = new.strip("\n")
+
+        want, have = _indent(orig), _indent(new)
+        if len(have) < len(want) and want.startswith(have):
+            new = textwrap.indent(new, want[len(have):])
+
+        parts.append(leading + new + trailing)
+    return "".join(parts)
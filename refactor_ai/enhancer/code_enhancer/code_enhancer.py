@@ -1,21 +1,44 @@
 import os
 import json
 import re
-import shutil
+import threading
+import time
+from collections import Counter
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from rich.console import Console
 from rich.prompt import Confirm
 
-# AI SDKs
-import google.generativeai as genai
-from openai import OpenAI
-from anthropic import Anthropic
-
 # Internal Modules
-from refactor_ai.configuration_manager import secrets_manager
-from refactor_ai.github_manager import repo_files_loader, update_ops
+from refactor_ai.configuration_manager import disk_cache, secrets_manager
+from refactor_ai.github_manager import (
+    branch_ops,
+    commit_ops,
+    http_cache,
+    pr_ops,
+    repo_files_loader,
+    update_ops,
+)
+from refactor_ai.enhancer.code_enhancer import journal as run_journal
+from refactor_ai.enhancer.code_enhancer import (
+    batching,
+    budget,
+    cascade,
+    chunking,
+    dedupe,
+    file_filter,
+    git_source,
+    patching,
+    profiling,
+    provider_clients,
+    result_cache,
+    run_state,
+    scheduler,
+    stream_parser,
+    validation,
+    worker_pool,
+)
 
 console = Console()
 
@@ -24,20 +47,38 @@ PROMPTS_FILE = CURRENT_DIR / "system_prompt.json"
 
 VALID_MODES = {"add_comments", "improve_code", "enhance"}
 
-BINARY_EXTENSIONS = (
-    ".png", ".jpg", ".jpeg", ".gif",
-    ".ico", ".pyc", ".exe",
-    ".dll", ".so", ".lock"
-)
+# "full" returns whole files; "edits"/"diff" return patches (see patching.py).
+VALID_PROTOCOLS = {"full", "edits", "diff"}
+
+# Never sent to the model, even with --no-filter.
+SKIP_EXTENSIONS = file_filter.BINARY_EXTENSIONS + (".lock",)
 
-MAX_FILE_SIZE = 40000
+# How often a result that fails validation is re-requested with the error.
+VALIDATION_RETRIES = 1
+
+# Upper bound for the repository tree sent as shared context.
+REPO_CONTEXT_TOKENS = 3000
+
+# Files per commit when --pr is given without --commit-batch.
+DEFAULT_COMMIT_BATCH = 100
+
+# Files listed in a pull request body; the rest are only counted.
+PR_BODY_FILES = 100
 
 
 # =====================================================
 # PROMPT LOADING
 # =====================================================
 
-def _load_system_prompt(mode_key: str) -> str:
+def _load_system_prompt(
+    mode_key: str,
+    protocol: str = "full",
+    repo_context: str = "",
+) -> str:
+    """
+    Builds the system prompt. It is identical for every request of a
+    run, which makes it the cacheable prefix for provider prompt caches.
+    """
     if mode_key not in VALID_MODES:
         mode_key = "enhance"
 
@@ -47,27 +88,103 @@ def _load_system_prompt(mode_key: str) -> str:
     base = data["base_instruction"]
     mode_data = data["modes"][mode_key]
 
-    return (
+    prompt = (
         f"{base}\n\n"
         f"MODE: {mode_key}\n"
         f"ROLE: {mode_data['role']}\n"
         f"INSTRUCTIONS: {mode_data['instruction']}"
     )
 
+    if protocol != "full":
+        prompt += f"\n\n{data['protocols'][protocol]}"
+
+    if repo_context:
+        prompt += f"\n\n{repo_context}"
+
+    return prompt
+
+
+def _repo_context(metadata: Dict[str, Any]) -> str:
+    """
+    The repository layout from the loader's structure_tree, trimmed to
+    REPO_CONTEXT_TOKENS so huge repositories don't crowd out the file.
+    """
+    tree = metadata.get("structure_tree") or ""
+    if not tree:
+        return ""
+
+    limit = REPO_CONTEXT_TOKENS * chunking.CHARS_PER_TOKEN
+    if len(tree) > limit:
+        lines = tree[:limit].splitlines()[:-1]
+        omitted = tree.count("\n") - len(lines)
+        tree = "\n".join(lines) + f"\n... ({omitted} more entries)\n"
+
+    return (
+        "REPOSITORY STRUCTURE (context only; process just the file you are given):\n"
+        f"{tree}"
+    )
+
+
+def _load_batch_instruction() -> str:
+    with open(PROMPTS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)["batch_instruction"]
+
+
+def _prompt_fingerprint() -> str:
+    """Hash of system_prompt.json, so prompt edits invalidate cached results."""
+    with open(PROMPTS_FILE, "r", encoding="utf-8") as f:
+        return result_cache.content_hash(f.read())
+
+
+def _rate_limits(provider: str, model: Optional[str]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Requests/tokens per minute for a provider, from the "rpm"/"tpm"
+    preferences, optionally overridden per model under "model_limits".
+    Unset limits are left to the adaptive concurrency control.
+    """
+    rpm = secrets_manager.get_preference(provider, "rpm")
+    tpm = secrets_manager.get_preference(provider, "tpm")
+
+    per_model = (secrets_manager.get_preference(provider, "model_limits") or {}).get(model or "", {})
+    rpm = per_model.get("rpm", rpm)
+    tpm = per_model.get("tpm", tpm)
+
+    return (float(rpm) if rpm else None, float(tpm) if tpm else None)
+
+
+def _open_cache(use_cache: bool, refresh: bool) -> disk_cache.ResultCache:
+    """Creates the run's result cache, honouring --no-cache / --refresh."""
+    max_mb = secrets_manager.get_preference("cache", "max_mb")
+    max_bytes = (
+        int(max_mb) * 1024 * 1024 if max_mb else result_cache.DEFAULT_MAX_BYTES
+    )
+    return disk_cache.ResultCache(
+        root=result_cache.CACHE_DIR,
+        max_bytes=max_bytes,
+        enabled=use_cache,
+        read=not refresh,
+    )
+
 
 # =====================================================
 # RESPONSE PARSER
 # =====================================================
 
 def _strip_markdown_fence(code: str) -> str:
-    if code.startswith("```"):
-        lines = code.splitlines()
-        if lines[0].startswith("```"):
-            lines = lines[1:]
-        if lines and lines[-1].startswith("```"):
+    """
+    Drops a ``` fence and the blank lines around the code. Indentation
+    is kept: a chunk from inside a class starts indented.
+    """
+    lines = code.rstrip().splitlines()
+    while lines and not lines[0].strip():
+        lines = lines[1:]
+    if lines and lines[0].lstrip().startswith("```"):
+        lines = lines[1:]
+        if lines and lines[-1].strip().startswith("```"):
             lines = lines[:-1]
-        return "\n".join(lines).strip()
-    return code.strip()
+    while lines and not lines[0].strip():
+        lines = lines[1:]
+    return "\n".join(lines).rstrip()
 
 
 def _parse_ai_response(response_text: str) -> Tuple[str, str]:
@@ -102,44 +219,1121 @@ def _parse_ai_response(response_text: str) -> Tuple[str, str]:
 # AI CALLER
 # =====================================================
 
-def _call_ai_provider(provider: str, model: Optional[str], system: str, code: str):
+def _call_ai_provider(
+    provider: str,
+    model: Optional[str],
+    system: str,
+    code: str,
+    user_prompt: Optional[str] = None,
+    usage: Optional[Dict[str, int]] = None,
+):
+
+    adapter = provider_clients.get_adapter(provider)
+
+    user_prompt = user_prompt or f"Please process this file:\n\n{code}"
+
+    return adapter.complete(model, system, user_prompt, usage=usage)
+
+
+def _stream_ai_provider(
+    provider: str,
+    model: Optional[str],
+    system: str,
+    code: str,
+    user_prompt: Optional[str] = None,
+    max_preamble: int = stream_parser.DEFAULT_MAX_PREAMBLE,
+    usage: Optional[Dict[str, int]] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Streaming variant of _call_ai_provider.
+    Tags are tracked as tokens arrive, and the generation is abandoned
+    as soon as the response is known to be malformed.
+    """
+
+    adapter = provider_clients.get_adapter(provider)
+
+    user_prompt = user_prompt or f"Please process this file:\n\n{code}"
+
+    return stream_parser.consume_stream(
+        adapter.stream(model, system, user_prompt, usage=usage),
+        max_preamble=max_preamble,
+    )
+
+
+# =====================================================
+# CACHED REQUEST
+# =====================================================
+
+def _cache_key(
+    run: Dict[str, Any],
+    code: str,
+    user_prompt: Optional[str] = None,
+) -> str:
+    mode = run["mode"]
+    if run["protocol"] != "full":
+        mode = f"{mode}:{run['protocol']}"
+
+    return result_cache.make_key(
+        run["provider"],
+        run["model"],
+        mode,
+        run["prompt_hash"],
+        result_cache.content_hash(user_prompt or code),
+    )
+
+
+def _request_ai(
+    run: Dict[str, Any],
+    code: str,
+    user_prompt: Optional[str] = None,
+    validate=_parse_ai_response,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Returns the raw AI response for `code` and request stats, from the
+    result cache when possible. Provider calls go through the run's
+    rate-limit scheduler, and their token usage is added to the run's
+    usage meter.
+    """
+
+    cache = run["cache"]
+    key = _cache_key(run, code, user_prompt)
+
+    entry = cache.get(key)
+    if entry is not None:
+        return entry["response"], {"cached": True}
+
+    usage: Dict[str, int] = {}
+    tracer = run["tracer"]
+    tags = {"provider": run["provider"], "model": run["model"] or "default"}
+    provider_seconds = 0.0
+
+    def _call() -> Tuple[str, Dict[str, Any]]:
+        nonlocal provider_seconds
+        # Throttled attempts are retried; only the last one counts.
+        usage.clear()
+        started = time.perf_counter()
+        with tracer.span("provider", **tags) as span:
+            try:
+                if run["stream"]:
+                    return _stream_ai_provider(
+                        run["provider"], run["model"], run["system_prompt"], code,
+                        user_prompt=user_prompt, usage=usage,
+                    )
+                raw = _call_ai_provider(
+                    run["provider"], run["model"], run["system_prompt"], code,
+                    user_prompt=user_prompt, usage=usage,
+                )
+                return raw, {}
+            finally:
+                span.update(usage)
+                provider_seconds += time.perf_counter() - started
+
+    # Budget for input (system + file) and an output of similar size.
+    tokens = (
+        chunking.estimate_tokens(run["system_prompt"])
+        + 2 * chunking.estimate_tokens(user_prompt or code)
+    )
+    started = time.perf_counter()
+    try:
+        raw, stats = run["scheduler"].call(_call, tokens=tokens)
+    finally:
+        if usage:
+            run["usage"].add(usage)
+        # Time spent waiting for the scheduler (slots, rate limits, backoff).
+        tracer.record("queue", time.perf_counter() - started - provider_seconds, **tags)
+
+    if "ttft" in stats:
+        tracer.record("ttft", stats["ttft"], **tags)
+
+    stats["usage"] = usage
+
+    # Only well-formed responses are worth replaying later.
+    validate(raw)
+    cache.put(key, {"response": raw})
+
+    stats["cached"] = False
+    return raw, stats
+
+
+# =====================================================
+# OUTPUT PROTOCOLS
+# =====================================================
+
+def _full_protocol(run: Dict[str, Any]) -> Dict[str, Any]:
+    """The run settings for whole-file responses."""
+    if run["protocol"] == "full":
+        return run
+    return dict(run, protocol="full", system_prompt=run["full_system_prompt"])
+
+
+def _enhance_text(
+    run: Dict[str, Any],
+    text: str,
+    user_prompt: Optional[str] = None,
+) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Requests an enhancement of `text` and returns (new_text, commit
+    message, stats). Under the edits/diff protocols the returned patch is
+    applied locally; if it does not apply, the text is requested again
+    as a complete file.
+    """
+
+    raw, stats = _request_ai(run, text, user_prompt)
+    with run["tracer"].span("parse"):
+        code, commit_msg = _parse_ai_response(raw)
+
+    if run["protocol"] == "full":
+        return code, commit_msg, stats
+
+    try:
+        with run["tracer"].span("parse", protocol=run["protocol"]):
+            return patching.apply_response(text, code, run["protocol"]), commit_msg, stats
+    except patching.PatchError:
+        raw, stats = _request_ai(_full_protocol(run), text, user_prompt)
+        with run["tracer"].span("parse"):
+            code, commit_msg = _parse_ai_response(raw)
+        stats["patch_fallback"] = True
+        return code, commit_msg, stats
+
+
+# =====================================================
+# CHUNKED FILES
+# =====================================================
+
+def _chunk_prompt(rel_path: str, index: int, total: int, chunk: str) -> str:
+    return (
+        f"The file `{rel_path}` is too large for one request, so it is "
+        f"split at top-level boundaries. This is part {index + 1} of {total}.\n"
+        "Process ONLY this part and return ONLY this part (not the whole file) "
+        "inside the required tags:\n\n"
+        f"{chunk}"
+    )
+
+
+def _enhance_chunks(
+    rel_path: str,
+    chunks: List[str],
+    run: Dict[str, Any],
+) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    Enhances the chunks of one large file in parallel and stitches the
+    results back together. A chunk that fails keeps its original text.
+    """
+
+    total = len(chunks)
+
+    def _worker(item: Tuple[int, str]) -> Tuple[str, str, bool]:
+        index, chunk = item
+        code, msg, stats = _enhance_text(
+            run, chunk, user_prompt=_chunk_prompt(rel_path, index, total, chunk)
+        )
+        return code, msg, stats.get("cached", False)
+
+    enhanced: List[str] = []
+    messages: List[str] = []
+    errors: List[BaseException] = []
+    cached = 0
+
+    for (index, chunk), out, error in worker_pool.run_ordered(
+        enumerate(chunks), _worker, run["workers"]
+    ):
+        if error is not None:
+            errors.append(error)
+            enhanced.append(chunk)
+            continue
+
+        code, msg, was_cached = out
+        cached += was_cached
+        enhanced.append(code)
+        if code.strip() != chunk.strip():
+            messages.append(msg)
+
+    if len(errors) == total:
+        raise errors[0]
+
+    stats = {
+        "cached": cached == total,
+        "chunks": total,
+        "failed_chunks": len(errors),
+    }
+
+    commit_msg = messages[0] if messages else "refactor: automated enhancement by RefactorAI"
+    return chunking.stitch(chunks, enhanced), commit_msg, stats
+
+
+# =====================================================
+# FILE WORKER
+# =====================================================
+
+def _new_result(rel_path: str) -> Dict[str, Any]:
+    return {
+        "path": rel_path,
+        "status": "skipped",
+        "code": None,
+        "message": None,
+        "stats": {},
+    }
+
+
+def _read_source(rel_path: str, run: Dict[str, Any]) -> Optional[str]:
+    """Returns the file text, or None for binary/unreadable files."""
+
+    if rel_path.lower().endswith(SKIP_EXTENSIONS):
+        return None
+
+    file_path = os.path.join(run["local_root"], rel_path)
+
+    with run["tracer"].span("read", file=rel_path):
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                return f.read()
+        except Exception:
+            return None
+
+
+def _finish_result(
+    result: Dict[str, Any],
+    original: str,
+    new_code: str,
+    commit_msg: str,
+    run: Dict[str, Any],
+) -> Dict[str, Any]:
+
+    # Skip unchanged files
+    if new_code.strip() == original.strip():
+        result["status"] = "unchanged"
+        return result
+
+    # Nothing that fails validation is ever pushed.
+    with run["tracer"].span("validate", file=result["path"]) as span:
+        error = run["validator"].check(result["path"], original, new_code)
+        span["ok"] = error is None
+    if error:
+        result.update(status="invalid", message=error)
+        return result
+
+    result.update(status="changed", code=new_code, message=commit_msg)
+    return result
+
+
+def _repair_prompt(code: str, error: str) -> str:
+    return (
+        "A previous answer for this file was rejected by local validation:\n"
+        f"{error}\n\n"
+        "Process the ORIGINAL file again and make sure the result passes. "
+        "Keep every public function signature unchanged.\n\n"
+        f"Please process this file:\n\n{code}"
+    )
+
+
+def _enhance_file(
+    rel_path: str,
+    run: Dict[str, Any],
+    feedback: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Runs the full read -> AI -> parse -> validate cycle for one file.
+    A result that fails validation is requested again with the error
+    fed back (VALIDATION_RETRIES times). `feedback` starts the cycle
+    with a known error.
+    Safe to call from worker threads: it never prints or prompts.
+    """
+
+    result = _new_result(rel_path)
+
+    original = _read_source(rel_path, run)
+    if original is None:
+        return result
+
+    chunks = chunking.split_source(rel_path, original, run["chunk_tokens"])
+
+    if len(chunks) > chunking.MAX_CHUNKS:
+        result.update(
+            status="too_large",
+            message=f"needs {len(chunks)} chunks (limit {chunking.MAX_CHUNKS})",
+        )
+        return result
+
+    if len(chunks) > 1:
+        # Chunks are validated once stitched; they are not retried.
+        try:
+            new_code, commit_msg, result["stats"] = _enhance_chunks(rel_path, chunks, run)
+        except Exception as e:
+            result.update(status="failed", message=str(e))
+            return result
+        return _finish_result(result, original, new_code, commit_msg, run)
+
+    for attempt in range(VALIDATION_RETRIES + 1):
+        result["message"] = None
+        prompt = _repair_prompt(original, feedback) if feedback else None
+        try:
+            new_code, commit_msg, result["stats"] = _enhance_text(run, original, prompt)
+        except Exception as e:
+            result.update(status="failed", message=str(e))
+            return result
+
+        if attempt:
+            result["stats"]["repaired"] = attempt
+
+        _finish_result(result, original, new_code, commit_msg, run)
+        if result["status"] != "invalid":
+            break
+        feedback = result["message"]
+
+    return result
+
+
+# =====================================================
+# BATCHED FILES
+# =====================================================
+
+def _enhance_batch(paths: List[str], run: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Enhances several small files with one request.
+
+    Files already in the cache are answered from it, the rest are packed
+    into tagged sections. Every returned section is cached under the
+    file's own single-file key, and any file whose section is missing or
+    malformed falls back to a solo request. Batches always use the
+    whole-file protocol.
+    """
+
+    run = _full_protocol(run)
+
+    results = {p: _new_result(p) for p in paths}
+    pending: Dict[str, str] = {}
+
+    for path in paths:
+        original = _read_source(path, run)
+        if original is None:
+            continue
+
+        entry = run["cache"].get(_cache_key(run, original))
+        if entry is not None:
+            try:
+                new_code, commit_msg = _parse_ai_response(entry["response"])
+            except ValueError:
+                pending[path] = original
+                continue
+            results[path]["stats"] = {"cached": True}
+            _finish_result(results[path], original, new_code, commit_msg, run)
+        else:
+            pending[path] = original
+
+    sections: Dict[str, str] = {}
+    batch_stats: Dict[str, Any] = {}
+
+    if len(pending) > 1:
+        prompt = batching.build_batch_prompt(run["batch_instruction"], pending)
+
+        def _complete(raw: str) -> Dict[str, str]:
+            return batching.check_batch_response(raw, list(pending))
+
+        try:
+            raw, batch_stats = _request_ai(run, prompt, user_prompt=prompt, validate=_complete)
+            sections = _complete(raw)
+        except Exception:
+            # Incomplete or garbled replies are not cached; every file
+            # is requested on its own instead.
+            sections = {}
+
+    for path, original in pending.items():
+        section = sections.get(path)
+
+        if section is None:
+            results[path] = _enhance_file(path, run)
+            continue
+
+        try:
+            new_code, commit_msg = _parse_ai_response(section)
+        except ValueError:
+            results[path] = _enhance_file(path, run)
+            continue
+
+        run["cache"].put(_cache_key(run, original), {"response": section})
+        results[path]["stats"] = dict(batch_stats, batched=len(pending))
+        _finish_result(results[path], original, new_code, commit_msg, run)
+
+    # Sections that fail validation are retried solo, with the error.
+    for path in paths:
+        if results[path]["status"] == "invalid":
+            results[path] = _enhance_file(path, run, feedback=results[path]["message"])
+
+    return [results[p] for p in paths]
+
+
+def _reserve_call(rel_path: str, run: Dict[str, Any]) -> Optional[Tuple[int, float]]:
+    """
+    Books the estimate of a call made beyond a unit's own reservation
+    (an escalation or a near-duplicate fallback). Raises
+    budget.BudgetExceeded when it does not fit.
+    """
+    if not run["budget"].limited:
+        return None
+    estimate = run["estimates"].get(rel_path)
+    if estimate is None:
+        system_tokens = chunking.estimate_tokens(run["system_prompt"])
+        text = _read_source(rel_path, run) or ""
+        estimate = budget.estimate_request(system_tokens, text, run["chunk_tokens"])
+    return run["budget"].reserve(*estimate)
+
+
+def _release_call(reservation: Optional[Tuple[int, float]], run: Dict[str, Any]) -> None:
+    if reservation:
+        run["budget"].release(reservation)
+
+
+def _escalate(
+    result: Dict[str, Any],
+    run: Dict[str, Any],
+    level: int = 0,
+) -> Dict[str, Any]:
+    """
+    Model cascade: moves a file up the tiers until a result is accepted
+    or the strongest model has answered.
+    """
+    tiers = run["tiers"]
+
+    while True:
+        model = tiers[level]["model"]
+        final = level == len(tiers) - 1
+        reason = cascade.escalation_reason(result, run["mode"])
+        run["tier_stats"].record(model, reason, final)
+
+        if reason is None or final:
+            if len(tiers) > 1:
+                result["stats"]["tier"] = model
+            return result
+
+        # Out of budget: keep the cheaper tier's answer.
+        try:
+            reservation = _reserve_call(result["path"], run)
+        except budget.BudgetExceeded:
+            if len(tiers) > 1:
+                result["stats"]["tier"] = model
+            return result
+
+        level += 1
+        try:
+            result = _enhance_file(result["path"], tiers[level])
+        finally:
+            _release_call(reservation, run)
+        result["stats"]["escalated"] = reason
+
+
+def _process_unit(unit: List[str], run: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Worker entry point: one work unit is one file or one batch. Units
+    start on the first (cheapest) tier.
+    """
+    first = run["tiers"][0]
+    label = unit[0] if len(unit) == 1 else f"<batch of {len(unit)}>"
+
+    with run["tracer"].context(file=label):
+        if len(unit) == 1:
+            results = [_enhance_file(unit[0], first)]
+        else:
+            results = _enhance_batch(unit, first)
+        return [_escalate(r, run) for r in results]
+
+
+def _plan_units(files_list: List[str], run: Dict[str, Any]) -> List[List[str]]:
+    if not run["batch"]:
+        return [[p] for p in files_list]
+
+    sizes = {}
+    for rel_path in files_list:
+        try:
+            sizes[rel_path] = os.path.getsize(os.path.join(run["local_root"], rel_path))
+        except OSError:
+            sizes[rel_path] = 0
+
+    return batching.plan_batches(
+        files_list, sizes, budget=min(batching.BATCH_TOKEN_BUDGET, run["chunk_tokens"])
+    )
+
+
+def _dedupe(
+    paths: List[str],
+    metadata: Dict[str, Any],
+    local_root: str,
+    near: bool,
+) -> Tuple[List[str], Dict[str, List[Tuple[str, str]]]]:
+    """
+    Keeps one representative per group of identical (and, with `near`,
+    near-identical same-named) files. Returns the representatives and
+    {representative: [(path, "exact" | "near")]}.
+    """
+
+    reps, exact = dedupe.group_exact(paths, local_root, metadata.get("blob_shas"))
+    copies = {rep: [(p, "exact") for p in dups] for rep, dups in exact.items()}
+
+    near_count = 0
+    if near:
+        reps, siblings = dedupe.group_near(reps, local_root)
+        for rep, sibs in siblings.items():
+            copies.setdefault(rep, []).extend((p, "near") for p in sibs)
+            near_count += len(sibs)
+
+    exact_count = sum(len(v) for v in exact.values())
+    if exact_count or near_count:
+        note = f", {near_count} near-duplicate(s)" if near else ""
+        console.print(
+            f"[dim]Dedupe: {exact_count} identical cop(ies){note} "
+            f"reuse the result of {len(copies)} file(s)[/dim]"
+        )
+
+    return reps, copies
+
+
+def _copy_result(
+    source: Dict[str, Any],
+    path: str,
+    kind: str,
+    run: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Fans a representative's result out to a duplicate. An identical copy
+    reuses the new code but is validated under its own path. A
+    near-duplicate gets the representative's edit replayed as a patch;
+    if that does not apply cleanly (or the representative did not
+    change), it is enhanced on its own.
+    """
+
+    if kind == "exact":
+        stats = dict(source["stats"], duplicate_of=source["path"])
+        if source["status"] != "changed":
+            return dict(source, path=path, stats=stats)
+        result = dict(_new_result(path), stats=stats)
+        original = _read_source(path, run)
+        if original is None:
+            return result
+        return _finish_result(result, original, source["code"], source["message"], run)
+
+    if source["status"] == "changed":
+        rep_original = _read_source(source["path"], run)
+        original = _read_source(path, run)
+        if rep_original is not None and original is not None:
+            new_code = dedupe.transfer_edit(rep_original, source["code"], original)
+            if new_code is not None:
+                result = _new_result(path)
+                result["stats"] = {"edit_from": source["path"]}
+                _finish_result(result, original, new_code, source["message"], run)
+                if result["status"] == "changed":
+                    return result
+
+    try:
+        reservation = _reserve_call(path, run)
+    except budget.BudgetExceeded:
+        return dict(_new_result(path), status="deferred")
+
+    with run["tracer"].context(file=path):
+        try:
+            result = _enhance_file(path, run["tiers"][0])
+        finally:
+            _release_call(reservation, run)
+        return _escalate(result, run)
+
+
+def _print_request_stats(stats: Dict[str, Any]) -> None:
+    """Shows cache hits and streaming latency for one file."""
+    if stats.get("chunks"):
+        failed = stats.get("failed_chunks", 0)
+        note = f", {failed} failed and kept as-is" if failed else ""
+        console.print(f"[dim]split into {stats['chunks']} chunks{note}[/dim]")
+
+    if stats.get("batched"):
+        console.print(f"[dim]batched with {stats['batched'] - 1} other file(s)[/dim]")
+
+    if stats.get("duplicate_of"):
+        console.print(f"[dim]identical to {stats['duplicate_of']} — reused its result[/dim]")
+
+    if stats.get("edit_from"):
+        console.print(f"[dim]near-duplicate of {stats['edit_from']} — reused its edit[/dim]")
+
+    if stats.get("replayed"):
+        console.print("[dim]replayed from run journal[/dim]")
+
+    if stats.get("escalated"):
+        console.print(f"[dim]escalated to {stats['tier']} ({stats['escalated']})[/dim]")
+    elif stats.get("tier"):
+        console.print(f"[dim]answered by {stats['tier']}[/dim]")
+
+    if stats.get("repaired"):
+        console.print("[dim]first result failed validation — repaired on retry[/dim]")
+
+    if stats.get("patch_fallback"):
+        console.print("[dim]patch did not apply — used full-file response[/dim]")
+
+    cached_tokens = stats.get("usage", {}).get("cached_tokens")
+    if cached_tokens:
+        console.print(f"[dim]{cached_tokens} prompt tokens served from provider cache[/dim]")
+
+    if stats.get("cached"):
+        console.print("[dim]cached result[/dim]")
+    elif "ttft" in stats:
+        # ~4 characters per token is close enough for a throughput gauge.
+        console.print(
+            f"[dim]ttft {stats['ttft']:.2f}s · "
+            f"{stats['seconds']:.1f}s total · "
+            f"{stats['chars_per_sec'] / 4:.0f} tok/s[/dim]"
+        )
+
+
+def _handle_result(
+    result: Dict[str, Any],
+    auto_commit: bool,
+    repo_name: str,
+    branch: str,
+    base_path: str,
+    tracer: Optional[profiling.Tracer] = None,
+    local_git: Optional[Dict[str, Any]] = None,
+    staged: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Prints one file result and pushes it if accepted (main thread only).
+    Returns the push response when a push was attempted. With
+    `local_git` (a git source's metadata) the result is committed to the
+    run's local branch instead; with `staged` it is only appended there
+    for the next batch commit, and {"status": "staged"} is returned.
+    """
+
+    rel_path = result["path"]
+
+    if result["status"] == "skipped":
+        return
+
+    console.print(f"\n[bold]Processing:[/bold] {rel_path}")
+    _print_request_stats(result["stats"])
+
+    if result["status"] == "failed":
+        console.print(f"[red]Failed: {result['message']}[/red]")
+        return
+
+    if result["status"] == "invalid":
+        console.print(f"[red]Result failed validation — not pushed ({result['message']})[/red]")
+        return
+
+    if result["status"] == "too_large":
+        console.print(f"[yellow]Too large — skipped ({result['message']})[/yellow]")
+        return
+
+    if result["status"] == "unchanged":
+        console.print("[yellow]No changes generated — skipped[/yellow]")
+        return
+
+    new_code = result["code"]
+    commit_msg = result["message"]
+
+    console.print(f"[green]{commit_msg}[/green]")
+
+    question = "Apply and push?" if local_git is None and staged is None else "Apply and commit?"
+    if auto_commit or Confirm.ask(question):
+
+        repo_path = (
+            f"{base_path}/{rel_path}".replace("//", "/")
+            if base_path else rel_path
+        )
+
+        if staged is not None:
+            staged.append({
+                "path": rel_path,
+                "repo_path": repo_path,
+                "content": new_code,
+                "message": commit_msg,
+            })
+            console.print("[green]✔ Staged for the next batch commit[/green]")
+            return {"status": "staged"}
+
+        with (tracer or profiling.Tracer()).span("commit", file=rel_path) as span:
+            if local_git:
+                push = git_source.commit_file(local_git, repo_path, new_code, commit_msg)
+            else:
+                push = update_ops.update_file_content(
+                    repo_name=repo_name,
+                    file_path=repo_path,
+                    new_content=new_code,
+                    branch=branch,
+                    message=commit_msg,
+                )
+            span["status"] = push["status"]
+
+        if push["status"] == "success":
+            console.print(f"[bold green]✔ {'Committed' if local_git else 'Pushed'}[/bold green]")
+        else:
+            console.print(f"[red]{push['message']}[/red]")
+
+        return push
+
+    return None
+
+
+# =====================================================
+# INCREMENTAL RUNS
+# =====================================================
+
+def _last_enhanced_sha(repo_url: str, mode: str) -> Optional[str]:
+    target = repo_files_loader.resolve_repo_target(repo_url)
+    if target["status"] != "success":
+        return None
+    t = target["data"]
+    return run_state.get_last_sha(t["repo_name"], t["branch"], mode, t["base_path"])
+
+
+def _prefilter(
+    paths: List[str],
+    metadata: Dict[str, Any],
+    local_root: str,
+) -> List[str]:
+    """
+    Drops binary, lock, vendored, generated, minified and data files
+    before any model call and reports how many of each were skipped.
+    """
+
+    sniffer = file_filter.FileFilter(
+        metadata.get("gitattributes", ""),
+        metadata.get("base_path", ""),
+    )
+    kept, skipped = sniffer.partition(paths, local_root)
+
+    if skipped:
+        counts = ", ".join(
+            f"{len(skipped[c])} {c}" for c in file_filter.CATEGORIES if c in skipped
+        )
+        total = sum(len(v) for v in skipped.values())
+        console.print(f"[dim]Pre-filter skipped {total} file(s): {counts}[/dim]")
+
+    return kept
+
+
+def _prioritize(
+    paths: List[str],
+    keys: List[str],
+    metadata: Dict[str, Any],
+    local_root: str,
+) -> List[str]:
+    """Orders the work queue by the --priority keys."""
+
+    if not keys:
+        return paths
+
+    sizes = {}
+    for rel_path in paths:
+        try:
+            sizes[rel_path] = os.path.getsize(os.path.join(local_root, rel_path))
+        except OSError:
+            sizes[rel_path] = 0
+
+    recency: Dict[str, float] = {}
+    if "recent" in keys:
+        if metadata.get("source") == "git":
+            hist = git_source.recently_changed_files(metadata)
+        else:
+            hist = branch_ops.recently_changed_files(metadata["repo_name"], metadata["branch"])
+        if hist["status"] == "success":
+            prefix = f"{metadata['base_path'].strip('/')}/" if metadata.get("base_path") else ""
+            recency = {
+                p[len(prefix):]: ts for p, ts in hist["data"]["paths"].items()
+                if p.startswith(prefix)
+            }
+        else:
+            console.print(f"[yellow]{hist['message']} — ignoring 'recent'[/yellow]")
+
+    return budget.order_paths(paths, keys, sizes, recency)
+
+
+def _preflight(paths: List[str], run: Dict[str, Any]) -> Dict[str, Tuple[int, int]]:
+    """Estimates (input, output) tokens per file and prints the total."""
+
+    system_tokens = chunking.estimate_tokens(run["system_prompt"])
+    estimates = {}
+    for rel_path in paths:
+        text = _read_source(rel_path, run)
+        estimates[rel_path] = budget.estimate_request(system_tokens, text or "", run["chunk_tokens"])
+
+    total_in = sum(e[0] for e in estimates.values())
+    total_out = sum(e[1] for e in estimates.values())
+    note = ""
+    if run["budget"].prices:
+        note = f" (~${budget.cost_of(run['budget'].prices, total_in, total_out):.2f} before caching)"
+    console.print(
+        f"[dim]Pre-flight estimate: {total_in + total_out} tokens for "
+        f"{len(paths)} file(s){note}[/dim]"
+    )
+    return estimates
+
+
+def _print_deferred(outcomes: Counter, deferred: List[str], run_id: str) -> None:
+    """Done/deferred summary for a run stopped by its budget."""
+
+    done = ", ".join(f"{n} {status}" for status, n in sorted(outcomes.items()) if status != "deferred")
+    console.print(f"\n[bold yellow]Budget reached.[/bold yellow] Done: {done or 'nothing'}")
+    console.print(f"[yellow]Deferred {len(deferred)} file(s):[/yellow]")
+    for rel_path in deferred[:10]:
+        console.print(f"[dim]  {rel_path}[/dim]")
+    if len(deferred) > 10:
+        console.print(f"[dim]  ... and {len(deferred) - 10} more[/dim]")
+    console.print(f"[yellow]Continue later with --resume {run_id} (and a new budget)[/yellow]")
+
+
+def _report_profile(tracer: profiling.Tracer, journal: run_journal.RunJournal) -> None:
+    """Prints the stage percentiles and writes the trace/metrics files."""
+
+    tracer.close()
+    metrics = journal.dir / "metrics.prom"
+    tracer.write_prometheus(metrics)
+
+    textfile_dir = secrets_manager.get_preference("profile", "textfile_dir")
+    if textfile_dir:
+        tracer.write_prometheus(Path(textfile_dir).expanduser() / "refactor_ai.prom")
+
+    console.print()
+    console.print(tracer.table())
+    console.print(f"[dim]Trace: {tracer.trace_path}[/dim]")
+    console.print(f"[dim]Metrics: {metrics}[/dim]")
+
+
+def _record_progress(
+    metadata: Dict[str, Any],
+    mode: str,
+    pushed: List[str],
+    failures: int,
+) -> None:
+    """
+    Stores the commit this run fully covered. Our own pushes are folded
+    in when nobody else committed meanwhile, so the next run does not
+    re-enhance files we just wrote.
+    """
+
+    if failures:
+        console.print(
+            f"[yellow]Incremental state not advanced: {failures} file(s) failed[/yellow]"
+        )
+        return
+
+    repo_name = metadata["repo_name"]
+    branch = metadata["branch"]
+    sha = metadata["commit_sha"]
+
+    if pushed:
+        cmp = branch_ops.list_commits_between(repo_name, sha, branch)
+        if cmp["status"] == "success" and set(cmp["data"]["commits"]) <= set(pushed):
+            sha = cmp["data"]["head_sha"]
+
+    run_state.save_last_sha(repo_name, branch, mode, sha, metadata.get("base_path", ""))
+    console.print(f"[dim]Incremental state saved at {sha[:7]}[/dim]")
+
+
+# =====================================================
+# DOWNLOAD
+# =====================================================
+
+def _download(
+    repo_url: str,
+    temp_dir: str,
+    meta_name: str,
+    mode: str,
+    incremental: bool,
+) -> Optional[Dict[str, Any]]:
+    """Downloads the repo (or only its changes); returns the loader data."""
+
+    changed_since = _last_enhanced_sha(repo_url, mode) if incremental else None
+
+    if changed_since:
+        console.print(f"[dim]Incremental: only files changed since {changed_since[:7]}[/dim]")
+    elif incremental:
+        console.print("[dim]Incremental: no previous run recorded, processing everything[/dim]")
+
+    with console.status("[green]Downloading repository..."):
+        dl_result = repo_files_loader.download_repo_content(
+            url=repo_url,
+            output_folder=temp_dir,
+            metadata_filename=meta_name,
+            changed_since=changed_since,
+        )
+
+    if dl_result["status"] != "success" and changed_since:
+        console.print(f"[yellow]{dl_result['message']} — falling back to a full run[/yellow]")
+        with console.status("[green]Downloading repository..."):
+            dl_result = repo_files_loader.download_repo_content(
+                url=repo_url,
+                output_folder=temp_dir,
+                metadata_filename=meta_name,
+            )
+
+    if dl_result["status"] != "success":
+        console.print(f"[red]{dl_result['message']}[/red]")
+        return None
+
+    return dl_result["data"]
+
+
+def _checkout(
+    repo_url: str,
+    temp_dir: str,
+    meta_path: str,
+    run_id: str,
+    incremental: bool,
+) -> Optional[Dict[str, Any]]:
+    """Prepares a local git source's working tree; returns the loader data."""
+
+    if incremental:
+        console.print("[dim]Incremental runs need a GitHub URL — processing everything[/dim]")
+
+    with console.status("[green]Checking out repository..."):
+        res = git_source.prepare(repo_url, temp_dir, run_id, meta_path)
+
+    if res["status"] != "success":
+        console.print(f"[red]{res['message']}[/red]")
+        return None
+
+    console.print(f"[dim]{res['message']}[/dim]")
+    return res["data"]
+
+
+def _publish(metadata: Dict[str, Any], auto_commit: bool) -> bool:
+    """
+    Pushes a cloned git source's branch in one go (after confirmation
+    unless --auto). Returns False if the push failed.
+    """
+
+    count = git_source.unpushed_commits(metadata)
+    if not count:
+        return True
+
+    if not (auto_commit or Confirm.ask(f"Push {count} commit(s) on {metadata['branch']}?")):
+        console.print(f"[yellow]Not pushed — {metadata['branch']} stays in {metadata['work_tree']}[/yellow]")
+        return False
+
+    with console.status(f"[green]Pushing {metadata['branch']}..."):
+        res = git_source.push(metadata)
+
+    if res["status"] != "success":
+        console.print(f"[red]{res['message']}[/red]")
+        return False
+
+    console.print(f"[bold green]✔ {res['message']}[/bold green]")
+    return True
+
+
+# =====================================================
+# BATCHED COMMITS
+# =====================================================
+
+def _first_line(text: str) -> str:
+    return text.strip().split("\n", 1)[0]
+
+
+def _batch_message(staged: List[Dict[str, Any]], mode: str) -> str:
+    """A summary line plus the first line of each file's own message."""
+
+    if len(staged) == 1:
+        return staged[0]["message"]
+
+    lines = [f"refactor-ai ({mode}): update {len(staged)} files", ""]
+    lines += [f"* {s['repo_path']}: {_first_line(s['message'])}" for s in staged]
+    return "\n".join(lines)
+
 
-    api_key = secrets_manager.get_key(provider)
-    if not api_key:
-        raise ValueError(f"No API key for {provider}")
+def _open_batch_branch(metadata: Dict[str, Any], batch_branch: str) -> Dict[str, Any]:
+    """
+    Creates the batch branch at the downloaded commit, so every batch
+    applies to the snapshot it was enhanced from. A resumed run finds
+    it already there and keeps adding to it.
+    """
 
-    user_prompt = f"Please process this file:\n\n{code}"
+    info = branch_ops.get_branch_info(metadata["repo_name"], batch_branch)
+    if info["status"] == "success":
+        console.print(f"[dim]Adding to existing branch {batch_branch}[/dim]")
+        return info
 
-    if provider == "google":
-        genai.configure(api_key=api_key)
-        m = genai.GenerativeModel(
-            model_name=model or "gemini-1.5-flash",
-            system_instruction=system,
+    res = branch_ops.create_branch(
+        metadata["repo_name"], batch_branch, metadata["branch"],
+        source_sha=metadata["commit_sha"],
+    )
+    if res["status"] == "success":
+        console.print(f"[dim]{res['message']}[/dim]")
+    else:
+        console.print(f"[red]{res['message']}[/red]")
+    return res
+
+
+def _commit_batch(
+    staged: List[Dict[str, Any]],
+    metadata: Dict[str, Any],
+    batch_branch: str,
+    mode: str,
+    tracer: profiling.Tracer,
+) -> Dict[str, Any]:
+    """Commits the staged files to the batch branch as one commit."""
+
+    with tracer.span("commit", files=len(staged)) as span:
+        push = commit_ops.commit_multiple_files(
+            repo_name=metadata["repo_name"],
+            file_changes=[{"path": s["repo_path"], "content": s["content"]} for s in staged],
+            branch=batch_branch,
+            message=_batch_message(staged, mode),
         )
-        return m.generate_content(user_prompt).text
+        span["status"] = push["status"]
 
-    if provider == "openai":
-        client = OpenAI(api_key=api_key)
-        res = client.chat.completions.create(
-            model=model or "gpt-4o",
-            messages=[
-                {"role": "system", "content": system},
-                {"role": "user", "content": user_prompt},
-            ],
+    if push["status"] == "success":
+        console.print(
+            f"\n[bold green]✔ Committed {len(staged)} file(s) to {batch_branch} "
+            f"({push['data']['commit_sha'][:7]})[/bold green]"
         )
-        return res.choices[0].message.content
+    else:
+        console.print(f"\n[red]{push['message']}[/red]")
+    return push
+
 
-    if provider == "anthropic":
-        client = Anthropic(api_key=api_key)
-        res = client.messages.create(
-            model=model or "claude-3-5-sonnet-20240620",
-            max_tokens=4096,
-            system=system,
-            messages=[{"role": "user", "content": user_prompt}],
+def _open_pull_request(
+    metadata: Dict[str, Any],
+    batch_branch: str,
+    mode: str,
+    journal: run_journal.RunJournal,
+) -> bool:
+    """
+    Opens one pull request from the batch branch into the target branch,
+    unless this run already did. Returns False if that failed.
+    """
+
+    if any(ev["event"] == "pull_request" for ev in journal.events()):
+        return True
+
+    committed = sorted(
+        (path, entry.get("message", ""))
+        for path, entry in journal.state()["files"].items()
+        if entry.get("status") == "committed"
+    )
+    if not committed:
+        return True
+
+    scope = f" in {metadata['base_path']}" if metadata.get("base_path") else ""
+    lines = [
+        f"RefactorAI `{mode}` run `{journal.run_id}` on {len(committed)} file(s){scope}, "
+        f"based on {metadata['commit_sha'][:7]}.",
+        "",
+    ]
+    lines += [f"* `{path}`: {_first_line(message)}" for path, message in committed[:PR_BODY_FILES]]
+    if len(committed) > PR_BODY_FILES:
+        lines.append(f"* ... and {len(committed) - PR_BODY_FILES} more")
+
+    with console.status("[green]Opening pull request..."):
+        res = pr_ops.create_pull_request(
+            repo_name=metadata["repo_name"],
+            title=f"RefactorAI {mode.replace('_', ' ')}: {len(committed)} file(s){scope}",
+            body="\n".join(lines),
+            head=batch_branch,
+            base=metadata["branch"],
         )
-        return res.content[0].text
 
-    raise ValueError("Unknown provider")
+    if res["status"] != "success":
+        console.print(f"[red]{res['message']}[/red]")
+        return False
+
+    journal.append("pull_request", number=res["data"]["pr_number"], url=res["data"]["url"])
+    console.print(f"[bold green]✔ {res['message']}[/bold green]")
+    return True
 
 
 # =====================================================
@@ -152,101 +1346,407 @@ def process_repo(
     mode: str,
     auto_commit: bool,
     metadata_file: Optional[str] = None,
+    workers: int = 1,
+    use_cache: bool = True,
+    refresh: bool = False,
+    stream: bool = False,
+    batch: bool = False,
+    protocol: str = "full",
+    incremental: bool = False,
+    resume: Optional[str] = None,
+    prefilter: bool = True,
+    max_tokens: Optional[int] = None,
+    max_cost: Optional[float] = None,
+    priority: Optional[List[str]] = None,
+    use_cascade: bool = False,
+    dedupe_near: bool = False,
+    profile: bool = False,
+    commit_batch: Optional[int] = None,
+    open_pr: bool = False,
+    cancel: Optional[threading.Event] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
 ):
+    """
+    Runs one enhancement job. `cancel` stops it between work units (the
+    run stays resumable); `progress` receives "started", "planned",
+    "file" and "finished" events, as used by `refactor serve`.
+
+    `repo_url` is a GitHub URL, or a local checkout / git remote (see
+    git_source.py) whose results are committed to a local branch.
+
+    With `commit_batch` (or `open_pr`) accepted files are committed that
+    many at a time to a new branch instead of one commit per file on the
+    target branch; `open_pr` then opens one pull request for it.
+    """
+
+    def _notify(event: str, **fields: Any) -> None:
+        if progress is not None:
+            progress(dict(fields, event=event))
+
+    def _cancelled() -> bool:
+        return cancel is not None and cancel.is_set()
 
     mode = mode if mode in VALID_MODES else "enhance"
+    protocol = protocol if protocol in VALID_PROTOCOLS else "full"
     model = secrets_manager.get_preference(provider, "default_model")
 
-    console.print(f"[bold cyan]RefactorAI[/bold cyan]: Using {provider} ({model})")
-
-    temp_dir = "./.refactor_ai_temp"
-    meta_name = metadata_file or "repo_metadata.json"
+    cap = worker_pool.provider_limit(
+        provider, secrets_manager.get_preference(provider, "max_concurrency")
+    )
+    workers = max(1, min(workers, cap))
 
-    with console.status("[green]Downloading repository..."):
-        dl_result = repo_files_loader.download_repo_content(
-            url=repo_url,
-            output_folder=temp_dir,
-            metadata_filename=meta_name,
+    if use_cascade:
+        models = cascade.resolve_tiers(
+            provider,
+            secrets_manager.get_preference(provider, "cheap_model"),
+            model,
         )
+        model = models[-1]
+    else:
+        models = [model]
 
-    if dl_result["status"] != "success":
-        console.print(f"[red]{dl_result['message']}[/red]")
+    schedulers = {}
+    for m in models:
+        rpm, tpm = _rate_limits(provider, m)
+        schedulers[m] = scheduler.get_scheduler(provider, m, cap, rpm=rpm, tpm=tpm)
+    sched = schedulers[model]
+
+    console.print(f"[bold cyan]RefactorAI[/bold cyan]: Using {provider} ({' -> '.join(str(m) for m in models)})")
+    if workers > 1:
+        console.print(f"[dim]Workers: {workers} (provider cap {cap})[/dim]")
+
+    journal = run_journal.open_journal(resume)
+    state = journal.state() if resume else None
+
+    if resume and not (state and state["start"]):
+        console.print(f"[red]No journal found for run '{resume}'[/red]")
         return
 
-    # ===== FIXED PART =====
+    if state and state["finished"]:
+        console.print(f"[green]Run '{resume}' already completed.[/green]")
+        return
+
+    if resume:
+        # A resumed run keeps its original target and settings.
+        repo_url = state["start"]["repo_url"]
+        mode = state["start"]["mode"]
+        protocol = state["start"].get("protocol", protocol)
+        commit_batch = commit_batch or state["start"].get("commit_batch")
+        open_pr = open_pr or state["start"].get("open_pr", False)
+        console.print(f"[bold]Resuming run:[/bold] {journal.run_id} ({repo_url}, {mode})")
+    else:
+        journal.append(
+            "start", provider=provider, model=model, mode=mode,
+            repo_url=repo_url, protocol=protocol,
+            commit_batch=commit_batch, open_pr=open_pr,
+        )
+        console.print(f"[dim]Run ID: {journal.run_id} (resume with --resume {journal.run_id})[/dim]")
+
+    pruned = run_journal.prune_runs(exclude={journal.run_id})
+    if pruned["removed"] or pruned["trimmed"]:
+        console.print(
+            f"[dim]Cleaned up {len(pruned['removed'])} old run(s) and "
+            f"{len(pruned['trimmed'])} unused working copies[/dim]"
+        )
+
+    _notify("started", run_id=journal.run_id, repo_url=repo_url, mode=mode)
 
-    data = dl_result["data"]
+    temp_dir = str(journal.files_dir)
+    tracer = profiling.Tracer(profile, journal.dir / "trace.jsonl")
+    meta_name = metadata_file or "repo_metadata.json"
 
-    meta_path = data["metadata"]      # <-- FIXED
-    local_root = data["local_path"]
+    if state and state["download"] and os.path.exists(state["download"]["metadata"]):
+        meta_path = state["download"]["metadata"]
+        local_root = state["download"]["local_path"]
+    else:
+        with tracer.span("download"):
+            if git_source.is_git_source(repo_url):
+                meta_path = str(journal.dir / meta_name)
+                dl_result = _checkout(repo_url, temp_dir, meta_path, journal.run_id, incremental)
+            else:
+                dl_result = _download(repo_url, temp_dir, meta_name, mode, incremental)
+        if dl_result is None:
+            # Nothing will read a partial download: resuming fetches it again.
+            journal.drop_files()
+            return
+        meta_path = dl_result["metadata"]
+        local_root = dl_result["local_path"]
+        journal.append("downloaded", metadata=meta_path, local_path=local_root)
 
     with open(meta_path, "r", encoding="utf-8") as f:
         metadata = json.load(f)
 
-    files_list = metadata.get("downloaded_files", [])  # <-- FIXED
+    files_list = metadata.get("downloaded_files", [])
     repo_name = metadata["repo_name"]
     branch = metadata["branch"]
     base_path = metadata.get("base_path", "")
+    local_git = metadata if metadata.get("source") == "git" else None
+
+    if open_pr and not commit_batch:
+        commit_batch = DEFAULT_COMMIT_BATCH
+    if commit_batch and local_git:
+        console.print("[dim]Git sources commit to their own branch — ignoring --commit-batch / --pr[/dim]")
+        commit_batch, open_pr = None, False
+
+    # Accepted files waiting for the next batch commit (None: per-file pushes).
+    staged: Optional[List[Dict[str, Any]]] = [] if commit_batch else None
+    batch_branch = git_source.BRANCH_PREFIX + journal.run_id
+    if commit_batch:
+        console.print(f"[dim]Committing {commit_batch} file(s) at a time to {batch_branch}[/dim]")
+
+    # Files the journal already settled are skipped; enhanced but
+    # unpushed ones are replayed without another model call.
+    done = state["files"] if state else {}
+    settled = run_journal.DONE_STATES | run_journal.REPLAY_STATES
+    replay = [
+        done[p] for p in files_list
+        if done.get(p, {}).get("status") in run_journal.REPLAY_STATES
+    ]
+    todo = [p for p in files_list if done.get(p, {}).get("status") not in settled]
+
+    if resume:
+        console.print(
+            f"[dim]{len(files_list) - len(todo) - len(replay)} done, "
+            f"{len(replay)} to replay, {len(todo)} to process[/dim]"
+        )
 
-    system_prompt = _load_system_prompt(mode)
-
-    # ===== FILE LOOP =====
+    if prefilter:
+        todo = _prefilter(todo, metadata, local_root)
 
-    for rel_path in files_list:
+    todo = _prioritize(todo, priority or [], metadata, local_root)
+    todo, copies = _dedupe(todo, metadata, local_root, dedupe_near)
 
-        if rel_path.endswith(BINARY_EXTENSIONS):
-            continue
+    repo_context = _repo_context(metadata)
+    usage_meter = provider_clients.UsageMeter()
+    prices = budget.resolve_prices(
+        model or provider_clients.DEFAULT_MODELS[provider],
+        secrets_manager.get_preference(provider, "prices"),
+    )
 
-        file_path = os.path.join(local_root, rel_path)
+    if max_cost and not prices:
+        console.print(
+            f"[red]--max-cost needs prices for {model}: set the '{provider}' "
+            "'prices' preference ({\"input\": ..., \"output\": ...} per 1M tokens)[/red]"
+        )
+        return
 
+    run = {
+        "provider": provider,
+        "model": model,
+        "mode": mode,
+        "local_root": local_root,
+        "protocol": protocol,
+        "system_prompt": _load_system_prompt(mode, protocol, repo_context),
+        "full_system_prompt": _load_system_prompt(mode, repo_context=repo_context),
+        "prompt_hash": _prompt_fingerprint(),
+        "scheduler": sched,
+        "usage": usage_meter,
+        "cache": _open_cache(use_cache, refresh),
+        "stream": stream,
+        "workers": workers,
+        "batch": batch,
+        "batch_instruction": _load_batch_instruction(),
+        # Files above this estimate are split (see chunking.chunk_budget);
+        # every tier of a cascade must be able to answer a chunk.
+        "chunk_tokens": chunking.chunk_budget(
+            min(provider_clients.output_limit(provider, m) for m in models)
+        ),
+        "budget": budget.Budget(usage_meter, max_tokens, max_cost, prices),
+        "tier_stats": cascade.TierStats([str(m) for m in models]),
+        "validator": validation.get_validator(),
+        "tracer": tracer,
+    }
+    run["tiers"] = [dict(run, model=m, scheduler=schedulers[m]) for m in models]
+
+    estimates = _preflight(todo, run)
+    run["estimates"] = estimates
+
+    def _with_copies(unit: List[str]) -> List[str]:
+        return unit + [path for rep in unit for path, _ in copies.get(rep, [])]
+
+    def _worker(unit: List[str]) -> List[Dict[str, Any]]:
+        if _cancelled():
+            return []
+        reservation = None
+        if run["budget"].limited:
+            try:
+                reservation = run["budget"].reserve(
+                    sum(estimates[p][0] for p in unit),
+                    sum(estimates[p][1] for p in unit),
+                )
+            except budget.BudgetExceeded:
+                return [dict(_new_result(p), status="deferred") for p in _with_copies(unit)]
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                original = f.read()
-        except Exception:
-            continue
+            results = []
+            for result in _process_unit(unit, run):
+                results.append(result)
+                for path, kind in copies.get(result["path"], []):
+                    results.append(_copy_result(result, path, kind, run))
+        finally:
+            if reservation:
+                run["budget"].release(reservation)
+        for result in results:
+            if result["status"] != "deferred":
+                journal.record_result(result)
+        return results
+
+    def _settle(result: Dict[str, Any]) -> None:
+        nonlocal failures
+        outcomes[result["status"]] += 1
+        _notify("file", path=result["path"], status=result["status"], done=sum(outcomes.values()))
+        if result["status"] == "deferred":
+            deferred.append(result["path"])
+            return
+
+        push = _handle_result(result, auto_commit, repo_name, branch, base_path, tracer, local_git, staged)
+
+        if push is None:
+            if result["status"] == "changed":
+                journal.append("declined", path=result["path"])
+            elif result["status"] in ("failed", "invalid"):
+                failures += 1
+        elif push["status"] == "staged":
+            if len(staged) >= commit_batch:
+                _flush()
+        elif push["status"] == "success":
+            pushed.append(push["data"]["commit_sha"])
+            journal.append("committed", path=result["path"], commit_sha=push["data"]["commit_sha"])
+        else:
+            failures += 1
+            journal.append("push_failed", path=result["path"], error=push["message"])
+
+    def _flush() -> None:
+        # Files of a failed batch are journaled as push_failed, so
+        # --resume replays them into a new batch.
+        nonlocal failures, batch_ready
+        if not staged:
+            return
+        files = list(staged)
+        staged.clear()
+
+        push = None
+        if not batch_ready:
+            push = _open_batch_branch(metadata, batch_branch)
+            batch_ready = push["status"] == "success"
+        if batch_ready:
+            push = _commit_batch(files, metadata, batch_branch, mode, tracer)
+
+        if push["status"] == "success":
+            pushed.append(push["data"]["commit_sha"])
+            for item in files:
+                journal.append("committed", path=item["path"], commit_sha=push["data"]["commit_sha"])
+        else:
+            failures += len(files)
+            for item in files:
+                journal.append("push_failed", path=item["path"], error=push["message"])
 
-        if len(original) > MAX_FILE_SIZE:
+    # ===== FILE LOOP =====
+    # Workers run ahead; results come back in file order so the
+    # console output and confirmation prompts stay sequential.
+
+    pushed: List[str] = []
+    deferred: List[str] = []
+    outcomes: Counter = Counter()
+    failures = 0
+    cancelled = False
+    batch_ready = False
+
+    _notify("planned", total=len(replay) + len(todo) + sum(len(c) for c in copies.values()))
+
+    for entry in replay:
+        if _cancelled():
+            break
+        _settle(dict(_new_result(entry["path"]), status="changed",
+                     code=entry["code"], message=entry["message"],
+                     stats={"replayed": True}))
+
+    for unit, unit_results, error in worker_pool.run_ordered(
+        _plan_units(todo, run), _worker, workers
+    ):
+
+        if _cancelled():
+            # Units still in flight finish and are journaled, so a
+            # resumed run replays them instead of calling the model again.
+            cancelled = True
+            break
+
+        if error is not None:
+            for rel_path in _with_copies(unit):
+                console.print(f"\n[bold]Processing:[/bold] {rel_path}")
+                console.print(f"[red]Failed: {error}[/red]")
+                journal.append("enhanced", path=rel_path, status="failed", message=str(error))
+                failures += 1
+                outcomes["failed"] += 1
+                _notify("file", path=rel_path, status="failed", done=sum(outcomes.values()))
             continue
 
-        console.print(f"\n[bold]Processing:[/bold] {rel_path}")
-
-        try:
-            raw = _call_ai_provider(
-                provider, model, system_prompt, original
-            )
-            new_code, commit_msg = _parse_ai_response(raw)
-
-            # 🔥 NEW: Skip unchanged files
-            if new_code.strip() == original.strip():
-                console.print("[yellow]No changes generated — skipped[/yellow]")
-                continue
-
-        except Exception as e:
-            console.print(f"[red]Failed: {e}[/red]")
-            continue
+        for result in unit_results:
+            _settle(result)
 
-        console.print(f"[green]{commit_msg}[/green]")
+    cancelled = cancelled or _cancelled()
 
-        if auto_commit or Confirm.ask("Apply and push?"):
+    # Whatever was accepted before a cancel or the budget stop is still committed.
+    _flush()
 
-            repo_path = (
-                f"{base_path}/{rel_path}".replace("//", "/")
-                if base_path else rel_path
-            )
+    if deferred:
+        _print_deferred(outcomes, deferred, journal.run_id)
 
-            result = update_ops.update_file_content(
-                repo_name=repo_name,
-                file_path=repo_path,
-                new_content=new_code,
-                branch=branch,
-                message=commit_msg,
-            )
+    unpublished = False
+    if local_git and not cancelled:
+        unpublished = not _publish(local_git, auto_commit)
+    elif open_pr and (batch_ready or resume) and not cancelled:
+        unpublished = not _open_pull_request(metadata, batch_branch, mode, journal)
+    elif batch_ready:
+        console.print(f"\n[green]Results are on branch {batch_branch} — merge it into {branch} when ready[/green]")
 
-            if result["status"] == "success":
-                console.print("[bold green]✔ Pushed[/bold green]")
-            else:
-                console.print(f"[red]{result['message']}[/red]")
+    if incremental and not cancelled and not local_git:
+        _record_progress(metadata, mode, pushed, failures + len(deferred))
 
-    shutil.rmtree(temp_dir, ignore_errors=True)
+    # The working copy is kept until the run fully succeeds, so a
+    # resumed run can retry failures against the same snapshot.
+    if cancelled:
+        console.print(
+            f"\n[yellow]Cancelled — continue with --resume {journal.run_id}[/yellow]"
+        )
+    elif failures:
+        console.print(
+            f"\n[yellow]{failures} file(s) failed — retry them with "
+            f"--resume {journal.run_id}[/yellow]"
+        )
+    elif unpublished:
+        what = "Branch not pushed" if local_git else "Pull request not opened"
+        console.print(
+            f"\n[yellow]{what} — retry later with --resume {journal.run_id}[/yellow]"
+        )
+    elif not deferred:
+        if local_git:
+            hint = git_source.cleanup(local_git)
+            if hint:
+                console.print(f"\n[green]{hint}[/green]")
+        journal.finish()
+
+    console.print()
+    for m, tier_sched in schedulers.items():
+        label = f"{m} " if len(schedulers) > 1 else ""
+        console.print(f"[dim]{label}{tier_sched.summary()}[/dim]")
+    if len(models) > 1:
+        console.print(f"[dim]{run['tier_stats'].summary()}[/dim]")
+    if run["budget"].limited:
+        console.print(f"[dim]{run['budget'].summary()}[/dim]")
+    if run["usage"].requests:
+        console.print(f"[dim]{run['usage'].summary()}[/dim]")
+    if run["cache"].enabled:
+        console.print(f"[dim]{run['cache'].summary()}[/dim]")
+    if http_cache.summary():
+        console.print(f"[dim]{http_cache.summary()}[/dim]")
+
+    if profile:
+        _report_profile(tracer, journal)
+
+    _notify(
+        "finished", run_id=journal.run_id, outcomes=dict(outcomes),
+        failures=failures, cancelled=cancelled,
+    )
 
-    console.print("\n[bold green]Job Complete[/bold green]")
+    if not cancelled:
+        console.print("\n[bold green]Job Complete[/bold green]")
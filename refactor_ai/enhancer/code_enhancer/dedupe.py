@@ -0,0 +1,142 @@
+import difflib
+import hashlib
+import os
+import posixpath
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from refactor_ai.enhancer.code_enhancer import patching
+
+# Similarity needed for a near-duplicate to reuse a sibling's edit.
+NEAR_THRESHOLD = 0.9
+
+# Tiny files are cheap to send and match each other too easily.
+NEAR_MIN_BYTES = 256
+
+# Bounds the pairwise comparisons inside one same-named group.
+NEAR_MAX_GROUP = 200
+
+
+def git_blob_sha(data: bytes) -> str:
+    """The SHA git (and the GitHub API) uses for a file's content."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _read_bytes(local_root: str, rel_path: str) -> Optional[bytes]:
+    try:
+        with open(os.path.join(local_root, rel_path), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _file_type(path: str) -> str:
+    """Lower-cased extension, or the whole name for files without one."""
+    name = posixpath.basename(path)
+    return posixpath.splitext(name)[1].lower() or name
+
+
+# =====================================================
+# GROUPING
+# =====================================================
+
+def group_exact(
+    paths: Sequence[str],
+    local_root: str,
+    blob_shas: Optional[Dict[str, str]] = None,
+) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Groups identical files of the same type by (extension, blob SHA);
+    the SHA comes from the loader metadata or is computed locally. An
+    empty `a.py` and an empty `b.json` stay apart, since the prompt and
+    validation depend on the file type. Returns the representatives, in
+    input order, and {representative: [identical copies]}.
+    """
+    blob_shas = blob_shas or {}
+    first: Dict[Tuple[str, str], str] = {}
+    reps: List[str] = []
+    copies: Dict[str, List[str]] = {}
+
+    for path in paths:
+        sha = blob_shas.get(path)
+        if sha is None:
+            data = _read_bytes(local_root, path)
+            sha = git_blob_sha(data) if data is not None else f"unreadable:{path}"
+
+        key = (_file_type(path), sha)
+        rep = first.get(key)
+        if rep is None:
+            first[key] = path
+            reps.append(path)
+        else:
+            copies.setdefault(rep, []).append(path)
+
+    return reps, copies
+
+
+def group_near(
+    paths: Sequence[str],
+    local_root: str,
+    threshold: float = NEAR_THRESHOLD,
+) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Clusters same-named files whose content is at least `threshold`
+    similar. Returns the representatives and {representative: [siblings]}.
+    """
+    by_name: Dict[str, List[str]] = {}
+    for path in paths:
+        by_name.setdefault(posixpath.basename(path), []).append(path)
+
+    siblings: Dict[str, List[str]] = {}
+    sibling_set = set()
+
+    for group in by_name.values():
+        if len(group) < 2 or len(group) > NEAR_MAX_GROUP:
+            continue
+
+        texts = {}
+        for path in group:
+            data = _read_bytes(local_root, path)
+            if data is not None and len(data) >= NEAR_MIN_BYTES:
+                texts[path] = data.decode("utf-8", "replace")
+
+        cluster_reps: List[str] = []
+        for path in group:
+            if path not in texts:
+                continue
+            for rep in cluster_reps:
+                m = difflib.SequenceMatcher(None, texts[rep], texts[path], autojunk=False)
+                if (
+                    m.real_quick_ratio() >= threshold
+                    and m.quick_ratio() >= threshold
+                    and m.ratio() >= threshold
+                ):
+                    siblings.setdefault(rep, []).append(path)
+                    sibling_set.add(path)
+                    break
+            else:
+                cluster_reps.append(path)
+
+    reps = [p for p in paths if p not in sibling_set]
+    return reps, siblings
+
+
+# =====================================================
+# EDIT TRANSFER
+# =====================================================
+
+def transfer_edit(rep_original: str, rep_new: str, sibling: str) -> Optional[str]:
+    """
+    Replays the representative's change on a near-duplicate as a
+    unified diff. Every hunk's context must appear verbatim in the
+    sibling, so lines where the two files differ are never overwritten.
+    Returns None when a hunk does not apply.
+    """
+    diff = "\n".join(difflib.unified_diff(
+        rep_original.splitlines(), rep_new.splitlines(), lineterm="", n=3,
+    ))
+    if not diff:
+        return sibling
+    try:
+        return patching.apply_unified_diff(sibling, diff, exact_only=True)
+    except patching.PatchError:
+        return None
@@ -0,0 +1,213 @@
+import fnmatch
+import math
+import os
+import posixpath
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Only the head of each file is inspected; that is enough for every check.
+SNIFF_BYTES = 64 * 1024
+
+BINARY_EXTENSIONS = (
+    ".png", ".jpg", ".jpeg", ".gif", ".ico", ".bmp", ".webp",
+    ".pdf", ".zip", ".gz", ".tar", ".jar", ".whl",
+    ".woff", ".woff2", ".ttf", ".otf", ".eot",
+    ".pyc", ".exe", ".dll", ".so", ".dylib", ".class", ".o", ".a",
+)
+
+LOCKFILE_NAMES = {
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "Cargo.lock", "poetry.lock", "Pipfile.lock", "composer.lock",
+    "Gemfile.lock", "go.sum", "mix.lock", "pubspec.lock", "uv.lock",
+}
+
+VENDOR_DIRS = {
+    "node_modules", "vendor", "third_party", "third-party",
+    "bower_components", "site-packages", ".venv", "venv", "Pods",
+}
+
+GENERATED_SUFFIXES = (
+    "_pb2.py", "_pb2_grpc.py", "_pb2.pyi",
+    ".pb.go", ".pb.cc", ".pb.h", ".pb.swift", ".pb.dart",
+    ".min.js", ".min.css", ".js.map", ".css.map",
+    ".designer.cs", ".g.dart", ".freezed.dart",
+)
+
+# Markers generators put in the first lines of their output.
+GENERATED_MARKERS = (
+    "@generated",
+    "do not edit",
+    "code generated by",
+    "auto-generated",
+    "autogenerated",
+    "automatically generated",
+    "generated by the protocol buffer compiler",
+)
+HEADER_LINES = 10
+
+# Minified: most of the text sits on very long lines.
+LONG_LINE = 500
+LONG_LINE_SHARE = 0.5
+
+# Bits per byte above which text is an embedded blob (base64, keys, data).
+ENTROPY_LIMIT = 5.6
+MIN_SNIFF_TEXT = 1024
+
+CATEGORIES = ("binary", "lockfile", "vendored", "generated", "minified", "data")
+
+
+# =====================================================
+# .gitattributes
+# =====================================================
+
+def _parse_gitattributes(text: str) -> List[Tuple[str, Dict[str, bool]]]:
+    """
+    Returns (pattern, {attribute: set?}) rules for the linguist
+    attributes; later rules override earlier ones, as in git.
+    """
+    rules = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        pattern, *attrs = line.split()
+        flags: Dict[str, bool] = {}
+        for attr in attrs:
+            name, _, value = attr.partition("=")
+            unset = name.startswith(("-", "!"))
+            name = name.lstrip("-!")
+            if name in ("linguist-generated", "linguist-vendored"):
+                flags[name] = not unset and value.lower() not in ("false", "0")
+
+        if flags:
+            rules.append((pattern, flags))
+    return rules
+
+
+def _attr_match(pattern: str, path: str) -> bool:
+    """Approximates gitattributes matching (no '/' = any directory)."""
+    if pattern.endswith("/**"):
+        prefix = pattern[:-3].lstrip("/")
+        return path.startswith(prefix + "/")
+    if "/" not in pattern.rstrip("/"):
+        return fnmatch.fnmatchcase(posixpath.basename(path), pattern)
+    pattern = pattern.lstrip("/").replace("**/", "*")
+    return fnmatch.fnmatchcase(path, pattern)
+
+
+# =====================================================
+# CONTENT HEURISTICS
+# =====================================================
+
+def _entropy(data: bytes) -> float:
+    counts = Counter(data)
+    total = len(data)
+    return -sum(c / total * math.log2(c / total) for c in counts.values())
+
+
+def _looks_minified(text: str) -> bool:
+    if len(text) < MIN_SNIFF_TEXT:
+        return False
+    long_chars = sum(len(l) for l in text.splitlines() if len(l) > LONG_LINE)
+    return long_chars / len(text) > LONG_LINE_SHARE
+
+
+def _has_generated_header(text: str) -> bool:
+    head = "\n".join(text.splitlines()[:HEADER_LINES]).lower()
+    return any(marker in head for marker in GENERATED_MARKERS)
+
+
+# =====================================================
+# FILTER
+# =====================================================
+
+class FileFilter:
+    """
+    Cheap local classification run before any model call.
+
+    `classify` returns the category a file is skipped for, or None when
+    it is worth sending. Path rules are checked first; the content is
+    only read for files that pass them.
+    """
+
+    def __init__(self, gitattributes: str = "", base_path: str = ""):
+        self.rules = _parse_gitattributes(gitattributes)
+        self.base_path = base_path.strip("/")
+
+    def _attributes(self, repo_path: str) -> Dict[str, bool]:
+        flags: Dict[str, bool] = {}
+        for pattern, rule_flags in self.rules:
+            if _attr_match(pattern, repo_path):
+                flags.update(rule_flags)
+        return flags
+
+    def classify_path(self, rel_path: str) -> Optional[str]:
+        name = posixpath.basename(rel_path)
+        lower = name.lower()
+
+        if lower.endswith(BINARY_EXTENSIONS):
+            return "binary"
+        if name in LOCKFILE_NAMES or lower.endswith(".lock"):
+            return "lockfile"
+        if any(part in VENDOR_DIRS for part in rel_path.split("/")[:-1]):
+            return "vendored"
+        if lower.endswith(GENERATED_SUFFIXES):
+            return "generated"
+
+        repo_path = posixpath.join(self.base_path, rel_path) if self.base_path else rel_path
+        flags = self._attributes(repo_path)
+        if flags.get("linguist-vendored"):
+            return "vendored"
+        if flags.get("linguist-generated"):
+            return "generated"
+
+        return None
+
+    def classify_content(self, data: bytes) -> Optional[str]:
+        if b"\0" in data:
+            return "binary"
+        try:
+            text = data.decode("utf-8")
+        except UnicodeDecodeError as e:
+            # A cut multi-byte character at the sniff boundary is fine.
+            if e.start < len(data) - 3:
+                return "binary"
+            text = data[:e.start].decode("utf-8")
+
+        if _has_generated_header(text):
+            return "generated"
+        if _looks_minified(text):
+            return "minified"
+        if len(data) >= MIN_SNIFF_TEXT and _entropy(data) > ENTROPY_LIMIT:
+            return "data"
+        return None
+
+    def classify(self, rel_path: str, local_root: str) -> Optional[str]:
+        category = self.classify_path(rel_path)
+        if category:
+            return category
+
+        try:
+            with open(os.path.join(local_root, rel_path), "rb") as f:
+                data = f.read(SNIFF_BYTES)
+        except OSError:
+            return "binary"
+
+        return self.classify_content(data)
+
+    def partition(
+        self,
+        paths: Sequence[str],
+        local_root: str,
+    ) -> Tuple[List[str], Dict[str, List[str]]]:
+        """Splits paths into (kept, {category: skipped paths})."""
+        kept: List[str] = []
+        skipped: Dict[str, List[str]] = {}
+        for path in paths:
+            category = self.classify(path, local_root)
+            if category is None:
+                kept.append(path)
+            else:
+                skipped.setdefault(category, []).append(path)
+        return kept, skipped
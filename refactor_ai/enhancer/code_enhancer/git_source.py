@@ -0,0 +1,286 @@
+"""
+Local git sources: an existing checkout or any git remote (file://,
+ssh://, user@host:path, ...) instead of a GitHub URL. Files are read
+from a working tree and results are committed to a local branch, so
+nothing goes through the GitHub API.
+
+* A checkout gets a separate worktree on a new branch; the user's own
+  working tree and current branch are never touched.
+* A remote is cloned shallow (one commit, one branch). With a
+  `remote//sub/folder` suffix the clone is also partial and sparse, so
+  only that folder's blobs are fetched. Its branch is pushed once, at
+  the end of the run.
+"""
+
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from refactor_ai.github_manager.repo_files_loader import _build_tree_string
+from refactor_ai.github_manager.utils import standard_response
+
+# Results of run <id> are committed to BRANCH_PREFIX + <id>.
+BRANCH_PREFIX = "refactor-ai/"
+
+# Used only when git has no user.name / user.email configured.
+FALLBACK_AUTHOR = ("RefactorAI", "refactor-ai@localhost")
+
+# Tracked entries that are not regular files: symlinks and submodules.
+SKIPPED_MODES = {"120000", "160000"}
+
+_REMOTE_RE = re.compile(r"^(?:file|ssh|git|git\+ssh|https?)://|^[\w.-]+@[\w.-]+:")
+
+
+def is_git_source(target: str) -> bool:
+    """
+    True for a local path or a git remote (file://, ssh://, git://,
+    user@host:path, or any URL ending in .git). Plain GitHub web URLs
+    are False and keep going through the GitHub API.
+    """
+    remote, _ = _split_subdir(target)
+    if remote.rstrip("/").endswith(".git"):
+        return True
+    if _REMOTE_RE.match(remote):
+        return not remote.startswith(("http://", "https://"))
+    return os.path.exists(os.path.expanduser(target))
+
+
+def _split_subdir(target: str) -> Tuple[str, str]:
+    """Splits `remote//sub/folder` into the remote and the folder."""
+    scheme, sep, rest = target.partition("://")
+    if not sep:
+        scheme, rest = "", target
+    remote, _, subdir = rest.partition("//")
+    return (f"{scheme}://{remote}" if sep else remote), subdir.strip("/")
+
+
+def _repo_name(remote: str) -> str:
+    name = remote.rstrip("/").rsplit("/", 1)[-1].rsplit(":", 1)[-1]
+    return name[:-4] if name.endswith(".git") else name
+
+
+# =====================================================
+# WORKING TREE
+# =====================================================
+
+def prepare(target: str, work_dir: str, run_id: str, metadata_path: str) -> Dict[str, Any]:
+    """
+    Creates the working tree for a run on branch BRANCH_PREFIX + run_id
+    and writes the same metadata as repo_files_loader.download_repo_content.
+    """
+    # GitPython is imported on first use, like the other heavy modules.
+    import git
+
+    branch = BRANCH_PREFIX + run_id
+    local = os.path.abspath(os.path.expanduser(target))
+
+    try:
+        if os.path.exists(local):
+            checkout = git.Repo(local, search_parent_directories=True)
+            root = checkout.working_tree_dir
+            base_path = os.path.relpath(local, root)
+            base_path = "" if base_path == "." else base_path.replace(os.sep, "/")
+            source_branch = "HEAD" if checkout.head.is_detached else checkout.active_branch.name
+            checkout.git.worktree("add", "-b", branch, work_dir, "HEAD")
+            kind, name = "checkout", os.path.basename(root)
+        else:
+            remote, base_path = _split_subdir(target)
+            options = ["--depth=1", "--single-branch", "--no-tags"]
+            if base_path:
+                options += ["--filter=blob:none", "--sparse"]
+            clone = git.Repo.clone_from(remote, work_dir, multi_options=options)
+            if base_path:
+                clone.git.sparse_checkout("set", base_path)
+            source_branch = clone.active_branch.name
+            clone.git.checkout("-b", branch)
+            # A single-branch clone only tracks the source branch; track the
+            # run's branch too so @{upstream} resolves after the push.
+            clone.git.remote("set-branches", "--add", "origin", branch)
+            kind, name = "clone", _repo_name(remote)
+
+        work = git.Repo(work_dir)
+        files, blob_shas = _tracked_files(work, base_path)
+
+        try:
+            gitattributes = work.git.show("HEAD:.gitattributes")
+        except git.GitCommandError:
+            gitattributes = ""
+
+        local_root = os.path.join(work_dir, base_path) if base_path else work_dir
+        metadata = {
+            "source_url": target,
+            "repo_name": name,
+            "branch": branch,
+            "commit_sha": work.head.commit.hexsha,
+            "changed_since": None,
+            "base_path": base_path,
+            "metadata_scope": "current",
+            "structure_tree": _build_tree_string(files, root_name=os.path.basename(local_root)),
+            "downloaded_files": files,
+            "blob_shas": blob_shas,
+            "repo_all_files": files,
+            "gitattributes": gitattributes,
+            "local_root": local_root,
+            # Local git source details (see code_enhancer._handle_result)
+            "source": "git",
+            "source_kind": kind,
+            "source_branch": source_branch,
+            "work_tree": work_dir,
+        }
+
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f, indent=4)
+
+        return standard_response(
+            "success",
+            f"Checked out {len(files)} files on {branch}.",
+            {
+                "local_path": local_root,
+                "metadata": metadata_path,
+                "download_count": len(files),
+                "total_scope_count": len(files),
+            }
+        )
+    except Exception as e:
+        return standard_response("error", f"Could not prepare git source: {str(e)}")
+
+
+def _tracked_files(work, base_path: str) -> Tuple[List[str], Dict[str, str]]:
+    """Regular files under `base_path` (relative to it) and their blob SHAs, from the index."""
+    prefix = f"{base_path}/" if base_path else ""
+    files = []
+    blob_shas = {}
+
+    for line in work.git.ls_files("-s", "--", base_path or ".").splitlines():
+        info, _, path = line.partition("\t")
+        mode, sha, _ = info.split(" ", 2)
+        if mode in SKIPPED_MODES or not path.startswith(prefix):
+            continue
+        rel_path = path[len(prefix):]
+        files.append(rel_path)
+        blob_shas[rel_path] = sha
+
+    return files, blob_shas
+
+
+# =====================================================
+# COMMITS
+# =====================================================
+
+def _author(work) -> Dict[str, str]:
+    """Commit identity overrides, only when git has none configured."""
+    reader = work.config_reader()
+    if reader.has_option("user", "name") and reader.has_option("user", "email"):
+        return {}
+    name, email = FALLBACK_AUTHOR
+    return {
+        "GIT_AUTHOR_NAME": name, "GIT_AUTHOR_EMAIL": email,
+        "GIT_COMMITTER_NAME": name, "GIT_COMMITTER_EMAIL": email,
+    }
+
+
+def commit_file(metadata: Dict[str, Any], repo_path: str, content: str, message: str) -> Dict[str, Any]:
+    """Writes one file into the working tree and commits it on the run's branch."""
+    import git
+
+    try:
+        work = git.Repo(metadata["work_tree"])
+        local_path = os.path.join(metadata["work_tree"], repo_path)
+        with open(local_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+        work.git.add("--", repo_path)
+        work.git.commit("-m", message, "--", repo_path, env=_author(work))
+
+        return standard_response(
+            "success",
+            f"Committed {repo_path} on {metadata['branch']}.",
+            {"commit_sha": work.head.commit.hexsha}
+        )
+    except Exception as e:
+        return standard_response("error", f"Commit failed: {str(e)}")
+
+
+def recently_changed_files(metadata: Dict[str, Any], max_commits: int = 50) -> Dict[str, Any]:
+    """Same as branch_ops.recently_changed_files, from the local history."""
+    import git
+
+    try:
+        work = git.Repo(metadata["work_tree"])
+        log = work.git.log(f"-{max_commits}", "--format=@%ct", "--name-only")
+
+        changed: Dict[str, float] = {}
+        when = 0.0
+        for line in log.splitlines():
+            if line.startswith("@"):
+                when = float(line[1:])
+            elif line:
+                changed.setdefault(line, when)
+
+        return standard_response(
+            "success",
+            f"{len(changed)} files changed in the last {max_commits} commits.",
+            {"paths": changed}
+        )
+    except Exception as e:
+        return standard_response("error", f"Failed to read commit history: {str(e)}")
+
+
+# =====================================================
+# PUBLISHING
+# =====================================================
+
+def unpushed_commits(metadata: Dict[str, Any]) -> int:
+    """Commits on the run's branch not yet on its remote (clones only)."""
+    import git
+
+    if metadata.get("source_kind") != "clone":
+        return 0
+    work = git.Repo(metadata["work_tree"])
+    try:
+        base = work.git.rev_parse("--verify", "--quiet", "@{upstream}")
+    except git.GitCommandError:
+        base = metadata["commit_sha"]
+    return int(work.git.rev_list("--count", f"{base}..HEAD"))
+
+
+def push(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Pushes the run's branch to the cloned remote in one push."""
+    import git
+
+    try:
+        work = git.Repo(metadata["work_tree"])
+        work.git.push("--set-upstream", "origin", metadata["branch"])
+        return standard_response(
+            "success",
+            f"Pushed {metadata['branch']} to {work.remotes.origin.url}.",
+            {"branch": metadata["branch"]}
+        )
+    except Exception as e:
+        return standard_response("error", f"Push failed: {str(e)}")
+
+
+def cleanup(metadata: Dict[str, Any]) -> Optional[str]:
+    """
+    Removes a checkout's extra worktree once the run is complete; the
+    branch and its commits stay in the checkout. Returns a hint for
+    publishing the branch, if there is something to do by hand.
+    """
+    import git
+
+    if metadata.get("source_kind") != "checkout":
+        return None
+
+    work = git.Repo(metadata["work_tree"])
+    main = git.Repo(work.common_dir, search_parent_directories=True)
+    commits = int(work.git.rev_list("--count", f"{metadata['commit_sha']}..HEAD"))
+    main.git.worktree("remove", "--force", metadata["work_tree"])
+
+    if not commits:
+        main.git.branch("-D", metadata["branch"])
+        return None
+    return (
+        f"{commits} commit(s) on branch {metadata['branch']} in {main.working_tree_dir} "
+        f"— publish with 'git push <remote> {metadata['branch']}'"
+    )
@@ -0,0 +1,201 @@
+import json
+import os
+import secrets
+import shutil
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from refactor_ai.configuration_manager import secrets_manager
+from refactor_ai.configuration_manager.secrets_manager import CONFIG_DIR
+
+# One directory per run: the append-only journal plus the downloaded files.
+RUNS_DIR = CONFIG_DIR / "runs"
+
+JOURNAL_NAME = "journal.jsonl"
+
+# File states that need no further work on resume.
+DONE_STATES = {"committed", "declined", "unchanged", "skipped", "too_large"}
+
+# Enhanced but not pushed: replayed on resume without calling the model.
+REPLAY_STATES = {"changed", "push_failed"}
+
+# Runs older than this many days, and all but the newest KEEP_LAST, are
+# removed when a run starts; the "keep_days" and "keep_last" preferences
+# of "runs" change both.
+KEEP_DAYS = 14
+KEEP_LAST = 20
+
+# A run written to this recently may still be running, and is never pruned.
+ACTIVE_SECONDS = 3600
+
+
+def new_run_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+
+
+class RunJournal:
+    """
+    Append-only, fsync'd JSON-lines log of one enhancement run.
+
+    Every event is flushed to disk before the call returns, so after a
+    crash the journal shows exactly which files were downloaded,
+    enhanced (with their new content) and committed.
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.dir = RUNS_DIR / run_id
+        self.path = self.dir / JOURNAL_NAME
+        self.files_dir = self.dir / "files"
+        self._lock = threading.Lock()
+
+    @property
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def modified(self) -> float:
+        """When the journal was last written (0.0 if it was not)."""
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def size(self) -> int:
+        """Bytes on disk: the journal, metadata and working copy."""
+        total = 0
+        for root, _, files in os.walk(self.dir):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def append(self, event: str, **fields: Any) -> None:
+        record = {"event": event, "ts": time.time(), **fields}
+        line = json.dumps(record) + "\n"
+
+        with self._lock:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Reads all events; a torn last line (crash mid-write) is ignored."""
+        out = []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        out.append(json.loads(line))
+                    except ValueError:
+                        break
+        except OSError:
+            pass
+        return out
+
+    # -------------------------------------------------
+
+    def record_result(self, result: Dict[str, Any]) -> None:
+        """Logs an enhancement outcome; changed files keep their new content."""
+        fields = {"path": result["path"], "status": result["status"]}
+        if result["status"] == "changed":
+            fields.update(code=result["code"], message=result["message"])
+        elif result.get("message"):
+            fields["message"] = result["message"]
+        self.append("enhanced", **fields)
+
+    def state(self) -> Dict[str, Any]:
+        """
+        Folds the journal into the current run state:
+        start/download info plus the latest record for every file.
+        """
+        state: Dict[str, Any] = {"start": None, "download": None, "files": {}, "finished": False}
+
+        for ev in self.events():
+            kind = ev["event"]
+            if kind == "start":
+                state["start"] = ev
+            elif kind == "downloaded":
+                state["download"] = ev
+            elif kind == "enhanced":
+                state["files"][ev["path"]] = ev
+            elif kind in ("committed", "declined", "push_failed"):
+                entry = dict(state["files"].get(ev["path"], {}), **ev)
+                entry["status"] = kind
+                state["files"][ev["path"]] = entry
+            elif kind == "finished":
+                state["finished"] = True
+
+        return state
+
+    def drop_files(self) -> None:
+        """Removes the downloaded working copy; the journal stays."""
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+
+    def finish(self) -> None:
+        """Marks the run complete and drops the downloaded working copy."""
+        self.append("finished")
+        self.drop_files()
+
+
+def open_journal(run_id: Optional[str] = None) -> RunJournal:
+    """Returns the journal for `run_id`, or a fresh one for a new run."""
+    return RunJournal(run_id or new_run_id())
+
+
+
+def list_runs() -> List[RunJournal]:
+    """Every run with a journal, most recently written first."""
+    try:
+        names = os.listdir(RUNS_DIR)
+    except OSError:
+        return []
+    runs = [RunJournal(name) for name in names]
+    return sorted((r for r in runs if r.exists), key=lambda r: r.modified(), reverse=True)
+
+
+def prune_runs(
+    keep_days: Optional[float] = None,
+    keep_last: Optional[int] = None,
+    exclude: Iterable[str] = (),
+) -> Dict[str, List[str]]:
+    """
+    Removes runs older than `keep_days` or beyond the newest `keep_last`
+    (defaults: the "runs" preferences, else KEEP_DAYS / KEEP_LAST), and
+    the working copies nothing will read again: those of finished runs
+    and of runs whose download never completed. Runs in `exclude` and
+    runs written in the last ACTIVE_SECONDS are left alone.
+    Returns the IDs of the "removed" runs and of the "trimmed" ones.
+    """
+    if keep_days is None:
+        keep_days = secrets_manager.get_preference("runs", "keep_days")
+        keep_days = KEEP_DAYS if keep_days is None else float(keep_days)
+    if keep_last is None:
+        keep_last = secrets_manager.get_preference("runs", "keep_last")
+        keep_last = KEEP_LAST if keep_last is None else int(keep_last)
+
+    now = time.time()
+    skip = set(exclude)
+    removed: List[str] = []
+    trimmed: List[str] = []
+
+    for index, run in enumerate(list_runs()):
+        age = now - run.modified()
+        if run.run_id in skip or age < ACTIVE_SECONDS:
+            continue
+
+        if age > keep_days * 86400 or index >= keep_last:
+            shutil.rmtree(run.dir, ignore_errors=True)
+            removed.append(run.run_id)
+            continue
+
+        state = run.state()
+        if run.files_dir.exists() and (state["finished"] or not state["download"]):
+            run.drop_files()
+            trimmed.append(run.run_id)
+
+    return {"removed": removed, "trimmed": trimmed}
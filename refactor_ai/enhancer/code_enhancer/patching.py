@@ -0,0 +1,248 @@
+import difflib
+import re
+from typing import List, Optional, Tuple
+
+# Minimum similarity for a fuzzy (non-exact) context match.
+FUZZY_THRESHOLD = 0.9
+
+SEARCH_MARK = "<<<<<<< SEARCH"
+DIVIDER_MARK = "======="
+REPLACE_MARK = ">>>>>>> REPLACE"
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@", re.MULTILINE)
+
+
+class PatchError(ValueError):
+    """Raised when an edit does not apply; callers fall back to full-file mode."""
+
+
+# =====================================================
+# LOCATING CONTEXT
+# =====================================================
+
+def _norm(line: str) -> str:
+    return " ".join(line.split())
+
+
+def _find_block(
+    lines: List[str],
+    needle: List[str],
+    hint: Optional[int] = None,
+    exact_only: bool = False,
+) -> Optional[int]:
+    """
+    Finds where `needle` starts inside `lines`.
+
+    Tries, in order: exact match, whitespace-insensitive match and a
+    fuzzy match (difflib ratio >= FUZZY_THRESHOLD). When several exact
+    or normalised matches exist, the one closest to `hint` wins.
+    `exact_only` stops after the first step.
+    """
+    n = len(needle)
+    if n == 0 or n > len(lines):
+        return None
+
+    def _closest(candidates: List[int]) -> Optional[int]:
+        if not candidates:
+            return None
+        if hint is None:
+            return candidates[0] if len(candidates) == 1 else None
+        return min(candidates, key=lambda i: abs(i - hint))
+
+    exact = [i for i in range(len(lines) - n + 1) if lines[i:i + n] == needle]
+    found = _closest(exact)
+    if found is not None or exact or exact_only:
+        return found
+
+    norm_lines = [_norm(l) for l in lines]
+    norm_needle = [_norm(l) for l in needle]
+    loose = [
+        i for i in range(len(lines) - n + 1)
+        if norm_lines[i:i + n] == norm_needle
+    ]
+    found = _closest(loose)
+    if found is not None or loose:
+        return found
+
+    target = "\n".join(norm_needle)
+    best, best_ratio = None, 0.0
+    for i in range(len(lines) - n + 1):
+        matcher = difflib.SequenceMatcher(
+            None, "\n".join(norm_lines[i:i + n]), target, autojunk=False
+        )
+        # Cheap upper bounds first; the full ratio is expensive.
+        if matcher.real_quick_ratio() < FUZZY_THRESHOLD:
+            continue
+        if matcher.quick_ratio() < FUZZY_THRESHOLD:
+            continue
+        ratio = matcher.ratio()
+        if ratio > best_ratio:
+            best, best_ratio = i, ratio
+
+    return best if best_ratio >= FUZZY_THRESHOLD else None
+
+
+# =====================================================
+# SEARCH / REPLACE BLOCKS
+# =====================================================
+
+def parse_edit_blocks(text: str) -> List[Tuple[List[str], List[str]]]:
+    """Parses SEARCH/REPLACE blocks into (search_lines, replace_lines)."""
+    blocks = []
+    lines = text.splitlines()
+    i = 0
+
+    while i < len(lines):
+        if lines[i].strip() != SEARCH_MARK:
+            i += 1
+            continue
+
+        search, replace = [], []
+        i += 1
+        while i < len(lines) and lines[i].strip() != DIVIDER_MARK:
+            search.append(lines[i])
+            i += 1
+        i += 1
+        while i < len(lines) and lines[i].strip() != REPLACE_MARK:
+            replace.append(lines[i])
+            i += 1
+        if i >= len(lines):
+            raise PatchError("Unterminated SEARCH/REPLACE block.")
+        i += 1
+
+        blocks.append((search, replace))
+
+    return blocks
+
+
+def apply_edit_blocks(original: str, text: str) -> str:
+    """Applies SEARCH/REPLACE blocks to `original`, in order."""
+    blocks = parse_edit_blocks(text)
+    if not blocks and text.strip():
+        raise PatchError("No SEARCH/REPLACE blocks found.")
+
+    lines = original.splitlines()
+    cursor = 0
+
+    for search, replace in blocks:
+        if not search:
+            # An empty SEARCH appends to the end of the file.
+            lines.extend(replace)
+            continue
+
+        start = _find_block(lines, search, hint=cursor)
+        if start is None:
+            raise PatchError(f"SEARCH block not found: {search[0].strip()[:60]!r}")
+
+        lines[start:start + len(search)] = replace
+        cursor = start + len(replace)
+
+    return _join(lines, original)
+
+
+# =====================================================
+# UNIFIED DIFF
+# =====================================================
+
+def parse_unified_diff(text: str) -> List[Tuple[int, List[str], List[str]]]:
+    """
+    Parses hunks into (old_start_index, old_lines, new_lines).
+    The line counts of a hunk header are honoured, so a removed "-- x"
+    or an added "++ x" inside a hunk is not taken for a file header.
+    Past them, only a "--- " line followed by "+++ " is one; other lines
+    still count, since model-written counts are often off.
+    """
+    lines = text.splitlines()
+    hunks = []
+    current = None
+    old_left = new_left = 0
+    i = 0
+
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+
+        m = _HUNK_RE.match(line)
+        if m:
+            current = (int(m.group(1)) - 1, [], [])
+            hunks.append(current)
+            old_left, new_left = int(m.group(2) or 1), int(m.group(4) or 1)
+            continue
+        if current is None or line.startswith("\\ "):
+            continue
+        if (
+            old_left <= 0 and new_left <= 0
+            and line.startswith("--- ") and i < len(lines) and lines[i].startswith("+++ ")
+        ):
+            i += 1
+            continue
+
+        tag, body = (line[:1], line[1:]) if line else (" ", "")
+        if tag == " ":
+            current[1].append(body)
+            current[2].append(body)
+            old_left -= 1
+            new_left -= 1
+        elif tag == "-":
+            current[1].append(body)
+            old_left -= 1
+        elif tag == "+":
+            current[2].append(body)
+            new_left -= 1
+
+    return hunks
+
+
+def apply_unified_diff(original: str, text: str, exact_only: bool = False) -> str:
+    """
+    Applies a unified diff, locating each hunk by its context.
+    With `exact_only`, context must match verbatim.
+    """
+    hunks = parse_unified_diff(text)
+    if not hunks and text.strip():
+        raise PatchError("No diff hunks found.")
+
+    lines = original.splitlines()
+    offset = 0
+
+    for old_start, old_lines, new_lines in hunks:
+        if not old_lines:
+            pos = max(0, min(len(lines), old_start + 1 + offset))
+            lines[pos:pos] = new_lines
+            offset += len(new_lines)
+            continue
+
+        start = _find_block(lines, old_lines, hint=old_start + offset, exact_only=exact_only)
+        if start is None:
+            raise PatchError(f"Hunk at line {old_start + 1} does not apply.")
+
+        lines[start:start + len(old_lines)] = new_lines
+        offset += len(new_lines) - len(old_lines)
+
+    return _join(lines, original)
+
+
+# =====================================================
+# ENTRY POINT
+# =====================================================
+
+def _join(lines: List[str], original: str) -> str:
+    text = "\n".join(lines)
+    if original.endswith("\n"):
+        text += "\n"
+    return text
+
+
+def apply_response(original: str, payload: str, protocol: str) -> str:
+    """
+    Applies an edit payload produced under `protocol` ("edits" or
+    "diff"). Either format is accepted under both protocols, since
+    models occasionally answer with the other one.
+    """
+    if SEARCH_MARK in payload:
+        return apply_edit_blocks(original, payload)
+    if _HUNK_RE.search(payload):
+        return apply_unified_diff(original, payload)
+    if not payload.strip():
+        return original
+    raise PatchError(f"Response does not contain {protocol} output.")
@@ -0,0 +1,183 @@
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from rich.table import Table
+
+STAGES = ("download", "read", "queue", "provider", "ttft", "parse", "validate", "commit")
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+TOKEN_TAGS = ("input_tokens", "cached_tokens", "output_tokens")
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank quantile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class Tracer:
+    """
+    Records timed spans for one run.
+
+    Each span carries the stage name, its duration and tags (file,
+    provider, model, token counts). Spans are appended to a JSON-lines
+    trace as they finish. At the end of the run, percentiles per stage
+    are written as a Prometheus textfile and printed as a table.
+
+    A disabled tracer records nothing, so the instrumentation is free
+    when --profile is off.
+    """
+
+    def __init__(self, enabled: bool = False, trace_path: Optional[Path] = None):
+        self.enabled = enabled
+        self.trace_path = trace_path
+        self.spans: List[Dict[str, Any]] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+
+        if enabled and trace_path:
+            trace_path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(trace_path, "a", encoding="utf-8")
+
+    # -------------------------------------------------
+
+    @contextlib.contextmanager
+    def context(self, **tags: Any) -> Iterator[None]:
+        """Default tags (e.g. file=...) for spans in this thread."""
+        if not self.enabled:
+            yield
+            return
+        previous = getattr(self._local, "tags", {})
+        self._local.tags = dict(previous, **tags)
+        try:
+            yield
+        finally:
+            self._local.tags = previous
+
+    def record(self, stage: str, seconds: float, **tags: Any) -> None:
+        if not self.enabled:
+            return
+        span = {
+            "stage": stage,
+            "start": time.time() - seconds,
+            "seconds": seconds,
+            **getattr(self._local, "tags", {}),
+            **tags,
+        }
+        with self._lock:
+            self.spans.append(span)
+            if self._file:
+                self._file.write(json.dumps(span) + "\n")
+
+    @contextlib.contextmanager
+    def span(self, stage: str, **tags: Any) -> Iterator[Dict[str, Any]]:
+        """
+        Times the block. The yielded dict can be filled with tags that
+        are only known at the end (token counts, status).
+        """
+        extra: Dict[str, Any] = {}
+        if not self.enabled:
+            yield extra
+            return
+        started = time.perf_counter()
+        try:
+            yield extra
+        finally:
+            self.record(stage, time.perf_counter() - started, **tags, **extra)
+
+    # -------------------------------------------------
+
+    def _by_stage(self) -> Dict[str, List[float]]:
+        by_stage: Dict[str, List[float]] = {}
+        for span in self.spans:
+            by_stage.setdefault(span["stage"], []).append(span["seconds"])
+        for values in by_stage.values():
+            values.sort()
+        return by_stage
+
+    def _ordered_stages(self, by_stage: Dict[str, List[float]]) -> List[str]:
+        known = [s for s in STAGES if s in by_stage]
+        return known + sorted(s for s in by_stage if s not in STAGES)
+
+    def table(self) -> Table:
+        by_stage = self._by_stage()
+        table = Table(title="Run profile (seconds)")
+        table.add_column("Stage")
+        table.add_column("Count", justify="right")
+        for q in QUANTILES:
+            table.add_column(f"p{int(q * 100)}", justify="right")
+        table.add_column("Total", justify="right")
+
+        for stage in self._ordered_stages(by_stage):
+            values = by_stage[stage]
+            table.add_row(
+                stage,
+                str(len(values)),
+                *(f"{_quantile(values, q):.3f}" for q in QUANTILES),
+                f"{sum(values):.1f}",
+            )
+        return table
+
+    def prometheus(self) -> str:
+        """Per-stage summaries and token counters in text exposition format."""
+        by_stage = self._by_stage()
+        lines = [
+            "# HELP refactor_ai_stage_seconds Time spent per pipeline stage.",
+            "# TYPE refactor_ai_stage_seconds summary",
+        ]
+        for stage in self._ordered_stages(by_stage):
+            values = by_stage[stage]
+            for q in QUANTILES:
+                lines.append(
+                    f'refactor_ai_stage_seconds{{stage="{_label(stage)}",quantile="{q}"}} '
+                    f"{_quantile(values, q):.6f}"
+                )
+            lines.append(f'refactor_ai_stage_seconds_sum{{stage="{_label(stage)}"}} {sum(values):.6f}')
+            lines.append(f'refactor_ai_stage_seconds_count{{stage="{_label(stage)}"}} {len(values)}')
+
+        tokens: Dict[tuple, int] = {}
+        for span in self.spans:
+            for kind in TOKEN_TAGS:
+                if span.get(kind):
+                    key = (span.get("provider", ""), span.get("model", ""), kind)
+                    tokens[key] = tokens.get(key, 0) + int(span[kind])
+
+        lines += [
+            "# HELP refactor_ai_tokens_total Provider-reported tokens.",
+            "# TYPE refactor_ai_tokens_total counter",
+        ]
+        for (provider, model, kind), count in sorted(tokens.items()):
+            lines.append(
+                f'refactor_ai_tokens_total{{provider="{_label(provider)}",'
+                f'model="{_label(model)}",kind="{kind[:-len("_tokens")]}"}} {count}'
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        """Writes the textfile atomically, as node_exporter expects."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
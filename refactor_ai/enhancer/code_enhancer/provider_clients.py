@@ -0,0 +1,513 @@
+import atexit
+import importlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from refactor_ai.configuration_manager import secrets_manager
+
+# =====================================================
+# SHARED HTTP POOL
+# =====================================================
+
+# One keep-alive pool shared by every HTTP based SDK client, so TLS
+# sessions survive across files instead of being rebuilt per request.
+# SDK releases are built on httpx or on httpx2, so there is one pool
+# per library, with the same settings.
+HTTP_LIMITS = {
+    "max_connections": 64,
+    "max_keepalive_connections": 32,
+    "keepalive_expiry": 120.0,
+}
+
+HTTP_TIMEOUT = {"timeout": 300.0, "connect": 15.0}
+
+DEFAULT_MODELS = {
+    "google": "gemini-1.5-flash",
+    "openai": "gpt-4o",
+    "anthropic": "claude-3-5-sonnet-20240620",
+}
+
+# Longest reply requested from a provider's models; the provider's
+# "max_output_tokens" preference overrides it. Chunks and batches are
+# sized so that the enhanced code fits (see chunking.chunk_budget).
+# Anthropic rejects a max_tokens above the model's limit, so its default
+# is the 4096 that every Claude 3 model accepts.
+MAX_OUTPUT_TOKENS = {
+    "google": 8192,
+    "openai": 16384,
+    "anthropic": 4096,
+}
+
+# Models known to differ from their provider's default, by name prefix
+# (the longest matching prefix wins). claude-3-5-sonnet-20240620 only
+# allows 8192 with a beta header, which is not sent, so it is not listed.
+MODEL_OUTPUT_TOKENS = {
+    "claude-3-5-sonnet-20241022": 8192,
+    "claude-3-5-haiku": 8192,
+    "claude-3-7-sonnet": 8192,
+    "claude-sonnet-4": 8192,
+    "claude-opus-4": 8192,
+    "gpt-4o-2024-05-13": 4096,
+    "gpt-4-turbo": 4096,
+    "gpt-3.5-turbo": 4096,
+    "gemini-1.0-pro": 2048,
+}
+
+# The AI SDKs take seconds to import, so each is imported by its
+# adapter on first use; commands that never call a provider skip them.
+SDK_MODULES = {
+    "google": "google.generativeai",
+    "openai": "openai",
+    "anthropic": "anthropic",
+}
+
+# Gemini models cached per adapter; each (model, system prompt) pair is one.
+MAX_CACHED_MODELS = 16
+
+_http_clients: Dict[str, Any] = {}
+_adapters: Dict[str, "ProviderAdapter"] = {}
+_lock = threading.Lock()
+
+
+def _http_library(factory) -> Optional[Any]:
+    """
+    The HTTP library (httpx or httpx2) an SDK client class is built on,
+    read from the SDK's DefaultHttpxClient; None if it has none.
+    """
+    sdk = importlib.import_module(factory.__module__.split(".")[0])
+    default_client = getattr(sdk, "DefaultHttpxClient", None)
+    for base in getattr(default_client, "__mro__", ()):
+        if base.__name__ == "Client" and base.__module__.split(".")[0] in ("httpx", "httpx2"):
+            return importlib.import_module(base.__module__.split(".")[0])
+    return None
+
+
+def _shared_http_client(http) -> Any:
+    client = _http_clients.get(http.__name__)
+    if client is None:
+        client = http.Client(
+            limits=http.Limits(**HTTP_LIMITS),
+            timeout=http.Timeout(**HTTP_TIMEOUT),
+        )
+        _http_clients[http.__name__] = client
+    return client
+
+
+def _sdk_client(factory, **kwargs):
+    """
+    Builds an SDK client on the shared pool of the HTTP library it is
+    built on. An SDK that does not say which keeps its own pool, which
+    lives as long as the adapter.
+    """
+    http = _http_library(factory)
+    if http is None:
+        return factory(**kwargs)
+    return factory(http_client=_shared_http_client(http), **kwargs)
+
+
+def output_limit(provider: str, model: Optional[str] = None) -> int:
+    """
+    Output token limit for `model` of `provider` (None: its default
+    model): the provider's preference, else the model's known limit.
+    """
+    value = secrets_manager.get_preference(provider, "max_output_tokens")
+    if value:
+        return int(value)
+    name = model or DEFAULT_MODELS[provider]
+    prefixes = [p for p in MODEL_OUTPUT_TOKENS if name.startswith(p)]
+    if prefixes:
+        return MODEL_OUTPUT_TOKENS[max(prefixes, key=len)]
+    return MAX_OUTPUT_TOKENS[provider]
+
+
+# =====================================================
+# TOKEN USAGE
+# =====================================================
+
+USAGE_FIELDS = ("input_tokens", "cached_tokens", "cache_write_tokens", "output_tokens")
+
+
+def _add_usage(usage: Optional[Dict[str, int]], **counts: Any) -> None:
+    """Adds provider-reported token counts (None counts as 0) to `usage`."""
+    if usage is None:
+        return
+    for name, value in counts.items():
+        usage[name] = usage.get(name, 0) + int(value or 0)
+
+
+class UsageMeter:
+    """Thread-safe token totals for one run."""
+
+    def __init__(self):
+        self.totals = {name: 0 for name in USAGE_FIELDS}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def add(self, usage: Dict[str, int]) -> None:
+        with self._lock:
+            self.requests += 1
+            for name in USAGE_FIELDS:
+                self.totals[name] += usage.get(name, 0)
+
+    def summary(self) -> str:
+        t = self.totals
+        share = t["cached_tokens"] / t["input_tokens"] if t["input_tokens"] else 0.0
+        return (
+            f"tokens: {t['input_tokens']} in ({t['cached_tokens']} cached, {share:.0%}), "
+            f"{t['output_tokens']} out over {self.requests} requests"
+        )
+
+
+# =====================================================
+# ADAPTERS
+# =====================================================
+
+class ProviderAdapter:
+    """
+    Common interface over the provider SDKs.
+
+    An adapter is created once per process and reused by every worker
+    thread, so it must only hold thread-safe clients.
+
+    SDK-level retries are disabled: the scheduler owns retries so that
+    rate limits are handled in one place. `base_url` (from the provider's
+    "base_url" preference) points a client at a compatible or fake
+    endpoint.
+
+    `system` is the run's stable prefix (instructions + repo context)
+    and is sent first and byte-identical on every request, so provider
+    prompt caches can reuse it. When a `usage` dict is passed, the
+    provider-reported token counts are added to it.
+    """
+
+    name = ""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+
+    def model_name(self, model: Optional[str]) -> str:
+        return model or DEFAULT_MODELS[self.name]
+
+    def complete(
+        self,
+        model: Optional[str],
+        system: str,
+        user_prompt: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> str:
+        raise NotImplementedError
+
+    def stream(
+        self,
+        model: Optional[str],
+        system: str,
+        user_prompt: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> Iterator[str]:
+        """
+        Yields response text as it is generated. Closing the generator
+        early cancels the underlying HTTP response.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class OpenAIAdapter(ProviderAdapter):
+    name = "openai"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        super().__init__(api_key, base_url)
+        from openai import OpenAI
+
+        self.client = _sdk_client(
+            OpenAI,
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+        )
+
+    # Prefix caching is automatic for prompts over ~1k tokens; keeping
+    # the system message first and unchanged is all it takes.
+
+    @staticmethod
+    def _record(usage: Optional[Dict[str, int]], res_usage) -> None:
+        if res_usage is None:
+            return
+        details = getattr(res_usage, "prompt_tokens_details", None)
+        _add_usage(
+            usage,
+            input_tokens=res_usage.prompt_tokens,
+            cached_tokens=getattr(details, "cached_tokens", 0),
+            output_tokens=res_usage.completion_tokens,
+        )
+
+    def complete(
+        self,
+        model: Optional[str],
+        system: str,
+        user_prompt: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> str:
+        res = self.client.chat.completions.create(
+            model=self.model_name(model),
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user_prompt},
+            ],
+        )
+        self._record(usage, res.usage)
+        return res.choices[0].message.content
+
+    def stream(
+        self,
+        model: Optional[str],
+        system: str,
+        user_prompt: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> Iterator[str]:
+        res = self.client.chat.completions.create(
+            model=self.model_name(model),
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user_prompt},
+            ],
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        try:
+            for chunk in res:
+                # The final chunk carries usage and no choices.
+                if chunk.usage is not None:
+                    self._record(usage, chunk.usage)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            res.close()
+
+
+class AnthropicAdapter(ProviderAdapter):
+    name = "anthropic"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        super().__init__(api_key, base_url)
+        from anthropic import Anthropic
+
+        self.client = _sdk_client(
+            Anthropic,
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=0,
+        )
+        # The Messages API requires an explicit output limit, per model.
+        self._max_tokens: Dict[str, int] = {}
+
+    def max_tokens(self, model: Optional[str]) -> int:
+        name = self.model_name(model)
+        limit = self._max_tokens.get(name)
+        if limit is None:
+            limit = self._max_tokens[name] = output_limit(self.name, name)
+        return limit
+
+    @staticmethod
+    def _system_blocks(system: str):
+        # Marks the whole system prompt as a cache breakpoint.
+        return [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+
+    @staticmethod
+    def _record(usage: Optional[Dict[str, int]], res_usage) -> None:
+        cached = getattr(res_usage, "cache_read_input_tokens", 0) or 0
+        written = getattr(res_usage, "cache_creation_input_tokens", 0) or 0
+        # input_tokens only counts the uncached remainder.
+        _add_usage(
+            usage,
+            input_tokens=res_usage.input_tokens + cached + written,
+            cached_tokens=cached,
+            cache_write_tokens=written,
+            output_tokens=res_usage.output_tokens,
+        )
+
+    def complete(
+        self,
+        model: Optional[str],
+        system: str,
+        user_prompt: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> str:
+        res = self.client.messages.create(
+            model=self.model_name(model),
+            max_tokens=self.max_tokens(model),
+            system=self._system_blocks(system),
+            messages=[{"role": "user", "content": user_prompt}],
+        )
+        self._record(usage, res.usage)
+        return res.content[0].text
+
+    def stream(
+        self,
+        model: Optional[str],
+        system: str,
+        user_prompt: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> Iterator[str]:
+        with self.client.messages.stream(
+            model=self.model_name(model),
+            max_tokens=self.max_tokens(model),
+            system=self._system_blocks(system),
+            messages=[{"role": "user", "content": user_prompt}],
+        ) as res:
+            for text in res.text_stream:
+                yield text
+            self._record(usage, res.get_final_message().usage)
+
+
+class GoogleAdapter(ProviderAdapter):
+    name = "google"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        super().__init__(api_key, base_url)
+        import google.generativeai as genai
+
+        self.genai = genai
+        # genai keeps its configuration globally, so it is set exactly once.
+        if base_url:
+            genai.configure(
+                api_key=api_key,
+                transport="rest",
+                client_options={"api_endpoint": base_url},
+            )
+        else:
+            genai.configure(api_key=api_key)
+        self._models: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._models_lock = threading.Lock()
+
+    def _model(self, model: Optional[str], system: str):
+        # Least recently used models are dropped: every repo has its own
+        # system prompt, and a daemon serves many repos.
+        key = (self.model_name(model), system)
+        with self._models_lock:
+            m = self._models.get(key)
+            if m is None:
+                m = self.genai.GenerativeModel(model_name=key[0], system_instruction=system)
+                self._models[key] = m
+                if len(self._models) > MAX_CACHED_MODELS:
+                    self._models.popitem(last=False)
+            else:
+                self._models.move_to_end(key)
+            return m
+
+    # Gemini caches repeated prefixes implicitly; the system
+    # instruction is fixed per cached GenerativeModel.
+
+    @staticmethod
+    def _record(usage: Optional[Dict[str, int]], meta) -> None:
+        if meta is None:
+            return
+        _add_usage(
+            usage,
+            input_tokens=getattr(meta, "prompt_token_count", 0),
+            cached_tokens=getattr(meta, "cached_content_token_count", 0),
+            output_tokens=getattr(meta, "candidates_token_count", 0),
+        )
+
+    def complete(
+        self,
+        model: Optional[str],
+        system: str,
+        user_prompt: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> str:
+        res = self._model(model, system).generate_content(user_prompt)
+        self._record(usage, getattr(res, "usage_metadata", None))
+        return res.text
+
+    def stream(
+        self,
+        model: Optional[str],
+        system: str,
+        user_prompt: str,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> Iterator[str]:
+        res = self._model(model, system).generate_content(user_prompt, stream=True)
+        meta = None
+        for chunk in res:
+            # Usage is cumulative; the last chunk has the totals.
+            meta = getattr(chunk, "usage_metadata", None) or meta
+            if chunk.parts:
+                yield chunk.text
+        self._record(usage, meta)
+
+
+ADAPTERS = {
+    "google": GoogleAdapter,
+    "openai": OpenAIAdapter,
+    "anthropic": AnthropicAdapter,
+}
+
+
+# =====================================================
+# REGISTRY
+# =====================================================
+
+def get_adapter(provider: str) -> ProviderAdapter:
+    """
+    Returns the long-lived adapter for `provider`, creating it (and
+    reading its API key from the keychain) on first use only.
+    """
+    adapter = _adapters.get(provider)
+    if adapter is not None:
+        return adapter
+
+    with _lock:
+        adapter = _adapters.get(provider)
+        if adapter is not None:
+            return adapter
+
+        if provider not in ADAPTERS:
+            raise ValueError("Unknown provider")
+
+        api_key = secrets_manager.get_key(provider)
+        if not api_key:
+            raise ValueError(f"No API key for {provider}")
+
+        base_url = secrets_manager.get_preference(provider, "base_url")
+        adapter = ADAPTERS[provider](api_key, base_url)
+        _adapters[provider] = adapter
+        return adapter
+
+
+def preload_sdks() -> None:
+    """Imports every provider SDK up front (for long-lived processes)."""
+    for module in SDK_MODULES.values():
+        importlib.import_module(module)
+
+
+def refresh_adapters() -> None:
+    """
+    Drops adapters whose API key or base_url preference changed since
+    they were created; long-lived processes call this before each run.
+    """
+    with _lock:
+        for provider, adapter in list(_adapters.items()):
+            api_key = secrets_manager.get_key(provider)
+            base_url = secrets_manager.get_preference(provider, "base_url")
+            if (api_key, base_url) != (adapter.api_key, adapter.base_url):
+                adapter.close()
+                del _adapters[provider]
+
+
+def close_adapters() -> None:
+    """Drops all adapters and closes the shared HTTP pool."""
+    with _lock:
+        for adapter in _adapters.values():
+            adapter.close()
+        _adapters.clear()
+        for client in _http_clients.values():
+            client.close()
+        _http_clients.clear()
+
+
+atexit.register(close_adapters)
@@ -0,0 +1,32 @@
+import hashlib
+from typing import Optional
+
+from refactor_ai.configuration_manager.secrets_manager import CONFIG_DIR
+
+# Cached AI responses live next to the preferences file.
+CACHE_DIR = CONFIG_DIR / "cache" / "results"
+
+# Default size bound for the cache directory (can be overridden with
+# the "cache" -> "max_mb" preference).
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 hex digest of a text blob."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_key(
+    provider: str,
+    model: Optional[str],
+    mode: str,
+    prompt_hash: str,
+    file_hash: str,
+) -> str:
+    """
+    Builds the cache key for one AI request.
+    Any change to provider, model, mode, system prompt or file content
+    produces a new key, so stale results are never returned.
+    """
+    raw = "\n".join([provider, model or "", mode, prompt_hash, file_hash])
+    return content_hash(raw)
@@ -0,0 +1,50 @@
+import json
+import os
+from typing import Any, Dict, Optional
+
+from refactor_ai.configuration_manager.secrets_manager import CONFIG_DIR
+
+# Last enhanced commit per repo / branch / mode, for incremental runs.
+STATE_FILE = CONFIG_DIR / "run_state.json"
+
+
+def _state_key(repo_name: str, branch: str, mode: str, base_path: str = "") -> str:
+    key = f"{repo_name}@{branch}#{mode}"
+    return f"{key}:{base_path}" if base_path else key
+
+
+def _load() -> Dict[str, Any]:
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_last_sha(
+    repo_name: str,
+    branch: str,
+    mode: str,
+    base_path: str = "",
+) -> Optional[str]:
+    """Returns the commit SHA the last run of this mode enhanced, if any."""
+    entry = _load().get(_state_key(repo_name, branch, mode, base_path))
+    return entry.get("sha") if entry else None
+
+
+def save_last_sha(
+    repo_name: str,
+    branch: str,
+    mode: str,
+    sha: str,
+    base_path: str = "",
+) -> None:
+    """Records `sha` as fully enhanced (written atomically)."""
+    data = _load()
+    data[_state_key(repo_name, branch, mode, base_path)] = {"sha": sha}
+
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp, STATE_FILE)
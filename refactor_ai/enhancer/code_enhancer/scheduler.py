@@ -0,0 +1,252 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# How often a throttled request is retried before it is reported as failed.
+MAX_RETRIES = 6
+
+# Jittered exponential backoff when the provider gives no Retry-After.
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# Status codes / exception names that mean "slow down", not "broken".
+THROTTLE_STATUS = {429, 503, 529}
+THROTTLE_NAMES = {
+    "RateLimitError",
+    "OverloadedError",
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+}
+
+
+# =====================================================
+# ERROR INSPECTION
+# =====================================================
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def throttle_info(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    Returns (is_rate_limited, retry_after_seconds) for a provider error.
+    Works with the OpenAI/Anthropic status errors (status_code + httpx
+    response) and the google.api_core exceptions (code).
+    """
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if callable(status):
+        status = None
+
+    limited = status in THROTTLE_STATUS or type(error).__name__ in THROTTLE_NAMES
+    if not limited:
+        return False, None
+
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    retry_ms = headers.get("retry-after-ms")
+    if retry_ms:
+        seconds = _parse_retry_after(retry_ms)
+        return True, seconds / 1000.0 if seconds is not None else None
+
+    return True, _parse_retry_after(headers.get("retry-after"))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+# =====================================================
+# PRIMITIVES
+# =====================================================
+
+class TokenBucket:
+    """Refilling bucket of `per_minute` units (requests or tokens)."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Blocks until `amount` units are available; returns seconds waited."""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                delay = (amount - self.level) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def empty(self) -> None:
+        """Called after a 429: the provider says our budget is gone."""
+        with self._lock:
+            self._refill()
+            self.level = 0.0
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit adjusted with AIMD: +1 per window of successes,
+    halved on every throttle, never below 1 or above `maximum`.
+    """
+
+    def __init__(self, maximum: int):
+        self.maximum = max(1, maximum)
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool = False, success: bool = True) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+            elif success:
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+# =====================================================
+# SCHEDULER
+# =====================================================
+
+class ProviderScheduler:
+    """
+    Gatekeeper in front of one provider/model.
+
+    Every call waits for a concurrency slot, a request-per-minute token
+    and enough tokens-per-minute budget. Rate-limited calls honour
+    Retry-After (or back off with jitter) and are retried.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+    ):
+        self.limits = (max_concurrency, rpm, tpm)
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+        self.stats = {"requests": 0, "throttled": 0, "waited": 0.0}
+        self._lock = threading.Lock()
+
+    def _count(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[name] += amount
+
+    def _pause(self, seconds: float) -> None:
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def _wait_for_pause(self) -> None:
+        delay = self.paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+            self._count("waited", delay)
+
+    def call(self, fn: Callable[[], Any], tokens: int = 0) -> Any:
+        """Runs `fn` under the limits, retrying throttled attempts."""
+        for attempt in range(MAX_RETRIES + 1):
+            self._wait_for_pause()
+            self.limiter.acquire()
+
+            try:
+                waited = 0.0
+                if self.rpm:
+                    waited += self.rpm.acquire(1)
+                if self.tpm and tokens:
+                    waited += self.tpm.acquire(tokens)
+                if waited:
+                    self._count("waited", waited)
+
+                self._count("requests")
+                result = fn()
+
+            except Exception as e:
+                limited, retry_after = throttle_info(e)
+                self.limiter.release(throttled=limited, success=False)
+
+                if not limited or attempt == MAX_RETRIES:
+                    raise
+
+                self._count("throttled")
+                for bucket in (self.rpm, self.tpm):
+                    if bucket:
+                        bucket.empty()
+
+                delay = (
+                    retry_after + random.uniform(0, 0.5)
+                    if retry_after is not None
+                    else backoff_delay(attempt)
+                )
+                self._pause(delay)
+                continue
+
+            self.limiter.release()
+            return result
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"scheduler: {s['requests']} requests, {s['throttled']} throttled, "
+            f"{s['waited']:.1f}s waiting, concurrency {int(self.limiter.limit)}"
+            f"/{self.limiter.maximum}"
+        )
+
+
+_schedulers: Dict[Tuple[str, str], ProviderScheduler] = {}
+_registry_lock = threading.Lock()
+
+
+def get_scheduler(
+    provider: str,
+    model: Optional[str],
+    max_concurrency: int,
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+) -> ProviderScheduler:
+    """
+    Returns the process-wide scheduler for a provider/model pair, so all
+    runs (and all chunk/batch requests) share the same quota. When the
+    limits differ from the existing scheduler's (preferences changed
+    under a long-lived process), a new scheduler replaces it.
+    """
+    key = (provider, model or "")
+    with _registry_lock:
+        sched = _schedulers.get(key)
+        if sched is None or sched.limits != (max_concurrency, rpm, tpm):
+            sched = ProviderScheduler(max_concurrency, rpm=rpm, tpm=tpm)
+            _schedulers[key] = sched
+        return sched
@@ -0,0 +1,126 @@
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+CODE_START = "[CODE_START]"
+CODE_END = "[CODE_END]"
+COMMIT_MESSAGE = "[COMMIT_MESSAGE]"
+
+# A well-behaved response opens with [CODE_START] almost immediately.
+# If it has not shown up after this many characters the model is off
+# the rails and the rest of the generation is not worth paying for.
+DEFAULT_MAX_PREAMBLE = 2000
+
+
+class MalformedResponseError(ValueError):
+    """Raised when a streamed response cannot match the tag protocol."""
+
+
+class StreamingTagParser:
+    """
+    Incremental scanner for the [CODE_START] / [CODE_END] /
+    [COMMIT_MESSAGE] protocol.
+
+    Text is fed in as it arrives. Each tag is searched for only in the
+    new text plus a small overlap, so scanning stays linear in the
+    response size.
+    """
+
+    def __init__(self, max_preamble: int = DEFAULT_MAX_PREAMBLE):
+        self.max_preamble = max_preamble
+        self._parts = []
+        self._length = 0
+        self._tail = ""
+        self.positions: Dict[str, Optional[int]] = {
+            CODE_START: None,
+            CODE_END: None,
+            COMMIT_MESSAGE: None,
+        }
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def code_closed(self) -> bool:
+        return self.positions[CODE_END] is not None
+
+    def _next_tag(self) -> Optional[str]:
+        for tag in (CODE_START, CODE_END, COMMIT_MESSAGE):
+            if self.positions[tag] is None:
+                return tag
+        return None
+
+    def feed(self, chunk: str) -> None:
+        """Consumes one streamed chunk; raises MalformedResponseError early."""
+        if not chunk:
+            return
+
+        offset = self._length - len(self._tail)
+        window = self._tail + chunk
+
+        self._parts.append(chunk)
+        self._length += len(chunk)
+
+        # Tags must appear in protocol order; look for each in turn.
+        search_from = 0
+        tag = self._next_tag()
+        while tag is not None:
+            idx = window.find(tag, search_from)
+            if idx < 0:
+                break
+            self.positions[tag] = offset + idx
+            search_from = idx + len(tag)
+            tag = self._next_tag()
+
+        overlap = max(len(CODE_START), len(CODE_END), len(COMMIT_MESSAGE))
+        self._tail = window[-overlap:]
+
+        if (
+            self.positions[CODE_START] is None
+            and self._length > self.max_preamble
+        ):
+            raise MalformedResponseError(
+                f"No {CODE_START} within the first {self.max_preamble} characters."
+            )
+
+
+def consume_stream(
+    chunks: Iterable[str],
+    max_preamble: int = DEFAULT_MAX_PREAMBLE,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Drains a provider text stream through the tag parser.
+
+    Returns the full response text and timing stats:
+    ttft (seconds to first token), seconds, chars and chars_per_sec.
+    Closing the underlying stream on error is left to the generator's
+    own cleanup, which cancels the HTTP response.
+    """
+    parser = StreamingTagParser(max_preamble)
+    started = time.monotonic()
+    first_token: Optional[float] = None
+
+    iterator = iter(chunks)
+    try:
+        for chunk in iterator:
+            if chunk and first_token is None:
+                first_token = time.monotonic()
+            parser.feed(chunk)
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+    elapsed = time.monotonic() - started
+    text = parser.text
+
+    if parser.positions[CODE_START] is None:
+        raise MalformedResponseError(f"Missing {CODE_START} block.")
+
+    stats = {
+        "ttft": (first_token - started) if first_token is not None else elapsed,
+        "seconds": elapsed,
+        "chars": len(text),
+        "chars_per_sec": len(text) / elapsed if elapsed > 0 else 0.0,
+    }
+    return text, stats
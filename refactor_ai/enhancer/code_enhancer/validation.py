@@ -0,0 +1,191 @@
+import ast
+import atexit
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+# Optional parsers: files of a type whose parser is missing are not checked.
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+VALIDATION_WORKERS = min(4, os.cpu_count() or 1)
+
+
+# =====================================================
+# CHECKS (run in worker processes)
+# =====================================================
+
+def _signature(node: ast.AST) -> str:
+    """Parameter names, kinds and which have defaults; annotations ignored."""
+    a = node.args
+    positional = a.posonlyargs + a.args
+    first_default = len(positional) - len(a.defaults)
+
+    parts = []
+    for i, arg in enumerate(positional):
+        parts.append(arg.arg + ("=" if i >= first_default else ""))
+        if a.posonlyargs and i == len(a.posonlyargs) - 1:
+            parts.append("/")
+    if a.vararg:
+        parts.append(f"*{a.vararg.arg}")
+    elif a.kwonlyargs:
+        parts.append("*")
+    for arg, default in zip(a.kwonlyargs, a.kw_defaults):
+        parts.append(arg.arg + ("=" if default is not None else ""))
+    if a.kwarg:
+        parts.append(f"**{a.kwarg.arg}")
+
+    return f"({', '.join(parts)})"
+
+
+def _public_signatures(tree: ast.Module) -> Dict[str, str]:
+    """Public top-level functions and public methods (plus __init__) of top-level classes."""
+    funcs = (ast.FunctionDef, ast.AsyncFunctionDef)
+    out = {}
+
+    for node in tree.body:
+        if isinstance(node, funcs) and not node.name.startswith("_"):
+            out[node.name] = _signature(node)
+        elif isinstance(node, ast.ClassDef) and not node.name.startswith("_"):
+            for item in node.body:
+                if not isinstance(item, funcs):
+                    continue
+                if not item.name.startswith("_") or item.name == "__init__":
+                    out[f"{node.name}.{item.name}"] = _signature(item)
+
+    return out
+
+
+def _check_python(rel_path: str, original: str, new_code: str) -> Optional[str]:
+    try:
+        compile(new_code, rel_path, "exec", dont_inherit=True)
+        new_tree = ast.parse(new_code)
+    except (SyntaxError, ValueError) as e:
+        return f"{type(e).__name__}: {e}"
+
+    try:
+        old_sigs = _public_signatures(ast.parse(original))
+    except (SyntaxError, ValueError):
+        # Nothing to compare against if the original did not parse.
+        return None
+
+    new_sigs = _public_signatures(new_tree)
+    for name, sig in old_sigs.items():
+        if name not in new_sigs:
+            return f"Public function '{name}' was removed or renamed."
+        if new_sigs[name] != sig:
+            return f"Signature of '{name}' changed from {sig} to {new_sigs[name]}."
+
+    return None
+
+
+def validate(rel_path: str, original: str, new_code: str) -> Optional[str]:
+    """
+    Returns why `new_code` must not be pushed, or None if it passes.
+    Module-level so it can be sent to a worker process.
+    """
+    ext = os.path.splitext(rel_path)[1].lower()
+
+    if ext in (".py", ".pyi"):
+        return _check_python(rel_path, original, new_code)
+
+    try:
+        if ext == ".json":
+            json.loads(new_code)
+        elif ext in (".yaml", ".yml") and yaml is not None:
+            list(yaml.safe_load_all(new_code))
+        elif ext == ".toml" and tomllib is not None:
+            tomllib.loads(new_code)
+    except Exception as e:
+        return f"Invalid {ext[1:].upper()}: {e}"
+
+    return None
+
+
+# =====================================================
+# POOL
+# =====================================================
+
+class Validator:
+    """
+    Runs `validate` in a small process pool, so parsing large files does
+    not hold the GIL the enhancement threads need. Falls back to checking
+    in-process if the pool cannot be started or breaks.
+    """
+
+    def __init__(self, max_workers: int = VALIDATION_WORKERS):
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._broken = False
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        with self._lock:
+            if self._broken:
+                return None
+            if self._pool is None:
+                try:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                except (OSError, ValueError):
+                    self._broken = True
+            return self._pool
+
+    def check(self, rel_path: str, original: str, new_code: str) -> Optional[str]:
+        pool = self._get_pool()
+        if pool is not None:
+            try:
+                return pool.submit(validate, rel_path, original, new_code).result()
+            except (BrokenProcessPool, OSError):
+                with self._lock:
+                    self._broken = True
+        return validate(rel_path, original, new_code)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+_shared: Optional[Validator] = None
+_shared_lock = threading.Lock()
+
+
+def get_validator() -> Validator:
+    """
+    The process-wide validator. Its pool is started on first use and
+    stays warm across runs (e.g. jobs in `refactor serve`).
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Validator()
+        return _shared
+
+
+def close_validator() -> None:
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+            _shared = None
+
+
+atexit.register(close_validator)
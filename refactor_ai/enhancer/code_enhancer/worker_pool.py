@@ -0,0 +1,79 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+
+# =====================================================
+# PROVIDER CONCURRENCY CAPS
+# =====================================================
+
+# Conservative defaults for how many requests each provider
+# accepts at once. Can be overridden per provider with the
+# "max_concurrency" preference.
+PROVIDER_CONCURRENCY = {
+    "google": 4,
+    "openai": 8,
+    "anthropic": 4,
+}
+
+DEFAULT_CONCURRENCY = 2
+
+
+def provider_limit(provider: str, override: Optional[int] = None) -> int:
+    """Returns the concurrency cap for a provider (minimum 1)."""
+    limit = override or PROVIDER_CONCURRENCY.get(provider, DEFAULT_CONCURRENCY)
+    return max(1, int(limit))
+
+
+# =====================================================
+# ORDERED POOL
+# =====================================================
+
+def run_ordered(
+    items: Iterable[Any],
+    worker: Callable[[Any], Any],
+    max_workers: int = 1,
+) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    Runs `worker` over `items` on a bounded thread pool.
+
+    Yields (item, result, error) in the SAME order as `items`, so
+    console output stays deterministic. A failing item yields its
+    exception instead of stopping the pool.
+
+    At most 2 * max_workers items are in flight, which keeps memory
+    flat for very large repositories.
+    """
+    max_workers = max(1, int(max_workers))
+
+    if max_workers == 1:
+        for item in items:
+            try:
+                yield item, worker(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    window = max_workers * 2
+    pending: deque = deque()
+    source = iter(items)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+
+        def _fill():
+            while len(pending) < window:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    return
+                pending.append((item, pool.submit(worker, item)))
+
+        _fill()
+
+        while pending:
+            item, future = pending.popleft()
+            try:
+                yield item, future.result(), None
+            except Exception as e:
+                yield item, None, e
+            _fill()
@@ -1,12 +1,16 @@
+import os
 import typer
-from typing import Optional
+from typing import List, Optional
 
-from refactor_ai.enhancer.code_enhancer import code_enhancer
+from refactor_ai.daemon import terminal_controls as daemon_controls
+from refactor_ai.enhancer.code_enhancer import budget
 
 app = typer.Typer(help="Run AI-powered repository enhancement.")
 
 VALID_PROVIDERS = {"google", "openai", "anthropic"}
 
+VALID_PROTOCOLS = {"full", "edits", "diff"}
+
 
 # =====================================================
 # INTERNAL MODE RESOLVER
@@ -41,85 +45,234 @@ def _run_enhancement_command(
     enhance: bool,
     auto: bool,
     metadata_file: Optional[str],
+    workers: int = 1,
+    use_cache: bool = True,
+    refresh: bool = False,
+    stream: bool = False,
+    batch: bool = False,
+    protocol: str = "full",
+    incremental: bool = False,
+    resume: Optional[str] = None,
+    prefilter: bool = True,
+    max_tokens: Optional[int] = None,
+    max_cost: Optional[float] = None,
+    priority: Optional[List[str]] = None,
+    use_cascade: bool = False,
+    dedupe_near: bool = False,
+    profile: bool = False,
+    commit_batch: Optional[int] = None,
+    open_pr: bool = False,
+    use_daemon: bool = False,
 ):
-    """Unified enhancement runner."""
+    """
+    Unified enhancement runner. With --daemon, non-interactive (--auto)
+    runs go to a running 'refactor serve' daemon.
+    """
 
     if provider not in VALID_PROVIDERS:
         raise typer.BadParameter(f"Invalid provider: {provider}")
 
+    if workers < 1:
+        raise typer.BadParameter("--workers must be at least 1")
+
+    if protocol not in VALID_PROTOCOLS:
+        raise typer.BadParameter(f"Invalid protocol: {protocol} (use full, edits or diff)")
+
+    if max_tokens is not None and max_tokens < 1:
+        raise typer.BadParameter("--max-tokens must be positive")
+
+    if max_cost is not None and max_cost <= 0:
+        raise typer.BadParameter("--max-cost must be positive")
+
+    if commit_batch is not None and commit_batch < 1:
+        raise typer.BadParameter("--commit-batch must be at least 1")
+
+    error = budget.validate_priority(priority or [])
+    if error:
+        raise typer.BadParameter(error)
+
     mode = _resolve_mode(add_comments, improve_code, enhance)
 
-    code_enhancer.process_repo(
+    # A local checkout must resolve the same way inside the daemon.
+    if os.path.exists(repo_url):
+        repo_url = os.path.abspath(repo_url)
+
+    params = dict(
         provider=provider,
         repo_url=repo_url,
         mode=mode,
-        auto_commit=auto,
         metadata_file=metadata_file,
+        workers=workers,
+        use_cache=use_cache,
+        refresh=refresh,
+        stream=stream,
+        batch=batch,
+        protocol=protocol,
+        incremental=incremental,
+        resume=resume,
+        prefilter=prefilter,
+        max_tokens=max_tokens,
+        max_cost=max_cost,
+        priority=priority,
+        use_cascade=use_cascade,
+        dedupe_near=dedupe_near,
+        profile=profile,
+        commit_batch=commit_batch,
+        open_pr=open_pr,
     )
 
+    # Daemon jobs cannot prompt, so only --auto runs are sent there.
+    if auto and use_daemon:
+        job = daemon_controls.run_on_daemon(params)
+        if job is not None:
+            if job["state"] != "succeeded":
+                raise typer.Exit(1)
+            return
+
+    # Imported here: it pulls in the provider machinery, which other
+    # commands (and daemon submissions) do not need.
+    from refactor_ai.enhancer.code_enhancer import code_enhancer
+
+    code_enhancer.process_repo(auto_commit=auto, **params)
+
 
 # =====================================================
 # PROVIDER COMMANDS
 # =====================================================
 
-@app.command("google")
-def google_enhance(
-    repo_url: str = typer.Argument(..., help="GitHub repository URL"),
-    add_comments: bool = typer.Option(False, "--add-comments", help="Only add documentation"),
-    improve_code: bool = typer.Option(False, "--improve-code", help="Only improve code structure/performance"),
-    enhance: bool = typer.Option(True, "--enhance/--no-enhance", help="Full enhancement (default)"),
-    auto: bool = typer.Option(False, "--auto", help="Auto-commit all changes"),
-    metadata_file: Optional[str] = typer.Option(None, help="Custom metadata file"),
-):
-    """Use Google Gemini for enhancement."""
-    _run_enhancement_command(
-        "google",
-        repo_url,
-        add_comments,
-        improve_code,
-        enhance,
-        auto,
-        metadata_file,
-    )
+def _provider_command(provider: str, doc: str):
+    """
+    Builds the Typer command for one provider.
+    All providers share the same options, so they are declared once here.
+    """
 
+    def command(
+        repo_url: str = typer.Argument(..., help="GitHub repository URL, local checkout or git remote"),
+        add_comments: bool = typer.Option(False, "--add-comments", help="Only add documentation"),
+        improve_code: bool = typer.Option(False, "--improve-code", help="Only improve code structure/performance"),
+        enhance: bool = typer.Option(True, "--enhance/--no-enhance", help="Full enhancement (default)"),
+        auto: bool = typer.Option(False, "--auto", help="Auto-commit all changes"),
+        metadata_file: Optional[str] = typer.Option(None, help="Custom metadata file"),
+        workers: int = typer.Option(1, "--workers", "-w", help="Files processed in parallel (capped per provider)"),
+        use_cache: bool = typer.Option(True, "--cache/--no-cache", help="Reuse cached AI results for unchanged files"),
+        refresh: bool = typer.Option(False, "--refresh", help="Ignore cached results but store fresh ones"),
+        stream: bool = typer.Option(False, "--stream", help="Stream responses and abort malformed ones early"),
+        batch: bool = typer.Option(False, "--batch", help="Pack small files into shared requests"),
+        protocol: str = typer.Option("full", "--protocol", help="Response format: full, edits or diff"),
+        incremental: bool = typer.Option(False, "--incremental", help="Only enhance files changed since the last run"),
+        resume: Optional[str] = typer.Option(None, "--resume", help="Resume an interrupted run by its run ID"),
+        prefilter: bool = typer.Option(True, "--filter/--no-filter", help="Skip binary, vendored, generated and minified files"),
+        max_tokens: Optional[int] = typer.Option(None, "--max-tokens", help="Stop after this many tokens"),
+        max_cost: Optional[float] = typer.Option(None, "--max-cost", help="Stop after this many dollars"),
+        priority: Optional[List[str]] = typer.Option(None, "--priority", help="Order: size, -size, recent or glob:<pattern> (repeatable)"),
+        use_cascade: bool = typer.Option(False, "--cascade", help="Try a cheap model first, escalate on failure"),
+        dedupe_near: bool = typer.Option(False, "--dedupe-near", help="Reuse edits between near-identical files of the same name"),
+        profile: bool = typer.Option(False, "--profile", help="Record per-stage timings and print a latency report"),
+        commit_batch: Optional[int] = typer.Option(None, "--commit-batch", help="Commit accepted files N at a time on a new branch"),
+        open_pr: bool = typer.Option(False, "--pr", help="Commit on a new branch and open one pull request"),
+        use_daemon: bool = typer.Option(False, "--daemon/--no-daemon", help="Send --auto runs to a running 'refactor serve'"),
+    ):
+        _run_enhancement_command(
+            provider,
+            repo_url,
+            add_comments,
+            improve_code,
+            enhance,
+            auto,
+            metadata_file,
+            workers=workers,
+            use_cache=use_cache,
+            refresh=refresh,
+            stream=stream,
+            batch=batch,
+            protocol=protocol,
+            incremental=incremental,
+            resume=resume,
+            prefilter=prefilter,
+            max_tokens=max_tokens,
+            max_cost=max_cost,
+            priority=priority,
+            use_cascade=use_cascade,
+            dedupe_near=dedupe_near,
+            profile=profile,
+            commit_batch=commit_batch,
+            open_pr=open_pr,
+            use_daemon=use_daemon,
+        )
+
+    command.__doc__ = doc
+    command.__name__ = f"{provider}_enhance"
+    return command
+
+
+app.command("google")(_provider_command("google", "Use Google Gemini for enhancement."))
+app.command("openai")(_provider_command("openai", "Use OpenAI GPT for enhancement."))
+app.command("anthropic")(_provider_command("anthropic", "Use Anthropic Claude for enhancement."))
+
+
+# =====================================================
+# RUN HISTORY
+# =====================================================
+
+def _size_text(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
 
-@app.command("openai")
-def openai_enhance(
-    repo_url: str = typer.Argument(..., help="GitHub repository URL"),
-    add_comments: bool = typer.Option(False, "--add-comments", help="Only add documentation"),
-    improve_code: bool = typer.Option(False, "--improve-code", help="Only improve code structure/performance"),
-    enhance: bool = typer.Option(True, "--enhance/--no-enhance", help="Full enhancement (default)"),
-    auto: bool = typer.Option(False, "--auto", help="Auto-commit all changes"),
-    metadata_file: Optional[str] = typer.Option(None, help="Custom metadata file"),
-):
-    """Use OpenAI GPT for enhancement."""
-    _run_enhancement_command(
-        "openai",
-        repo_url,
-        add_comments,
-        improve_code,
-        enhance,
-        auto,
-        metadata_file,
-    )
 
+def _age_text(seconds: float) -> str:
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    if seconds < 86400:
+        return f"{seconds / 3600:.0f}h"
+    return f"{seconds / 86400:.0f}d"
 
-@app.command("anthropic")
-def anthropic_enhance(
-    repo_url: str = typer.Argument(..., help="GitHub repository URL"),
-    add_comments: bool = typer.Option(False, "--add-comments", help="Only add documentation"),
-    improve_code: bool = typer.Option(False, "--improve-code", help="Only improve code structure/performance"),
-    enhance: bool = typer.Option(True, "--enhance/--no-enhance", help="Full enhancement (default)"),
-    auto: bool = typer.Option(False, "--auto", help="Auto-commit all changes"),
-    metadata_file: Optional[str] = typer.Option(None, help="Custom metadata file"),
+
+@app.command("runs")
+def runs(
+    clean: bool = typer.Option(False, "--clean", help="Remove old runs and working copies nothing will resume"),
+    keep_days: Optional[float] = typer.Option(None, "--keep-days", help="With --clean: remove runs older than N days"),
+    keep_last: Optional[int] = typer.Option(None, "--keep-last", help="With --clean: keep only the newest N runs"),
 ):
-    """Use Anthropic Claude for enhancement."""
-    _run_enhancement_command(
-        "anthropic",
-        repo_url,
-        add_comments,
-        improve_code,
-        enhance,
-        auto,
-        metadata_file,
-    )
+    """List saved runs, or prune them with --clean."""
+    import time
+
+    from rich.console import Console
+    from rich.table import Table
+
+    from refactor_ai.enhancer.code_enhancer import journal as run_journal
+
+    console = Console()
+
+    if clean:
+        pruned = run_journal.prune_runs(keep_days=keep_days, keep_last=keep_last)
+        console.print(
+            f"[green]Removed {len(pruned['removed'])} run(s); "
+            f"dropped the working copies of {len(pruned['trimmed'])} more.[/green]"
+        )
+        return
+
+    table = Table(title=f"Runs in {run_journal.RUNS_DIR}")
+    for column in ("Run ID", "Repository", "Status", "Age", "Size"):
+        table.add_column(column)
+
+    now = time.time()
+    for run in run_journal.list_runs():
+        state = run.state()
+        if state["finished"]:
+            status = "[green]finished[/green]"
+        elif run.files_dir.exists():
+            status = "[yellow]resumable[/yellow]"
+        else:
+            status = "[dim]incomplete[/dim]"
+        table.add_row(
+            run.run_id,
+            (state["start"] or {}).get("repo_url") or "-",
+            status,
+            _age_text(now - run.modified()),
+            _size_text(run.size()),
+        )
+
+    console.print(table)
@@ -1,7 +1,15 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .utils import get_github_client, standard_response
 
-def create_branch(repo_name: str, new_branch: str, source_branch: str = "main") -> Dict[str, Any]:
+# The compare API lists at most this many files.
+COMPARE_FILE_LIMIT = 300
+
+def create_branch(
+    repo_name: str,
+    new_branch: str,
+    source_branch: str = "main",
+    source_sha: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Creates a new branch from a source branch.
     
@@ -9,20 +17,22 @@ def create_branch(repo_name: str, new_branch: str, source_branch: str = "main")
         repo_name: "owner/repo"
         new_branch: Name of the new branch (e.g., "feature/ai-fix")
         source_branch: The branch to copy from (default: "main")
+        source_sha: Start at this commit instead of the source branch head
     """
     try:
         g = get_github_client()
         repo = g.get_repo(repo_name)
         
         # Get the SHA of the source branch
-        source_sha = repo.get_branch(source_branch).commit.sha
+        if source_sha is None:
+            source_sha = repo.get_branch(source_branch).commit.sha
         
         # Create the new reference
         ref = repo.create_git_ref(ref=f"refs/heads/{new_branch}", sha=source_sha)
         
         return standard_response(
             "success", 
-            f"Branch '{new_branch}' created successfully from '{source_branch}'.",
+            f"Branch '{new_branch}' created successfully from '{source_branch}' ({source_sha[:7]}).",
             {"branch": new_branch, "sha": ref.object.sha}
         )
     except Exception as e:
@@ -41,4 +51,71 @@ def get_branch_info(repo_name: str, branch_name: str) -> Dict[str, Any]:
             {"name": branch.name, "sha": branch.commit.sha}
         )
     except Exception:
-        return standard_response("error", f"Branch '{branch_name}' not found.")
\ No newline at end of file
+        return standard_response("error", f"Branch '{branch_name}' not found.")
+
+def list_commits_between(repo_name: str, base_sha: str, head: str) -> Dict[str, Any]:
+    """Lists the commit SHAs reachable from `head` but not from `base_sha`."""
+    try:
+        g = get_github_client()
+        repo = g.get_repo(repo_name)
+        comparison = repo.compare(base_sha, head)
+        commits = [c.sha for c in comparison.commits]
+        
+        return standard_response(
+            "success",
+            f"{len(commits)} commits between {base_sha[:7]} and {head}.",
+            {
+                "status": comparison.status,
+                "head_sha": commits[-1] if commits else base_sha,
+                "commits": commits
+            }
+        )
+    except Exception as e:
+        return standard_response("error", f"Failed to compare commits: {str(e)}")
+
+def recently_changed_files(repo_name: str, branch: str, max_commits: int = 50) -> Dict[str, Any]:
+    """
+    Maps each path touched by the last `max_commits` commits on `branch`
+    to the timestamp of the newest commit that touched it.
+    
+    Commits are read newest first, one request each (commits never
+    change, so the HTTP cache answers repeat runs with 304s). A compare
+    over the whole range lists every touched path up front, so the walk
+    stops once each of them has its time; a compare at GitHub's 300-file
+    limit may be incomplete, and then every commit is read.
+    """
+    try:
+        g = get_github_client()
+        repo = g.get_repo(repo_name)
+        
+        commits = []
+        for commit in repo.get_commits(sha=branch):
+            commits.append(commit)
+            if len(commits) >= max_commits:
+                break
+        if not commits:
+            return standard_response("success", "No commits found.", {"paths": {}})
+        
+        # A root commit has no parent to compare from; read them all.
+        wanted = None
+        newest, oldest = commits[0], commits[-1]
+        if oldest.parents:
+            files = list(repo.compare(oldest.parents[0].sha, newest.sha).files)
+            if len(files) < COMPARE_FILE_LIMIT:
+                wanted = {f.filename for f in files}
+        
+        changed = {}
+        for commit in commits:
+            if wanted is not None and wanted.issubset(changed):
+                break
+            when = commit.commit.committer.date.timestamp()
+            for f in commit.files:
+                changed.setdefault(f.filename, when)
+        
+        return standard_response(
+            "success",
+            f"{len(changed)} files changed in the last {max_commits} commits.",
+            {"paths": changed}
+        )
+    except Exception as e:
+        return standard_response("error", f"Failed to read commit history: {str(e)}")
@@ -1,7 +1,44 @@
 from typing import Dict, Any, List
-from github import InputGitTreeElement
 from .utils import get_github_client, standard_response
 
+# Git modes of regular files; other entries (symlinks) are rewritten as files.
+FILE_MODES = ("100644", "100755")
+
+def _file_modes(repo, tree_sha: str, paths: List[str]) -> Dict[str, str]:
+    """
+    Git modes of `paths` in a tree: one recursive listing, walking down
+    folder by folder for files a truncated listing left out.
+    """
+    tree = repo.get_git_tree(tree_sha, recursive=True)
+    modes = {e.path: e.mode for e in tree.tree if e.type == "blob"}
+    if not tree.raw_data.get("truncated"):
+        return modes
+    
+    folders = {"": tree_sha}
+    listings = {}
+    for path in paths:
+        if path in modes:
+            continue
+        parts = path.split("/")
+        folder = ""
+        for depth, name in enumerate(parts):
+            sha = folders.get(folder)
+            if sha is None:
+                break
+            if folder not in listings:
+                listings[folder] = {e.path: e for e in repo.get_git_tree(sha).tree}
+            entry = listings[folder].get(name)
+            if entry is None:
+                break
+            child = f"{folder}/{name}" if folder else name
+            if depth == len(parts) - 1:
+                if entry.type == "blob":
+                    modes[path] = entry.mode
+            elif entry.type == "tree":
+                folders[child] = entry.sha
+            folder = child
+    return modes
+
 def commit_multiple_files(
     repo_name: str,
     file_changes: List[Dict[str, str]], 
@@ -13,36 +50,46 @@ def commit_multiple_files(
     
     Args:
         file_changes: List of dicts [{"path": "dir/file.py", "content": "print('hello')"}, ...]
+            An optional "mode" ("100644" or "100755") is used as given;
+            otherwise an existing file keeps its mode (e.g. the exec bit).
         branch: The branch name (must exist).
     """
     try:
+        from github import InputGitTreeElement
+        
         g = get_github_client()
         repo = g.get_repo(repo_name)
         
         # 1. Get the latest commit of the branch
         ref = repo.get_git_ref(f"heads/{branch}")
-        latest_commit_sha = ref.object.sha
-        base_tree = repo.get_git_commit(latest_commit_sha).tree
+        latest_commit = repo.get_git_commit(ref.object.sha)
+        base_tree = latest_commit.tree
+        
+        # 2. Read the current modes, unless every change brings its own
+        modes = {}
+        missing = [f["path"] for f in file_changes if not f.get("mode")]
+        if missing:
+            modes = _file_modes(repo, base_tree.sha, missing)
         
-        # 2. Create Tree Elements (The blobs)
+        # 3. Create Tree Elements (The blobs)
         element_list = []
         for file in file_changes:
-            # We use '100644' for file (blob), 'type'='blob'
+            mode = file.get("mode") or modes.get(file["path"])
             element = InputGitTreeElement(
                 path=file["path"],
-                mode='100644',
+                mode=mode if mode in FILE_MODES else '100644',
                 type='blob',
                 content=file["content"]
             )
             element_list.append(element)
             
-        # 3. Create a new Tree
+        # 4. Create a new Tree
         new_tree = repo.create_git_tree(element_list, base_tree)
         
-        # 4. Create the Commit linking to the new Tree
-        new_commit = repo.create_git_commit(message, new_tree, [repo.get_git_commit(latest_commit_sha)])
+        # 5. Create the Commit linking to the new Tree
+        new_commit = repo.create_git_commit(message, new_tree, [latest_commit])
         
-        # 5. Update the Branch Reference to point to new commit
+        # 6. Update the Branch Reference to point to new commit
         ref.edit(sha=new_commit.sha)
         
         return standard_response(
@@ -1,10 +1,10 @@
 import typer
 import os
 from rich.console import Console
-from typing import Optional
+from typing import List, Optional
 
 # Import the operations
-from . import repo_ops, create_ops, repo_files_loader
+from . import repo_ops, create_ops, repo_files_loader, http_cache
 from refactor_ai.help_docs import github_help
 
 app = typer.Typer(help="Manual GitHub controls (create repos, add files).")
@@ -74,7 +74,11 @@ def download(
     output_folder: str = typer.Argument(..., help="Local destination folder"),
     metadata_file: str = typer.Argument("repo_metadata.json", help="Metadata filename"),
     branch: Optional[str] = typer.Option(None, "--branch", help="Override branch (e.g. 'dev')"),
-    metadata_scope: str = typer.Option("current", "--metadata-scope", help="'current' (folder only) or 'all' (entire repo tree)")
+    metadata_scope: str = typer.Option("current", "--metadata-scope", help="'current' (folder only) or 'all' (entire repo tree)"),
+    engine: Optional[str] = typer.Option(None, "--engine", help="'archive' (one tarball request), 'tree' (parallel blob fetch) or 'contents' (one call per folder)"),
+    include: Optional[List[str]] = typer.Option(None, "--include", help="Only files matching this repo-relative glob (repeatable, e.g. 'services/foo/**/*.py')"),
+    max_size: Optional[int] = typer.Option(None, "--max-size", help="Skip files larger than this many KB"),
+    parallel: Optional[int] = typer.Option(None, "--parallel", help="Concurrent blob requests for the tree engine")
 ):
     """
     Download files from GitHub and generate AI context.
@@ -92,12 +96,22 @@ def download(
             output_folder=output_folder,
             metadata_filename=metadata_file,
             branch=branch,
-            metadata_scope=metadata_scope
+            metadata_scope=metadata_scope,
+            engine=engine,
+            include=include,
+            max_file_size=max_size * 1024 if max_size else None,
+            parallelism=parallel
         )
     
     if result["status"] == "success":
         console.print(f"[bold green]✔ Download Complete![/bold green]")
-        console.print(f"Downloaded: {result['data']['download_count']} files to [cyan]{result['data']['local_path']}[/cyan]")
+        console.print(f"Downloaded: {result['data']['download_count']} files to [cyan]{result['data']['local_path']}[/cyan] ({result['data']['engine']})")
+        if result['data']['skipped']:
+            console.print(f"[dim]Skipped by filters: {result['data']['skipped']} files[/dim]")
+        if result['data']['fallback']:
+            console.print(f"[yellow]{result['data']['fallback']}[/yellow]")
+        if http_cache.summary():
+            console.print(f"[dim]{http_cache.summary()}[/dim]")
         console.print(f"Total Context: {result['data']['total_scope_count']} files in metadata")
         console.print(f"Metadata File: [cyan]{result['data']['metadata']}[/cyan]")
     else:
@@ -0,0 +1,175 @@
+"""
+Persistent conditional-request cache for the PyGithub client.
+
+Successful GET responses that carry an ETag or Last-Modified header are
+kept on disk. Later requests for the same URL send If-None-Match /
+If-Modified-Since, and a 304 answer is served from the cache; GitHub
+does not count 304s against the rate limit. Entries are stored in a
+size-bounded LRU directory (see disk_cache.ResultCache).
+
+The "cache_mb" preference of "github" sets the bound (default 64 MB;
+0 disables the cache).
+"""
+
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from refactor_ai.configuration_manager import secrets_manager
+from refactor_ai.configuration_manager.secrets_manager import CONFIG_DIR
+from refactor_ai.configuration_manager.disk_cache import ResultCache
+
+CACHE_DIR = CONFIG_DIR / "cache" / "github"
+
+DEFAULT_MAX_MB = 64
+
+# Response headers that describe the transfer, not the resource.
+_HOP_HEADERS = {"content-length", "content-encoding", "transfer-encoding", "connection"}
+
+_lock = threading.Lock()
+_store: Optional[ResultCache] = None
+_sessions: Dict[Any, Any] = {}
+
+# Revalidated (304) and freshly fetched cacheable GET responses.
+stats = {"hits": 0, "misses": 0}
+
+
+def _count(name: str) -> None:
+    with _lock:
+        stats[name] += 1
+
+
+def _cache_key(url: str, headers: Dict[str, str]) -> str:
+    # The token is part of the key: another token may see other data.
+    auth = headers.get("Authorization") or headers.get("authorization") or ""
+    accept = headers.get("Accept") or headers.get("accept") or ""
+    raw = "\n".join(["GET", url, accept, hashlib.sha256(auth.encode("utf-8")).hexdigest()])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _CachedResponse:
+    """A stored 200 response, in the shape PyGithub reads responses."""
+
+    def __init__(self, entry: Dict[str, Any], fresh_headers: Dict[str, str]):
+        self.status = entry["status"]
+        # Rate-limit and date headers come from the 304 itself.
+        self.headers = dict(entry["headers"])
+        self.headers.update(
+            (k, v) for k, v in fresh_headers.items() if k.lower() not in _HOP_HEADERS
+        )
+        self._body = entry["body"]
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self._body
+
+    def iter_content(self, chunk_size: Optional[int] = 1):
+        data = self._body.encode("utf-8")
+        step = chunk_size or len(data) or 1
+        for i in range(0, len(data), step):
+            yield data[i:i + step]
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class _CachingConnection:
+    """
+    Mixed into PyGithub's requests-based connection classes.
+
+    PyGithub opens a new connection object per request once custom
+    classes are injected, so the requests session (and its keep-alive
+    pool) is shared per host instead.
+    """
+
+    def __init__(self, host: str, port: Optional[int] = None, **kwargs: Any):
+        super().__init__(host, port, **kwargs)
+        key = (self.protocol, host, self.port)
+        with _lock:
+            shared = _sessions.setdefault(key, self.session)
+        if shared is not self.session:
+            self.session.close()
+            self.session = shared
+
+    def getresponse(self):
+        if self.verb != "GET" or self.stream or _store is None:
+            return super().getresponse()
+
+        url = f"{self.protocol}://{self.host}:{self.port}{self.url}"
+        key = _cache_key(url, self.headers)
+        entry = _store.get(key)
+
+        if entry:
+            self.headers = dict(self.headers)
+            if entry.get("etag"):
+                self.headers["If-None-Match"] = entry["etag"]
+            elif entry.get("last_modified"):
+                self.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().getresponse()
+
+        if response.status == 304 and entry:
+            _count("hits")
+            return _CachedResponse(entry, dict(response.headers))
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status == 200 and (etag or last_modified):
+            _count("misses")
+            _store.put(key, {
+                "status": 200,
+                "headers": {k: v for k, v in response.headers.items() if k.lower() not in _HOP_HEADERS},
+                "body": response.read(),
+                "etag": etag,
+                "last_modified": last_modified,
+            })
+        return response
+
+    def close(self) -> None:
+        # The shared session outlives this connection object.
+        pass
+
+
+def install() -> bool:
+    """
+    Enables the cache for every PyGithub client created afterwards.
+    Returns False when the "cache_mb" preference disables it.
+    """
+    global _store
+
+    max_mb = secrets_manager.get_preference("github", "cache_mb")
+    max_mb = DEFAULT_MAX_MB if max_mb is None else int(max_mb)
+    if max_mb <= 0:
+        return False
+
+    with _lock:
+        if _store is not None:
+            return True
+        _store = ResultCache(root=CACHE_DIR, max_bytes=max_mb * 1024 * 1024)
+
+    from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+
+    class CachingHTTPConnection(_CachingConnection, HTTPRequestsConnectionClass):
+        pass
+
+    class CachingHTTPSConnection(_CachingConnection, HTTPSRequestsConnectionClass):
+        pass
+
+    Requester.injectConnectionClasses(CachingHTTPConnection, CachingHTTPSConnection)
+    return True
+
+
+def summary() -> Optional[str]:
+    """One-line hit-rate report, or None if no cacheable request was made."""
+    with _lock:
+        hits, misses = stats["hits"], stats["misses"]
+        evictions = _store.stats["evictions"] if _store else 0
+    lookups = hits + misses
+    if not lookups:
+        return None
+    return (
+        f"GitHub cache: {hits} not modified, {misses} fetched "
+        f"({100.0 * hits / lookups:.0f}% hit rate), {evictions} evictions"
+    )
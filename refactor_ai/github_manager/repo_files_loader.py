@@ -1,8 +1,34 @@
 import os
+import re
 import json
+import io
+import hashlib
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
-from typing import Dict, Any, List, Optional
-from .utils import get_github_client, standard_response
+from typing import Dict, Any, List, Optional, Tuple
+from refactor_ai.configuration_manager import secrets_manager
+from .utils import get_github_client, get_github_session, standard_response
+
+# Full downloads either stream the ref's tarball in one request
+# ("archive"), list the folder with one recursive tree call and fetch
+# the wanted blobs in parallel ("tree"), or walk the folders with one
+# contents call each ("contents"). The "download_engine" preference of
+# "github" picks the default.
+DOWNLOAD_ENGINES = ("archive", "tree", "contents")
+DEFAULT_ENGINE = "archive"
+
+ARCHIVE_CHUNK = 64 * 1024
+# (connect, read) timeout in seconds for archive and blob downloads.
+ARCHIVE_TIMEOUT = (10, 60)
+
+# Concurrent blob requests of the tree engine (the "download_parallelism"
+# preference of "github" overrides it).
+DEFAULT_PARALLELISM = 8
+
+# git mode of symbolic links; their "content" is the link target.
+SYMLINK_MODE = "120000"
 
 def parse_github_url(url: str) -> Dict[str, str]:
     """
@@ -39,6 +65,27 @@ def parse_github_url(url: str) -> Dict[str, str]:
         "path": path       # "" implies root
     }
 
+def resolve_repo_target(url: str, branch: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Resolves a GitHub URL to its repo name, branch (default branch if the
+    URL has none) and base path, without downloading anything.
+    """
+    try:
+        details = parse_github_url(url)
+        full_repo_name = f"{details['owner']}/{details['repo']}"
+        
+        resolved_branch = branch or details['branch']
+        if not resolved_branch:
+            resolved_branch = get_github_client().get_repo(full_repo_name).default_branch
+        
+        return standard_response(
+            "success",
+            f"Resolved {full_repo_name}@{resolved_branch}.",
+            {"repo_name": full_repo_name, "branch": resolved_branch, "base_path": details['path']}
+        )
+    except Exception as e:
+        return standard_response("error", f"Could not resolve repository: {str(e)}")
+
 def _build_tree_string(file_list: List[str], root_name: str = ".") -> str:
     """Generates a visual tree structure string."""
     tree_str = f"{root_name}/\n"
@@ -51,20 +98,291 @@ def _build_tree_string(file_list: List[str], root_name: str = ".") -> str:
         
     return tree_str
 
+# The compare API lists at most this many files; beyond it, diff the trees.
+COMPARE_FILE_LIMIT = 300
+
+def _changed_paths(repo, base_sha: str, head_sha: str) -> List[str]:
+    """
+    Lists files added or modified between two commits.
+    Uses the compare API, and falls back to diffing the two recursive
+    trees when the comparison is too large to be listed completely.
+    """
+    comparison = repo.compare(base_sha, head_sha)
+    
+    if comparison.status not in ("ahead", "identical"):
+        raise ValueError(f"Branch history diverged from {base_sha[:7]} ({comparison.status}).")
+    
+    files = list(comparison.files)
+    if len(files) < COMPARE_FILE_LIMIT:
+        return [f.filename for f in files if f.status != "removed"]
+    
+    old_tree = repo.get_git_tree(sha=base_sha, recursive=True)
+    new_tree = repo.get_git_tree(sha=head_sha, recursive=True)
+    old_blobs = {e.path: e.sha for e in old_tree.tree if e.type == "blob"}
+    
+    return [
+        e.path for e in new_tree.tree
+        if e.type == "blob" and old_blobs.get(e.path) != e.sha
+    ]
+
+def _glob_to_regex(pattern: str) -> "re.Pattern":
+    """
+    Compiles a path glob: `*` and `?` stay within one folder, `**`
+    spans folders (`a/**/*.py` also matches `a/x.py`).
+    """
+    out = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+class FileFilter:
+    """
+    Decides which files to download from their repo path and size,
+    before any content is fetched, and counts the ones it drops.
+    """
+    
+    def __init__(self, include: Optional[List[str]] = None, max_file_size: Optional[int] = None):
+        self.patterns = [_glob_to_regex(p.strip("/")) for p in include or []]
+        self.max_file_size = max_file_size
+        self.skipped = 0
+    
+    def __call__(self, path: str, size: Optional[int]) -> bool:
+        wanted = (
+            (not self.patterns or any(p.match(path) for p in self.patterns))
+            and (not self.max_file_size or size is None or size <= self.max_file_size)
+        )
+        if not wanted:
+            self.skipped += 1
+        return wanted
+
+def _local_rel_path(path: str, base_path: str) -> str:
+    """Path of a repo file relative to the downloaded folder."""
+    base = base_path.strip("/")
+    if not base:
+        return path
+    if path == base:
+        # The URL points at a single file
+        return os.path.basename(path)
+    return os.path.relpath(path, base)
+
+def _download_contents(repo, roots: List[Any], ref: str, base_path: str, target_dir: str, wanted: FileFilter) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Breadth-first walk with the contents API: one call per folder,
+    and the file bodies come with the listings of single files.
+    """
+    downloaded_files = []
+    blob_shas = {}
+    contents_queue = deque(roots)
+    
+    while contents_queue:
+        file_content = contents_queue.popleft()
+        
+        if file_content.type == "dir":
+            contents_queue.extend(repo.get_contents(file_content.path, ref=ref))
+        elif wanted(file_content.path, file_content.size):
+            rel_path = _local_rel_path(file_content.path, base_path)
+            
+            local_path = os.path.join(target_dir, rel_path)
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            
+            with open(local_path, "wb") as f:
+                f.write(file_content.decoded_content)
+            
+            downloaded_files.append(rel_path)
+            blob_shas[rel_path] = file_content.sha
+    
+    return downloaded_files, blob_shas
+
+def _download_archive(repo, ref: str, base_path: str, target_dir: str, wanted: FileFilter) -> Dict[str, Any]:
+    """
+    Streams the tarball of `ref` and extracts the files under
+    `base_path` as they arrive, so neither the archive nor a whole file
+    is held in memory. Blob SHAs are computed while writing, the same
+    way git does.
+    
+    Also returns every file path in the repo and the root
+    .gitattributes, which the archive carries anyway.
+    """
+    # Imported here: PyGithub already depends on it, and only this engine needs it.
+    import requests
+    
+    link = repo.get_archive_link("tarball", ref)
+    base = base_path.strip("/")
+    prefix = f"{base}/" if base else ""
+    
+    downloaded_files = []
+    blob_shas = {}
+    all_files = []
+    gitattributes = ""
+    
+    with requests.get(link, stream=True, timeout=ARCHIVE_TIMEOUT) as res:
+        res.raise_for_status()
+        
+        with tarfile.open(fileobj=res.raw, mode="r|gz") as archive:
+            for member in archive:
+                # Entries sit under a single "<owner>-<repo>-<sha>/" folder.
+                _, _, path = member.name.partition("/")
+                if not path or not (member.isfile() or member.issym()):
+                    continue
+                all_files.append(path)
+                
+                if not member.isfile():
+                    continue
+                
+                if path == base or path.startswith(prefix):
+                    rel_path = os.path.normpath(_local_rel_path(path, base))
+                else:
+                    rel_path = None
+                
+                source = archive.extractfile(member)
+                if path == ".gitattributes":
+                    data = source.read()
+                    gitattributes = data.decode("utf-8", "replace")
+                    source = io.BytesIO(data)
+                
+                if rel_path is None or os.path.isabs(rel_path) or rel_path.split(os.sep)[0] == "..":
+                    continue
+                if not wanted(path, member.size):
+                    continue
+                
+                local_path = os.path.join(target_dir, rel_path)
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+                
+                digest = hashlib.sha1(b"blob %d\0" % member.size)
+                with open(local_path, "wb") as f:
+                    for chunk in iter(lambda: source.read(ARCHIVE_CHUNK), b""):
+                        digest.update(chunk)
+                        f.write(chunk)
+                
+                downloaded_files.append(rel_path)
+                blob_shas[rel_path] = digest.hexdigest()
+    
+    return {
+        "downloaded_files": downloaded_files,
+        "blob_shas": blob_shas,
+        "all_files": all_files,
+        "gitattributes": gitattributes,
+    }
+
+def _list_subtree(repo, commit_sha: str, base_path: str) -> List[Dict[str, Any]]:
+    """
+    Every blob under `base_path` from one recursive tree listing (plus
+    one contents call to find the folder's tree SHA). Entry paths are
+    made relative to the repo root.
+    """
+    base = base_path.strip("/")
+    tree_sha = commit_sha
+    
+    if base:
+        parent = base.rpartition("/")[0]
+        listing = repo.get_contents(parent, ref=commit_sha)
+        listing = listing if isinstance(listing, list) else [listing]
+        entry = next((e for e in listing if e.path == base), None)
+        if entry is None:
+            raise ValueError(f"'{base}' not found at {commit_sha[:7]}.")
+        if entry.type != "dir":
+            return [{"path": entry.path, "sha": entry.sha, "size": entry.size}]
+        tree_sha = entry.sha
+    
+    tree = repo.get_git_tree(tree_sha, recursive=True)
+    if tree.raw_data.get("truncated"):
+        raise ValueError("the tree listing was truncated")
+    
+    prefix = f"{base}/" if base else ""
+    return [
+        {"path": prefix + e.path, "sha": e.sha, "size": e.size}
+        for e in tree.tree
+        if e.type == "blob" and e.mode != SYMLINK_MODE
+    ]
+
+def _download_tree(repo, commit_sha: str, base_path: str, target_dir: str, wanted: FileFilter, parallelism: int) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Lists the folder once, drops unwanted files by path and size, then
+    fetches the remaining blobs concurrently over one pooled session.
+    """
+    entries = [
+        e for e in _list_subtree(repo, commit_sha, base_path)
+        if wanted(e["path"], e["size"])
+    ]
+    return _fetch_blobs(repo, entries, base_path, target_dir, parallelism)
+
+def _fetch_blobs(repo, entries: List[Dict[str, Any]], base_path: str, target_dir: str, parallelism: int) -> Tuple[List[str], Dict[str, str]]:
+    """Downloads listed blobs (see _list_subtree) concurrently, by SHA."""
+    blobs_url = f"{repo.url}/git/blobs"
+    
+    def _fetch(entry: Dict[str, Any]) -> str:
+        rel_path = _local_rel_path(entry["path"], base_path)
+        local_path = os.path.join(target_dir, rel_path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        
+        with session.get(
+            f"{blobs_url}/{entry['sha']}",
+            headers={"Accept": "application/vnd.github.raw"},
+            stream=True,
+            timeout=ARCHIVE_TIMEOUT,
+        ) as res:
+            res.raise_for_status()
+            with open(local_path, "wb") as f:
+                for chunk in res.iter_content(ARCHIVE_CHUNK):
+                    f.write(chunk)
+        return rel_path
+    
+    session = get_github_session(pool_size=parallelism)
+    with session, ThreadPoolExecutor(max_workers=parallelism) as pool:
+        rel_paths = list(pool.map(_fetch, entries))
+    
+    return rel_paths, {rel: e["sha"] for rel, e in zip(rel_paths, entries)}
+
 def download_repo_content(
     url: str, 
     output_folder: str,
     metadata_filename: str = "repo_metadata.json",
     branch: Optional[str] = None,
-    metadata_scope: str = "current"
+    metadata_scope: str = "current",
+    changed_since: Optional[str] = None,
+    engine: Optional[str] = None,
+    include: Optional[List[str]] = None,
+    max_file_size: Optional[int] = None,
+    parallelism: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Downloads files and generates metadata.
+    
+    If `changed_since` is a commit SHA, only files changed between it
+    and the branch head are downloaded (incremental mode).
+    
+    `engine` ("archive", "tree" or "contents") selects how full downloads
+    are fetched; the first two fall back to the contents API on failure.
+    `include` globs (repo-relative, e.g. "services/foo/**/*.py") and
+    `max_file_size` (bytes) drop files before their content is fetched;
+    `parallelism` bounds the tree engine's concurrent blob requests.
     """
     try:
         client = get_github_client()
         details = parse_github_url(url)
         
+        engine = engine or secrets_manager.get_preference("github", "download_engine") or DEFAULT_ENGINE
+        if engine not in DOWNLOAD_ENGINES:
+            raise ValueError(f"Unknown download engine '{engine}' (use {', '.join(DOWNLOAD_ENGINES)}).")
+        
+        parallelism = parallelism or secrets_manager.get_preference("github", "download_parallelism") or DEFAULT_PARALLELISM
+        wanted = FileFilter(include, max_file_size)
+        
         full_repo_name = f"{details['owner']}/{details['repo']}"
         repo = client.get_repo(full_repo_name)
         
@@ -77,67 +395,95 @@ def download_repo_content(
         target_dir = os.path.abspath(output_folder)
         os.makedirs(target_dir, exist_ok=True)
         
-        # --- Download Logic ---
-        downloaded_files = []
-        contents_queue = []
+        # Every fetch below reads this commit, so a run sees one snapshot
+        # even if the branch moves meanwhile.
+        head_sha = repo.get_branch(details['branch']).commit.sha
         
-        root_contents = repo.get_contents(details['path'], ref=details['branch'])
+        # --- Download Logic ---
+        archive = None
+        scope_files = None
+        note = ""
         
-        if isinstance(root_contents, list):
-            contents_queue.extend(root_contents)
+        if changed_since:
+            # The full listing gives sizes for the filter and the
+            # complete tree for the metadata; only changed blobs are fetched.
+            changed = set(_changed_paths(repo, changed_since, head_sha))
+            listing = _list_subtree(repo, head_sha, details['path'])
+            scope_files = [_local_rel_path(e["path"], details['path']) for e in listing]
+            entries = [
+                e for e in listing
+                if e["path"] in changed and wanted(e["path"], e["size"])
+            ]
+            downloaded_files, blob_shas = _fetch_blobs(repo, entries, details['path'], target_dir, int(parallelism))
         else:
-            contents_queue.append(root_contents)
-            
-        while contents_queue:
-            file_content = contents_queue.pop(0)
+            downloaded_files = None
+            try:
+                if engine == "archive":
+                    archive = _download_archive(repo, head_sha, details['path'], target_dir, wanted)
+                    downloaded_files, blob_shas = archive["downloaded_files"], archive["blob_shas"]
+                elif engine == "tree":
+                    downloaded_files, blob_shas = _download_tree(repo, head_sha, details['path'], target_dir, wanted, int(parallelism))
+            except Exception as e:
+                note = f" ({engine} download unavailable: {e}; used the contents API)"
+                wanted.skipped = 0
             
-            if file_content.type == "dir":
-                contents_queue.extend(repo.get_contents(file_content.path, ref=details['branch']))
-            else:
-                if details['path']:
-                    rel_path = os.path.relpath(file_content.path, details['path'])
-                else:
-                    rel_path = file_content.path
-                
-                local_path = os.path.join(target_dir, rel_path)
-                os.makedirs(os.path.dirname(local_path), exist_ok=True)
-                
-                with open(local_path, "wb") as f:
-                    f.write(file_content.decoded_content)
-                
-                downloaded_files.append(rel_path)
+            if downloaded_files is None:
+                root_contents = repo.get_contents(details['path'], ref=head_sha)
+                roots = root_contents if isinstance(root_contents, list) else [root_contents]
+                downloaded_files, blob_shas = _download_contents(repo, roots, head_sha, details['path'], target_dir, wanted)
 
         # --- Metadata Logic ---
         files_for_tree = []
         tree_root_name = ""
         
-        if metadata_scope == "all":
+        if metadata_scope == "all" and archive is not None:
+            files_for_tree = archive["all_files"]
+            tree_root_name = f"{details['repo']} (Full Repo)"
+        elif metadata_scope == "all":
             try:
                 # Fetch FULL git tree
-                git_tree = repo.get_git_tree(sha=details['branch'], recursive=True)
+                git_tree = repo.get_git_tree(sha=head_sha, recursive=True)
                 files_for_tree = [e.path for e in git_tree.tree if e.type == 'blob']
                 tree_root_name = f"{details['repo']} (Full Repo)"
             except Exception:
-                files_for_tree = downloaded_files
+                files_for_tree = scope_files or downloaded_files
                 tree_root_name = f"{os.path.basename(target_dir)} (Partial)"
+        elif scope_files is not None:
+            # Incremental: the tree shows the whole scope, not just the changes
+            files_for_tree = scope_files
+            tree_root_name = os.path.basename(target_dir)
         else:
             files_for_tree = downloaded_files
             tree_root_name = os.path.basename(target_dir)
 
         tree_view = _build_tree_string(files_for_tree, root_name=tree_root_name)
         
+        # Root .gitattributes (linguist-generated / linguist-vendored rules)
+        if archive is not None:
+            gitattributes = archive["gitattributes"]
+        else:
+            try:
+                gitattributes = repo.get_contents(".gitattributes", ref=head_sha).decoded_content.decode("utf-8", "replace")
+            except Exception:
+                gitattributes = ""
+        
         metadata = {
             "source_url": url,
             "repo_name": full_repo_name,
             "branch": details['branch'],
+            "commit_sha": head_sha,
+            "changed_since": changed_since,
             "base_path": details['path'],
             "metadata_scope": metadata_scope,
             # Visual Tree
             "structure_tree": tree_view,
             # Files available locally in this folder
             "downloaded_files": downloaded_files,
+            # Git blob SHA per downloaded file (identical content = same SHA)
+            "blob_shas": blob_shas,
             # All files known in the scope (useful for AI context)
             "repo_all_files": files_for_tree,
+            "gitattributes": gitattributes,
             "local_root": target_dir
         }
         
@@ -147,12 +493,15 @@ def download_repo_content(
             
         return standard_response(
             "success",
-            f"Downloaded {len(downloaded_files)} files.",
+            f"Downloaded {len(downloaded_files)} files{note}.",
             {
                 "local_path": target_dir, 
                 "metadata": meta_path, 
                 "download_count": len(downloaded_files),
-                "total_scope_count": len(files_for_tree)
+                "total_scope_count": len(files_for_tree),
+                "engine": "tree" if changed_since else "contents" if note else engine,
+                "skipped": wanted.skipped,
+                "fallback": note.strip(" ()")
             }
         )
 
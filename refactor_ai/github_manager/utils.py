@@ -1,19 +1,60 @@
-from github import Github, Auth
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any
 from refactor_ai.configuration_manager import secrets_manager
+from . import http_cache
 
-def get_github_client() -> Github:
+if TYPE_CHECKING:
+    import requests
+    from github import Github
+
+def get_github_client() -> "Github":
     """
     Authenticates and returns the PyGithub client using the stored token.
     Raises an error if the token is missing.
+    
+    The optional "base_url" preference of "github" points the client at
+    GitHub Enterprise or a local stand-in (see benchmarks/). GET requests
+    go through the conditional-request cache (see http_cache.py).
     """
     token = secrets_manager.get_key("github")
     if not token:
         raise ValueError("GitHub token not found. Please run 'refactor configure github'.")
     
+    # PyGithub is imported on first use so commands without GitHub calls start faster.
+    from github import Github, Auth
+    
+    http_cache.install()
     auth = Auth.Token(token)
+    base_url = secrets_manager.get_preference("github", "base_url")
+    if base_url:
+        return Github(auth=auth, base_url=base_url)
     return Github(auth=auth)
 
+def get_github_session(pool_size: int = 10) -> "requests.Session":
+    """
+    Returns an authenticated requests session whose connection pool holds
+    `pool_size` connections, for raw API calls made in parallel (PyGithub
+    spaces its own requests out). Server errors are retried with backoff.
+    """
+    token = secrets_manager.get_key("github")
+    if not token:
+        raise ValueError("GitHub token not found. Please run 'refactor configure github'.")
+    
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    retry = Retry(total=5, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504), allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Authorization": f"Bearer {token}",
+        "X-GitHub-Api-Version": "2022-11-28",
+    })
+    return session
+
 def standard_response(status: str, message: str, data: Optional[Any] = None) -> Dict[str, Any]:
     """
     Creates a standardized response dictionary for MCP (Model Context Protocol).
@@ -15,6 +15,7 @@ Use RefactorAI enhancer to automatically improve repository code using AI.
 * `google`     - Use Google Gemini models
 * `openai`     - Use OpenAI models
 * `anthropic`  - Use Anthropic Claude models
+* `runs`       - List saved runs; `--clean` removes old ones (see `resume`)
 
 ## Enhancement Modes
 
@@ -31,6 +32,24 @@ Use RefactorAI enhancer to automatically improve repository code using AI.
 
 * `--auto`           - Auto-commit without confirmation.
 * `--metadata-file`  - Use custom metadata JSON.
+* `--workers N`      - Process N files in parallel (capped per provider).
+* `--no-cache`       - Always call the provider, never read or store cached results.
+* `--refresh`        - Ignore cached results but store the new ones.
+* `--stream`         - Stream responses, show time-to-first-token and throughput.
+* `--batch`          - Pack small files into shared requests.
+* `--protocol`       - Response format: `full` (default), `edits` or `diff`.
+* `--incremental`    - Only enhance files changed since the last run.
+* `--resume <id>`    - Resume an interrupted run without redoing finished work.
+* `--no-filter`      - Send every text file, including vendored and generated ones.
+* `--max-tokens <n>` - Stop cleanly once the run has used this many tokens.
+* `--max-cost <usd>` - Stop cleanly once the run has cost this many dollars.
+* `--priority <key>` - Process files in priority order (see `budget`).
+* `--cascade`        - Try a cheap model first and escalate only on failure.
+* `--dedupe-near`    - Reuse edits between near-identical files of the same name.
+* `--profile`        - Record per-stage timings and print a latency report.
+* `--commit-batch N` - Commit accepted files N at a time on a new branch (see `pr`).
+* `--pr`             - Commit on a new branch and open one pull request.
+* `--daemon`         - With `--auto`, submit the run to `refactor serve`.
 
 ## Example Usage
 
@@ -45,6 +64,15 @@ Use RefactorAI enhancer to automatically improve repository code using AI.
 
 **Auto commit all files:**
 `refactor enhancer openai https://github.com/user/repo --auto`
+
+**Process 8 files at a time:**
+`refactor enhancer openai https://github.com/user/repo --auto --workers 8`
+
+**Everything in one pull request:**
+`refactor enhancer openai https://github.com/user/repo --auto --pr`
+
+**Enhance a local checkout (see `git`):**
+`refactor enhancer openai ~/src/repo --auto`
 """,
 
     "modes": """
@@ -91,6 +119,410 @@ You can provide your own metadata file:
 `--metadata-file custom_meta.json`
 
 If not provided, default metadata generated during download is used.
+""",
+
+    "workers": """
+# Parallel Workers
+
+`--workers N` sends up to N files to the provider at the same time.
+
+Each provider has a concurrency cap (google: 4, openai: 8, anthropic: 4).
+The effective worker count is the lower of the two. Override the cap
+with the `max_concurrency` preference for a provider.
+
+Results are still printed (and confirmed) in file order, and a failing
+file never stops the rest of the run.
+
+`refactor enhancer google https://github.com/user/repo --auto --workers 4`
+""",
+
+    "cache": """
+# Result Cache
+
+AI responses are cached under `~/.refactor-ai/cache/results`.
+
+The cache key covers the provider, model, mode, the contents of
+`system_prompt.json` and the file content, so re-running on an
+unchanged repo costs (almost) no API calls.
+
+* `--no-cache` - Disable the cache for this run.
+* `--refresh`  - Skip lookups but overwrite entries with fresh results.
+
+The cache is size-bounded (256 MB by default, least recently used
+entries are evicted first). Change the bound with the `max_mb`
+preference of the `cache` section.
+""",
+
+    "stream": """
+# Streaming Mode
+
+`--stream` reads each response as it is generated.
+
+* The `[CODE_START]`, `[CODE_END]` and `[COMMIT_MESSAGE]` tags are
+  detected as tokens arrive.
+* If no `[CODE_START]` appears within the first 2000 characters, the
+  request is cancelled instead of paying for the whole generation.
+* Each file reports time-to-first-token (ttft) and throughput.
+
+`refactor enhancer anthropic https://github.com/user/repo --stream`
+""",
+
+    "large-files": """
+# Large Files
+
+Files larger than one reply can hold are split into chunks instead of
+being skipped: ~10k tokens (about 40k characters) at most, less when
+the model's output limit is lower: ~5k tokens for the 8k-token limit
+of Gemini and newer Claude models, ~2.5k for the 4k-token limit of
+older Claude models and of unknown Anthropic models. The
+`max_output_tokens` provider preference changes that limit.
+
+* Python files are cut at top-level function and class boundaries.
+* Other files are cut at blank lines outside braces.
+* Chunks are enhanced in parallel (up to `--workers`) and stitched back
+  into one file and one commit.
+* A chunk that fails keeps its original text.
+
+Files that would need more than 40 chunks are reported and skipped.
+""",
+
+    "batch": """
+# Batching Small Files
+
+`--batch` packs small files (up to ~1.5k tokens each) into one request,
+up to ~8k tokens (or one chunk, if smaller) or 12 files per request, so
+tiny files such as `__init__.py` do not each pay for the full system
+prompt.
+
+* Every file is sent and returned in its own tagged section.
+* Results are split back per file and still get their own commit.
+* A file whose section is missing or malformed is retried on its own.
+
+`refactor enhancer google https://github.com/user/repo --batch --workers 4`
+""",
+
+    "rate-limits": """
+# Rate Limits
+
+Every request goes through a per provider/model scheduler:
+
+* Token buckets for requests per minute and tokens per minute.
+* `429` / overload responses are retried, honouring `Retry-After`
+  (or jittered exponential backoff when none is given).
+* Concurrency adapts (AIMD): halved on every throttle, raised slowly
+  again while requests succeed.
+
+Limits are read from the provider preferences in
+`~/.refactor-ai/preferences.json`:
+
+* `rpm`, `tpm` - provider-wide limits.
+* `model_limits` - per-model overrides, e.g. `{"gpt-4o": {"tpm": 30000}}`.
+* `max_concurrency` - upper bound for parallel requests.
+* `base_url` - send requests to a compatible (or local fake) endpoint.
+""",
+
+    "protocol": """
+# Output Protocol
+
+By default the model returns the COMPLETE file for every change.
+
+* `--protocol edits` - the model returns SEARCH/REPLACE edit blocks.
+* `--protocol diff`  - the model returns a unified diff.
+
+Edits are applied locally with fuzzy context matching (whitespace
+differences and small drifts are tolerated). If a patch does not apply,
+the file is requested again in full-file mode.
+
+Small edits on large files cost far fewer output tokens this way.
+Batched files (`--batch`) always use full-file mode.
+""",
+
+    "incremental": """
+# Incremental Runs
+
+`--incremental` remembers the commit each run enhanced, per repository,
+branch, folder and mode (stored in `~/.refactor-ai/run_state.json`).
+
+The next run asks GitHub which files changed since that commit
+(compare API, or a tree diff for very large changes) and downloads and
+enhances only those files.
+
+* The first run processes everything and records the branch head.
+* Commits pushed by the run itself are not treated as new changes.
+* If any file fails, the state is not advanced, so it is retried.
+* If history was rewritten (force push), a full run is done instead.
+
+`refactor enhancer openai https://github.com/user/repo --auto --incremental`
+""",
+
+    "resume": """
+# Resuming Runs
+
+Every run prints a run ID and keeps an append-only journal in
+`~/.refactor-ai/runs/<run-id>/`, together with the downloaded files.
+
+The journal records, per file, whether it was enhanced (including the
+new content), committed, declined or failed. Each entry is flushed to
+disk immediately, so it survives crashes and sleeping laptops.
+
+`refactor enhancer openai https://github.com/user/repo --resume 20250101-120000-a1b2c3`
+
+On resume:
+
+* Committed, declined and unchanged files are skipped.
+* Enhanced but unpushed files are pushed from the journal (no model call).
+* Failed and unprocessed files are processed again.
+
+The repository, mode and protocol of the original run are reused.
+The working copy is removed once a run completes without failures.
+
+## Retention
+
+When a run starts, it removes runs older than 14 days and all but the
+newest 20, plus the working copies of finished runs and of runs whose
+download never completed. Runs written to in the last hour are left
+alone. The `keep_days` and `keep_last` preferences of the `runs` section
+change the limits.
+
+`refactor enhancer runs` lists saved runs with their status and size;
+`refactor enhancer runs --clean` prunes them now
+(`--keep-days` and `--keep-last` override the preferences).
+""",
+
+    "prompt-cache": """
+# Provider Prompt Caching
+
+Every request of a run starts with the same system prompt: the base
+instructions, the mode instructions and the repository structure tree
+(trimmed to ~3k tokens). Only the file itself changes between requests.
+
+Providers reuse that shared prefix instead of processing it again:
+
+* **Anthropic** - the system prompt is marked with `cache_control`.
+* **OpenAI** - prefix caching is automatic for prompts over ~1k tokens.
+* **Google** - Gemini models cache repeated prefixes implicitly.
+
+Cached prompt tokens are cheaper and faster. The run summary shows the totals:
+
+`tokens: 812340 in (655872 cached, 81%), 190233 out over 412 requests`
+""",
+
+    "filter": """
+# Pre-filter
+
+Before any API call, every file is classified locally. Files in these
+categories are skipped:
+
+* **binary** - known binary extensions, NUL bytes or invalid UTF-8.
+* **lockfile** - `package-lock.json`, `yarn.lock`, `poetry.lock`, `*.lock`, ...
+* **vendored** - `node_modules/`, `vendor/`, `third_party/`, ... or `linguist-vendored`.
+* **generated** - protobuf output, `*.min.js`, `@generated` / `DO NOT EDIT`
+  headers, or `linguist-generated` in the root `.gitattributes`.
+* **minified** - most of the text sits on lines over 500 characters.
+* **data** - high-entropy text such as embedded base64 blobs.
+
+Only the first 64 KB of a file is read. The run prints per-category counts:
+
+`Pre-filter skipped 412 file(s): 3 binary, 2 lockfile, 380 vendored, 27 generated`
+
+Use `--no-filter` to send everything.
+""",
+
+    "budget": """
+# Budgets and Priority
+
+Before the first request, every file gets a local token estimate (about
+4 characters per token, plus the system prompt for each request). The
+total, and its list-price cost when known, is printed up front.
+
+`refactor enhancer openai https://github.com/user/repo --max-tokens 2000000`
+`refactor enhancer openai https://github.com/user/repo --max-cost 20`
+
+Spending is tracked from the token counts the provider reports. When the
+next file would not fit, the run stops cleanly. It finishes the files in
+flight, then prints what was done and what was deferred.
+Cascade escalations and near-duplicate fallbacks book their own
+estimate too. An escalation that does not fit keeps the cheaper model's
+answer.
+
+Deferred files are picked up by `--resume <run-id>`.
+
+Prices for the default models are built in. For other models, set the
+provider's `prices` preference (USD per 1M tokens):
+`{"input": 2.5, "output": 10}`
+
+## Priority
+
+`--priority` is repeatable; earlier keys win:
+
+* `size` / `-size` - smallest / largest files first.
+* `recent` - files changed in the latest 50 commits first, most recently
+  changed first.
+* `glob:<pattern>` - matching paths first, e.g. `glob:src/*`.
+
+`refactor enhancer openai <url> --max-cost 5 --priority "glob:src/*" --priority recent`
+""",
+
+    "cascade": """
+# Model Cascade
+
+`refactor enhancer anthropic https://github.com/user/repo --cascade`
+
+Each file first goes to a fast, cheap model. It is sent to the strong
+model only when the cheap answer:
+
+* cannot be parsed (missing tags, patch does not apply),
+* fails local validation (see `validation`), or
+* comes back unchanged in `--add-comments` or `--enhance` mode.
+
+Default tiers:
+
+* **google** - gemini-1.5-flash -> gemini-1.5-pro
+* **openai** - gpt-4o-mini -> gpt-4o
+* **anthropic** - claude-3-haiku -> claude-3-5-sonnet
+
+The strong tier is your `default_model`; the cheap tier can be set with
+the provider's `cheap_model` preference. Each tier has its own rate
+limits and cache entries.
+
+The run summary shows how often each tier produced the final answer:
+
+`cascade: gpt-4o-mini 86% (430/500) escalated 70: 41 unchanged, 29 invalid; gpt-4o 14% (70/70)`
+""",
+
+    "validation": """
+# Validation
+
+Every changed file is checked locally before it can be pushed. The
+checks run in a small process pool, so large files don't slow the
+request workers down.
+
+* **Python** - must compile. Public functions and methods (and
+  `__init__`) must keep their parameter names, order and defaults.
+* **JSON** - must load.
+* **YAML / TOML** - must load (when PyYAML / tomllib are available).
+
+A result that fails is requested again, with the error included in the
+prompt. If it still fails, the file is reported as invalid, is not
+pushed, and is retried by `--resume`.
+""",
+
+    "dedupe": """
+# Duplicate Files
+
+Files of the same type (extension) with identical content (same git
+blob SHA) are enhanced once. The result is then applied to every copy,
+e.g. vendored helpers, per-service boilerplate or identical
+`__init__.py` files. Each copy is validated on its own.
+
+`--dedupe-near` also groups files that share a name and are at least
+90% similar. The first one is enhanced and its change is replayed on
+the others as a patch. A sibling whose lines around an edit differ, or
+whose patched result fails validation, is enhanced on its own instead.
+
+`Dedupe: 37 identical cop(ies), 12 near-duplicate(s) reuse the result of 9 file(s)`
+""",
+
+    "profile": """
+# Profiling
+
+`refactor enhancer openai https://github.com/user/repo --profile`
+
+Records a timed span for every stage, tagged with file, provider and model:
+
+* **download** - fetching the repository.
+* **read** - reading a file from the working copy.
+* **queue** - waiting for the scheduler (concurrency, rate limits, backoff).
+* **provider** - the API call itself, with input / cached / output tokens.
+* **ttft** - time to first token (with `--stream`).
+* **parse** - extracting the result and applying patches.
+* **validate** - local validation.
+* **commit** - pushing the file.
+
+At the end of the run a p50 / p95 / p99 table is printed. The files are
+kept next to the run journal:
+
+* `~/.refactor-ai/runs/<run-id>/trace.jsonl` - one JSON object per span.
+* `~/.refactor-ai/runs/<run-id>/metrics.prom` - Prometheus text format.
+
+To feed node_exporter's textfile collector, set the `profile` /
+`textfile_dir` preference; `refactor_ai.prom` is then written there too.
+""",
+
+    "daemon": """
+# Daemon Mode
+
+`refactor serve` (or `refactor serve --socket /tmp/refactor.sock`)
+
+Keeps a warm process running: provider SDKs are imported once, and
+provider clients, connection pools, rate-limit schedulers and the
+validation pool are reused by every job.
+
+While it runs, `--auto --daemon` enhancement commands are submitted to
+it and stream its output:
+
+`refactor enhancer openai https://github.com/user/repo --auto --daemon`
+
+Without `--daemon`, or when no daemon is running, runs stay in the
+terminal's own process. Jobs run one after another. Before each job the
+daemon rebuilds any provider client whose API key or `base_url` changed
+and applies the current rate-limit preferences.
+
+* `refactor jobs list` - queued, running and recent jobs.
+* `refactor jobs status <id>` - state, progress and run ID.
+* `refactor jobs follow <id>` - stream a job's output.
+* `refactor jobs cancel <id>` - cancel it; a started run stays resumable.
+* `refactor jobs stop` - stop the daemon.
+
+Ctrl+C while following cancels the job. The daemon only listens on
+localhost or a Unix socket, and requests must carry the token from
+`~/.refactor-ai/daemon.json` (readable by its owner only).
+""",
+
+    "git": """
+# Local Git Sources
+
+Instead of a GitHub URL, pass a local checkout or any git remote. Files
+are read from a working tree and nothing goes through the GitHub API.
+
+`refactor enhancer openai ~/src/repo/services/foo`
+`refactor enhancer openai file:///srv/git/repo.git --auto`
+`refactor enhancer openai git@host:team/repo.git//services/foo`
+
+* **Local checkout** (or a folder in one) - a separate worktree is
+  created on branch `refactor-ai/<run-id>` from the current commit, so
+  your own working tree is untouched. Results are committed there; the
+  branch stays in your repository, ready for one `git push`.
+* **Remote** (`file://`, `ssh://`, `user@host:path`, or any URL ending
+  in `.git`) - cloned with `--depth 1`. A `//sub/folder` suffix makes
+  the clone partial and sparse, so only that folder's files are fetched.
+  At the end the branch is pushed to the remote in a single push
+  (after confirmation unless `--auto`).
+
+Each accepted file is one local commit. `--incremental` is not
+available for git sources; `--priority recent` uses the local history.
+""",
+
+    "pr": """
+# Batched Commits and Pull Requests
+
+By default every accepted file is pushed to the target branch as its
+own commit: three API calls and one CI build per file.
+
+`refactor enhancer openai https://github.com/user/repo --auto --commit-batch 50`
+`refactor enhancer openai https://github.com/user/repo --auto --pr`
+
+* `--commit-batch N` - accepted files are collected and committed N at a
+  time, each batch as one commit through the git data API, on branch
+  `refactor-ai/<run-id>`. The branch starts at the commit that was
+  downloaded, and the target branch is never written to.
+* `--pr` - same, and one pull request from that branch into the target
+  branch is opened at the end. Without `--commit-batch`, batches of 100
+  files are used.
+
+A batch that fails to commit is retried with `--resume <run-id>`, which
+adds to the same branch (and pull request). Local git sources already
+commit to their own branch and ignore both options.
 """
 }
 
@@ -42,8 +42,23 @@ Downloads a repository (or a specific folder within it) and generates a metadata
 * `OUTPUT_FOLDER`: The local folder where files will be saved.
 * `METADATA_FILE`: (Optional) Name of the JSON file containing the file tree (default: `repo_metadata.json`).
 
+## Options
+* `--branch`: Download this branch instead of the default one.
+* `--metadata-scope`: `current` (folder only) or `all` (entire repo tree).
+* `--engine`: `archive` (default) streams the branch tarball in one request and extracts the folder on the fly. `tree` lists the folder with one recursive git tree call, then fetches only the wanted files in parallel; it suits large monorepos where the archive would be huge. `contents` makes one API call per folder; use it when the other engines are blocked. Set the default with the `download_engine` preference of `github` in `~/.refactor-ai/preferences.json`.
+* `--include GLOB`: Only download files matching the glob, relative to the repo root. Repeatable. `**` spans folders.
+* `--max-size KB`: Skip files larger than this.
+* `--parallel N`: Concurrent blob requests for the `tree` engine (default 8, or the `download_parallelism` preference).
+
+Filters are applied to paths and sizes before any content is fetched.
+
+## Caching
+GitHub API responses are cached in `~/.refactor-ai/cache/github` and revalidated with ETags. A repeat download of an unchanged repo only gets `304 Not Modified` answers, which do not count against the rate limit. The hit rate is printed after each download. The `cache_mb` preference of `github` bounds the cache size (default 64; `0` turns it off).
+
 ## Example
 `refactor github download https://github.com/user/project ./analysis custom_tree.json`
+
+`refactor github download https://github.com/org/mono ./foo --engine tree --include "services/foo/**/*.py" --max-size 512`
     """,
     
     "create-repo": """
@@ -2,12 +2,13 @@ import typer
 from typing import Optional
 from rich.console import Console
 
-from refactor_ai.configuration_manager import cli_ui, secrets_manager
+from refactor_ai.configuration_manager import secrets_manager
 from refactor_ai.help_docs import help_utils
 
 # Sub-apps
 from refactor_ai.github_manager import github_terminal_controls
 from refactor_ai.enhancer import terminal_controls as enhancer_terminal_controls
+from refactor_ai.daemon import terminal_controls as daemon_terminal_controls
 
 app = typer.Typer(
     help="RefactorAI: AI-powered code enhancement tool.",
@@ -22,6 +23,7 @@ console = Console()
 
 app.add_typer(github_terminal_controls.app, name="github")
 app.add_typer(enhancer_terminal_controls.app, name="enhancer")
+app.add_typer(daemon_terminal_controls.app, name="jobs")
 
 
 # =====================================================
@@ -55,6 +57,8 @@ def configure(
     """
 
     if not provider:
+        # The interactive menu's prompt toolkit is only loaded when used.
+        from refactor_ai.configuration_manager import cli_ui
         cli_ui.run_configuration_ui()
         return
 
@@ -81,6 +85,13 @@ def configure(
         console.print(f"[green]✔ Verified GitHub access: {level}[/green]")
 
 
+# =====================================================
+# DAEMON
+# =====================================================
+
+app.command("serve")(daemon_terminal_controls.serve)
+
+
 # =====================================================
 # HELP
 # =====================================================
@@ -0,0 +1,44 @@
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Keep the suite away from the real ~/.refactor-ai (preferences, caches,
+# run state). Set before any refactor_ai module computes CONFIG_DIR.
+os.environ["HOME"] = tempfile.mkdtemp(prefix="refactor-ai-tests-")
+
+# The offline stand-ins for GitHub and the model APIs live with the benchmarks.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+DEMO_FILES = {
+    "README.md": b"# demo\n",
+    ".gitattributes": b"docs/** linguist-generated\n",
+    "docs/guide.md": b"Generated guide.\n",
+    "src/app.py": b"from lib import util\n\nprint(util.VALUE)\n",
+    "src/lib/util.py": b"VALUE = 1\n",
+    "src/lib/copy.py": b"VALUE = 1\n",
+}
+
+
+@pytest.fixture
+def fake_github(tmp_path, monkeypatch):
+    """
+    A fake GitHub serving octo/demo (DEMO_FILES), with the preferences
+    and keys of this test pointing at it. Yields (server, repo).
+    """
+    from fake_servers import FakeRepo, FakeServices
+    from refactor_ai.configuration_manager import secrets_manager
+
+    repo = FakeRepo("octo", "demo", DEMO_FILES)
+    services = FakeServices([repo]).start()
+
+    prefs = tmp_path / "preferences.json"
+    prefs.write_text(json.dumps(services.preferences()))
+    monkeypatch.setattr(secrets_manager, "PREFS_FILE", prefs)
+    monkeypatch.setattr(secrets_manager, "get_key", lambda provider_id: "test-key")
+
+    yield services, repo
+    services.stop()
@@ -0,0 +1,50 @@
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import batching
+
+
+def _section(path, body):
+    return f'[FILE_START path="{path}"]\n{body}\n[FILE_END]'
+
+
+def test_prompt_sections_parse_back():
+    files = {"a.py": "x = 1", "pkg/b.py": "y = 2"}
+    prompt = batching.build_batch_prompt("Enhance these.", files)
+
+    assert prompt.startswith("Enhance these.\n\n")
+    assert batching.parse_batch_response(prompt) == files
+
+
+def test_parse_keeps_each_section_tags():
+    body = "[CODE_START]\nx = 1\n[CODE_END]\n[COMMIT_MESSAGE]\nTidy"
+    response = "Here you go:\n" + _section("a.py", body) + "\ntrailing chatter"
+
+    assert batching.parse_batch_response(response) == {"a.py": body}
+
+
+def test_check_raises_when_a_file_is_missing():
+    response = _section("a.py", "x")
+
+    assert batching.check_batch_response(response, ["a.py"]) == {"a.py": "x"}
+    with pytest.raises(ValueError):
+        batching.check_batch_response(response, ["a.py", "b.py"])
+    with pytest.raises(ValueError):
+        batching.check_batch_response("no sections", ["a.py"])
+
+
+def test_plan_packs_small_files_and_keeps_large_ones_solo():
+    sizes = {"s1": 400, "big": 100_000, "s2": 400, "s3": 400}
+    units = batching.plan_batches(["s1", "big", "s2", "s3"], sizes)
+
+    assert units == [["big"], ["s1", "s2", "s3"]]
+
+
+def test_plan_respects_budget_and_file_cap():
+    paths = [f"f{i}" for i in range(10)]
+    sizes = dict.fromkeys(paths, 400)
+
+    by_budget = batching.plan_batches(paths, sizes, budget=350)
+    by_count = batching.plan_batches(paths, sizes, max_files=4)
+
+    assert [len(u) for u in by_budget] == [3, 3, 3, 1]
+    assert [len(u) for u in by_count] == [4, 4, 2]
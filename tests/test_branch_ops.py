@@ -0,0 +1,102 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from refactor_ai.github_manager import branch_ops
+
+
+class _Commit:
+    """A listed commit; reading `files` counts as one request."""
+
+    def __init__(self, sha, when, files, parent):
+        self.sha = sha
+        self.parents = [SimpleNamespace(sha=parent)] if parent else []
+        self.commit = SimpleNamespace(committer=SimpleNamespace(date=datetime.fromtimestamp(when, timezone.utc)))
+        self._files = files
+        self.reads = 0
+
+    @property
+    def files(self):
+        self.reads += 1
+        return [SimpleNamespace(filename=f) for f in self._files]
+
+
+class _Repo:
+    def __init__(self, history, compare_files=None):
+        # history: newest first, [(timestamp, [paths])]; the last one is a root commit.
+        self.commits = []
+        for i, (when, files) in enumerate(history):
+            parent = f"c{i + 1}" if i + 1 < len(history) else None
+            self.commits.append(_Commit(f"c{i}", when, files, parent))
+        self.compare_files = compare_files
+        self.compares = []
+
+    def get_commits(self, sha):
+        return iter(self.commits)
+
+    def compare(self, base, head):
+        self.compares.append((base, head))
+        if self.compare_files is not None:
+            files = self.compare_files
+        else:
+            end = next(i for i, c in enumerate(self.commits) if c.sha == base)
+            files = sorted({f for c in self.commits[:end] for f in c._files})
+        return SimpleNamespace(files=[SimpleNamespace(filename=f) for f in files])
+
+
+@pytest.fixture
+def use_repo(monkeypatch):
+    def use(repo):
+        client = SimpleNamespace(get_repo=lambda name: repo)
+        monkeypatch.setattr(branch_ops, "get_github_client", lambda: client)
+        return repo
+    return use
+
+
+HISTORY = [
+    (400, ["a.py"]),
+    (300, ["b.py", "a.py"]),
+    (200, ["c.py"]),
+    (100, ["d.py"]),
+    (50, ["root.py"]),
+]
+
+
+def test_each_path_gets_its_newest_commit_time(use_repo):
+    repo = use_repo(_Repo(HISTORY))
+
+    res = branch_ops.recently_changed_files("o/r", "main", max_commits=4)
+
+    assert res["data"]["paths"] == {"a.py": 400, "b.py": 300, "c.py": 200, "d.py": 100}
+    assert repo.compares == [("c4", "c0")]
+
+
+def test_walk_stops_once_every_compared_path_has_a_time(use_repo):
+    history = [(400, ["a.py", "b.py"]), (300, ["a.py"]), (200, ["b.py"]), (100, ["x"])]
+    repo = use_repo(_Repo(history))
+
+    res = branch_ops.recently_changed_files("o/r", "main", max_commits=3)
+
+    assert res["data"]["paths"] == {"a.py": 400, "b.py": 400}
+    assert [c.reads for c in repo.commits] == [1, 0, 0, 0]
+
+
+def test_truncated_compare_reads_every_commit(use_repo):
+    listed = [f"f{i}" for i in range(branch_ops.COMPARE_FILE_LIMIT)]
+    repo = use_repo(_Repo(HISTORY, compare_files=listed))
+
+    res = branch_ops.recently_changed_files("o/r", "main", max_commits=4)
+
+    assert res["data"]["paths"] == {"a.py": 400, "b.py": 300, "c.py": 200, "d.py": 100}
+    assert [c.reads for c in repo.commits[:4]] == [1, 1, 1, 1]
+
+
+def test_window_starting_at_the_root_commit_includes_its_changes(use_repo):
+    repo = use_repo(_Repo(HISTORY))
+
+    res = branch_ops.recently_changed_files("o/r", "main", max_commits=50)
+
+    assert res["data"]["paths"]["root.py"] == 50
+    assert res["data"]["paths"]["a.py"] == 400
+    assert repo.compares == []
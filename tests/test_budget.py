@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import budget
+from refactor_ai.enhancer.code_enhancer.chunking import MAX_CHUNK_TOKENS
+
+
+class Meter:
+    def __init__(self):
+        self.totals = {"input_tokens": 0, "output_tokens": 0}
+
+
+def test_estimate_pays_the_system_prompt_per_chunk():
+    small = budget.estimate_request(100, "x" * 400)
+    large = budget.estimate_request(100, "x" * (MAX_CHUNK_TOKENS * 4 * 2 + 4))
+
+    assert small == (100 + 100, 100)
+    assert large[0] == 100 * 3 + MAX_CHUNK_TOKENS * 2 + 1
+
+
+def test_reservations_count_until_released():
+    meter = Meter()
+    plan = budget.Budget(meter, max_tokens=1000)
+
+    first = plan.reserve(300, 300)
+    with pytest.raises(budget.BudgetExceeded):
+        plan.reserve(300, 300)
+    # Once the budget closes, nothing else is admitted.
+    assert plan.closed
+    with pytest.raises(budget.BudgetExceeded):
+        plan.reserve(1, 1)
+
+    plan.release(first)
+    assert plan.reserved_tokens == 0
+
+
+def test_spending_comes_from_the_meter():
+    meter = Meter()
+    plan = budget.Budget(meter, max_cost=1.0, prices=(2.5, 10.0))
+    meter.totals.update(input_tokens=200_000, output_tokens=40_000)
+
+    assert plan.spent() == (240_000, pytest.approx(0.9))
+    with pytest.raises(budget.BudgetExceeded):
+        plan.reserve(40_000, 10_000)
+    assert "$0.90 of $1.00" in plan.summary()
+
+
+def test_parallel_reservations_never_overshoot():
+    plan = budget.Budget(Meter(), max_tokens=10_000)
+    admitted = []
+
+    def worker():
+        for _ in range(50):
+            try:
+                admitted.append(plan.reserve(50, 50))
+            except budget.BudgetExceeded:
+                return
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(tokens for tokens, _ in admitted) == plan.reserved_tokens <= 10_000
+
+
+def test_prices_prefer_the_preference():
+    assert budget.resolve_prices("gpt-4o") == (2.50, 10.00)
+    assert budget.resolve_prices("gpt-4o", {"input": 1, "output": 2}) == (1.0, 2.0)
+    assert budget.resolve_prices("unknown-model") is None
+    assert budget.cost_of(None, 10, 10) == 0.0
+
+
+def test_priority_order():
+    paths = ["b.py", "src/a.py", "c.py", "src/d.py"]
+    sizes = {"b.py": 30, "src/a.py": 10, "c.py": 20, "src/d.py": 40}
+    recency = {"c.py": 200.0, "b.py": 100.0}
+
+    assert budget.order_paths(paths, ["size"], sizes) == ["src/a.py", "c.py", "b.py", "src/d.py"]
+    assert budget.order_paths(paths, ["recent"], sizes, recency) == ["c.py", "b.py", "src/a.py", "src/d.py"]
+    assert budget.order_paths(paths, ["glob:src/*", "-size"], sizes) == ["src/d.py", "src/a.py", "b.py", "c.py"]
+    assert budget.order_paths(paths, [], sizes) == paths
+    assert budget.validate_priority(["size", "glob:x"]) is None
+    assert "Unknown priority" in budget.validate_priority(["newest"])
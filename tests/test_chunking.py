@@ -0,0 +1,98 @@
+import ast
+import textwrap
+
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import chunking, code_enhancer
+
+
+def _python_module(functions):
+    parts = ["import os\n\n"]
+    for i in range(functions):
+        parts.append(
+            f"# helper {i}\n"
+            f"@staticmethod\n"
+            f"def func_{i}(value):\n"
+            + "".join(f"    value = value + {j}\n" for j in range(20))
+            + "    return value\n\n\n"
+        )
+    return "".join(parts)
+
+
+def test_small_file_is_one_chunk():
+    assert chunking.split_source("a.py", "x = 1\n", max_tokens=100) == ["x = 1\n"]
+
+
+def test_python_round_trip_on_top_level_boundaries():
+    text = _python_module(30)
+    chunks = chunking.split_source("m.py", text, max_tokens=400)
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+    assert all(chunking.estimate_tokens(c) <= 400 for c in chunks)
+    # Comments and decorators stay with their definition.
+    for chunk in chunks[1:]:
+        assert chunk.startswith("# helper")
+
+
+def test_brace_language_round_trip():
+    text = "".join(
+        f"function f{i}() {{\n" + "  x += 1;\n\n" * 10 + "}\n\n" for i in range(40)
+    )
+    chunks = chunking.split_source("m.js", text, max_tokens=200)
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == text
+
+
+def test_oversized_segment_is_split_by_lines():
+    text = "x = [\n" + "    1,\n" * 2000 + "]\n"
+    chunks = chunking.split_source("data.py", text, max_tokens=300)
+
+    assert "".join(chunks) == text
+    assert all(chunking.estimate_tokens(c) <= 300 for c in chunks)
+
+
+def test_stitch_keeps_chunk_separators():
+    originals = ["def a():\n    pass\n\n\n", "def b():\n    pass\n"]
+    enhanced = ["def a():\n    return 1", "def b():\n    return 2\n"]
+
+    assert chunking.stitch(originals, enhanced) == (
+        "def a():\n    return 1\n\n\ndef b():\n    return 2\n"
+    )
+
+
+def _class_module(methods):
+    body = "".join(
+        f"    def method_{i}(self, value):\n"
+        + "".join(f"        value = value + {j}\n" for j in range(10))
+        + "        return value\n\n"
+        for i in range(methods)
+    )
+    return "class Service:\n" + body
+
+
+@pytest.mark.parametrize("dedent", [False, True])
+def test_mid_class_chunks_round_trip_through_the_reply_parser(dedent):
+    text = _class_module(40)
+    chunks = chunking.split_source("service.py", text, max_tokens=300)
+    assert len(chunks) > 2 and chunks[1].lstrip("\n").startswith("    ")
+
+    enhanced = []
+    for chunk in chunks:
+        code = textwrap.dedent(chunk) if dedent else chunk
+        reply = f"[CODE_START]\n```python\n{code}```\n[CODE_END]\n[COMMIT_MESSAGE]\nTidy"
+        enhanced.append(code_enhancer._parse_ai_response(reply)[0])
+
+    stitched = chunking.stitch(chunks, enhanced)
+
+    assert stitched == text
+    ast.parse(stitched)
+
+
+def test_chunk_budget_leaves_room_for_the_reply():
+    budget = chunking.chunk_budget(8192)
+
+    assert budget * chunking.OUTPUT_GROWTH + chunking.REPLY_OVERHEAD_TOKENS <= 8192
+    assert chunking.chunk_budget(10 ** 6) == chunking.MAX_CHUNK_TOKENS
+    assert chunking.chunk_budget(0) == 1
@@ -0,0 +1,110 @@
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import budget, cascade, code_enhancer
+from refactor_ai.enhancer.code_enhancer.profiling import Tracer
+
+
+class Meter:
+    def __init__(self):
+        self.totals = {"input_tokens": 0, "output_tokens": 0}
+
+
+class Validator:
+    """Rejects every result for the paths in `broken`."""
+
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.checked = []
+
+    def check(self, path, original, new_code):
+        self.checked.append(path)
+        return f"{path} is broken" if path in self.broken else None
+
+
+@pytest.fixture
+def run(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    run = {
+        "local_root": str(tmp_path),
+        "tracer": Tracer(),
+        "mode": "improve_code",
+        "budget": budget.Budget(Meter(), max_tokens=1000),
+        "estimates": {"a.py": (300, 300)},
+        "tier_stats": cascade.TierStats(["cheap", "strong"]),
+        "validator": Validator(),
+    }
+    run["tiers"] = [dict(run, model="cheap"), dict(run, model="strong")]
+    return run
+
+
+def _fake_enhance(calls, status):
+    def enhance(rel_path, tier):
+        calls.append((rel_path, tier["model"], tier["budget"].reserved_tokens))
+        return dict(code_enhancer._new_result(rel_path), status=status, stats={})
+    return enhance
+
+
+def test_lockfiles_and_binaries_are_never_read(run, tmp_path):
+    for name in ("Cargo.lock", "logo.PNG"):
+        (tmp_path / name).write_text("text\n")
+
+    assert code_enhancer._read_source("Cargo.lock", run) is None
+    assert code_enhancer._read_source("logo.PNG", run) is None
+    assert code_enhancer._read_source("a.py", run) == "x = 1\n"
+    assert code_enhancer._read_source("missing.py", run) is None
+
+
+def test_escalation_books_its_own_estimate(run, monkeypatch):
+    calls = []
+    monkeypatch.setattr(code_enhancer, "_enhance_file", _fake_enhance(calls, "changed"))
+    failed = dict(code_enhancer._new_result("a.py"), status="failed", stats={})
+
+    result = code_enhancer._escalate(failed, run)
+
+    assert calls == [("a.py", "strong", 600)]
+    assert result["stats"] == {"escalated": "failed", "tier": "strong"}
+    assert run["budget"].reserved_tokens == 0
+
+
+def test_escalation_that_does_not_fit_keeps_the_cheaper_result(run, monkeypatch):
+    calls = []
+    monkeypatch.setattr(code_enhancer, "_enhance_file", _fake_enhance(calls, "changed"))
+    held = run["budget"].reserve(300, 300)
+    failed = dict(code_enhancer._new_result("a.py"), status="failed", stats={})
+
+    result = code_enhancer._escalate(failed, run)
+
+    assert calls == []
+    assert result["status"] == "failed"
+    assert result["stats"]["tier"] == "cheap"
+    run["budget"].release(held)
+
+
+def test_near_duplicate_fallback_is_deferred_when_over_budget(run, monkeypatch):
+    calls = []
+    monkeypatch.setattr(code_enhancer, "_enhance_file", _fake_enhance(calls, "changed"))
+    run["budget"].reserve(300, 300)
+    source = dict(code_enhancer._new_result("rep.py"), status="unchanged")
+
+    result = code_enhancer._copy_result(source, "a.py", "near", run)
+
+    assert calls == []
+    assert result["status"] == "deferred"
+    assert result["path"] == "a.py"
+
+
+def test_identical_copies_are_validated_under_their_own_path(run, tmp_path):
+    for name in ("b.py", "c.py"):
+        (tmp_path / name).write_text("x = 1\n")
+    run["validator"] = Validator(broken=["b.py"])
+    source = dict(code_enhancer._new_result("a.py"), status="changed", code="x = 2\n", message="Tidy", stats={})
+
+    broken = code_enhancer._copy_result(source, "b.py", "exact", run)
+    fine = code_enhancer._copy_result(source, "c.py", "exact", run)
+
+    assert run["validator"].checked == ["b.py", "c.py"]
+    assert broken["status"] == "invalid"
+    assert broken["message"] == "b.py is broken"
+    assert fine["status"] == "changed"
+    assert fine["code"] == "x = 2\n"
+    assert fine["stats"]["duplicate_of"] == "a.py"
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+from synthetic_repo import git_blob_sha
+
+from refactor_ai.github_manager import branch_ops, commit_ops, pr_ops
+
+
+def test_batch_lands_as_one_commit_on_a_new_branch(fake_github):
+    services, repo = fake_github
+    start = repo.head
+
+    created = branch_ops.create_branch("octo/demo", "refactor-ai/run1", source_sha=start)
+    assert created["status"] == "success", created["message"]
+
+    res = commit_ops.commit_multiple_files(
+        "octo/demo",
+        [{"path": "src/app.py", "content": "print(2)\n"}, {"path": "README.md", "content": "# better\n"}],
+        "refactor-ai/run1",
+        "Enhance 2 files",
+    )
+
+    assert res["status"] == "success", res["message"]
+    commit = repo.git_commits[res["data"]["commit_sha"]]
+    assert commit["parents"] == [start]
+    assert commit["message"] == "Enhance 2 files"
+    assert repo.trees[res["data"]["tree_sha"]] == {
+        "src/app.py": git_blob_sha(b"print(2)\n"),
+        "README.md": git_blob_sha(b"# better\n"),
+    }
+    assert repo.refs["refactor-ai/run1"] == res["data"]["commit_sha"]
+    # The target branch is never written to.
+    assert repo.head == start
+    assert services.counts["github"] > 0
+
+
+def test_second_batch_builds_on_the_first(fake_github):
+    _, repo = fake_github
+    branch_ops.create_branch("octo/demo", "refactor-ai/run1", source_sha=repo.head)
+
+    first = commit_ops.commit_multiple_files("octo/demo", [{"path": "a.py", "content": "A"}], "refactor-ai/run1", "one")
+    second = commit_ops.commit_multiple_files("octo/demo", [{"path": "b.py", "content": "B"}], "refactor-ai/run1", "two")
+
+    assert repo.git_commits[second["data"]["commit_sha"]]["parents"] == [first["data"]["commit_sha"]]
+    assert repo.refs["refactor-ai/run1"] == second["data"]["commit_sha"]
+
+
+def test_files_keep_their_mode(fake_github):
+    _, repo = fake_github
+    repo.modes["src/app.py"] = "100755"
+    branch_ops.create_branch("octo/demo", "refactor-ai/run1", source_sha=repo.head)
+
+    first = commit_ops.commit_multiple_files(
+        "octo/demo",
+        [{"path": "src/app.py", "content": "print(2)\n"}, {"path": "new.sh", "content": "echo\n", "mode": "100755"}],
+        "refactor-ai/run1",
+        "one",
+    )
+    # The second batch starts from the first batch's tree.
+    second = commit_ops.commit_multiple_files(
+        "octo/demo",
+        [{"path": "new.sh", "content": "echo 2\n"}, {"path": "README.md", "content": "# 2\n"}],
+        "refactor-ai/run1",
+        "two",
+    )
+
+    assert second["status"] == "success", second["message"]
+    assert repo.tree_modes[first["data"]["tree_sha"]] == {"src/app.py": "100755", "new.sh": "100755"}
+    assert repo.tree_modes[second["data"]["tree_sha"]] == {
+        "src/app.py": "100755", "new.sh": "100755", "README.md": "100644",
+    }
+
+
+class _TreeRepo:
+    """Serves get_git_tree from {sha: [(path, mode, type, sha)]}, truncating recursive listings."""
+
+    def __init__(self, trees):
+        self.trees = trees
+        self.calls = []
+
+    def get_git_tree(self, sha, recursive=False):
+        self.calls.append((sha, recursive))
+        entries = [SimpleNamespace(path=p, mode=m, type=t, sha=s) for p, m, t, s in self.trees[sha]]
+        if recursive:
+            entries = entries[:1]
+        return SimpleNamespace(tree=entries, raw_data={"truncated": recursive})
+
+
+def test_modes_missing_from_a_truncated_listing_are_read_per_folder():
+    repo = _TreeRepo({
+        "root": [("README.md", "100644", "blob", "b1"), ("bin", "040000", "tree", "t-bin")],
+        "t-bin": [("run", "100755", "blob", "b2"), ("lib", "040000", "tree", "t-lib")],
+        "t-lib": [("tool", "100755", "blob", "b3")],
+    })
+
+    modes = commit_ops._file_modes(repo, "root", ["bin/run", "bin/lib/tool", "bin/none", "docs/x.md"])
+
+    assert modes == {"README.md": "100644", "bin/run": "100755", "bin/lib/tool": "100755"}
+    # Each folder is listed once.
+    assert repo.calls == [("root", True), ("root", False), ("t-bin", False), ("t-lib", False)]
+
+
+def test_pull_request_goes_from_the_run_branch_into_the_target(fake_github):
+    _, repo = fake_github
+    branch_ops.create_branch("octo/demo", "refactor-ai/run1", source_sha=repo.head)
+
+    res = pr_ops.create_pull_request("octo/demo", "Enhance", "Body", head="refactor-ai/run1", base="main")
+
+    assert res["status"] == "success", res["message"]
+    assert res["data"]["pr_number"] == 1
+    assert repo.pulls[0]["head"] == "refactor-ai/run1"
+    assert repo.pulls[0]["base"] == "main"
+
+
+def test_commit_to_a_missing_branch_is_an_error(fake_github):
+    res = commit_ops.commit_multiple_files("octo/demo", [{"path": "a.py", "content": "A"}], "nope", "msg")
+
+    assert res["status"] == "error"
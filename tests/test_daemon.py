@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from refactor_ai.daemon import client as daemon_client
+from refactor_ai.daemon import server as daemon_server
+from refactor_ai.enhancer.code_enhancer import code_enhancer
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.setattr(daemon_server, "STATE_FILE", tmp_path / "daemon.json")
+    monkeypatch.setattr(daemon_client, "STATE_FILE", tmp_path / "daemon.json")
+    server = daemon_server.create_server(port=0)
+    thread = threading.Thread(target=daemon_server.serve_forever, args=(server,), daemon=True)
+    thread.start()
+    yield server
+    server.stop()
+    thread.join(5)
+
+
+def _fake_run(release=None):
+    def process_repo(auto_commit, cancel, progress, **params):
+        progress({"event": "started", "run_id": "run-1"})
+        progress({"event": "planned", "total": 1})
+        code_enhancer.console.print(f"enhancing {params['repo_url']}")
+        if release is not None:
+            release.wait(5)
+        progress({"event": "file", "path": "a.py", "status": "changed", "done": 1})
+        progress({"event": "finished", "outcomes": {"changed": 1}, "failures": 0})
+    return process_repo
+
+
+def _wait_final(client, job_id):
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        job = client.job(job_id)
+        if job["state"] in daemon_server.FINAL_STATES:
+            return job
+        time.sleep(0.02)
+    raise AssertionError("job did not finish")
+
+
+def test_requests_need_the_token(daemon):
+    state = daemon_client.read_state()
+    assert daemon_client.connect() is not None
+
+    with pytest.raises(daemon_client.DaemonError, match="token"):
+        daemon_client.DaemonClient(dict(state, token="wrong")).health()
+
+
+def test_unauthorized_body_is_not_read_and_the_connection_closes(daemon):
+    conn = daemon_client.DaemonClient(daemon_client.read_state())._connection(5)
+    conn.request("POST", "/jobs", body=b'{"provider": "openai"}', headers={"Authorization": "Bearer wrong"})
+    response = conn.getresponse()
+
+    assert response.status == 401
+    assert response.will_close
+    conn.close()
+
+
+def test_job_runs_and_streams_its_output(daemon, monkeypatch):
+    monkeypatch.setattr(code_enhancer, "process_repo", _fake_run())
+    client = daemon_client.connect()
+
+    job = client.submit({"provider": "openai", "repo_url": "https://github.com/o/r"})
+    job = _wait_final(client, job["id"])
+    events = client.events(job["id"])["events"]
+
+    assert job["state"] == "succeeded"
+    assert (job["run_id"], job["done"], job["total"]) == ("run-1", 1, 1)
+    assert any(e["type"] == "log" and "enhancing https://github.com/o/r" in e["text"] for e in events)
+
+
+def test_invalid_jobs_are_rejected(daemon):
+    client = daemon_client.connect()
+
+    with pytest.raises(daemon_client.DaemonError, match="Unknown job field"):
+        client.submit({"provider": "openai", "repo_url": "x", "rm": "-rf"})
+    with pytest.raises(daemon_client.DaemonError, match="Invalid provider"):
+        client.submit({"provider": "nope", "repo_url": "x"})
+
+
+def test_queued_job_can_be_cancelled(daemon, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(code_enhancer, "process_repo", _fake_run(release))
+    client = daemon_client.connect()
+
+    first = client.submit({"provider": "openai", "repo_url": "one"})
+    second = client.submit({"provider": "openai", "repo_url": "two"})
+    cancelled = client.cancel(second["id"])
+    release.set()
+
+    assert cancelled["state"] == "cancelled"
+    assert _wait_final(client, first["id"])["state"] == "succeeded"
+
+
+def test_state_file_is_removed_on_shutdown(daemon):
+    daemon.stop()
+    deadline = time.time() + 5
+    while daemon_client.read_state() is not None and time.time() < deadline:
+        time.sleep(0.02)
+
+    assert daemon_client.read_state() is None
@@ -0,0 +1,66 @@
+from refactor_ai.enhancer.code_enhancer import dedupe
+
+
+def _write(root, files):
+    for path, text in files.items():
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(text)
+
+
+def test_identical_files_share_a_representative(tmp_path):
+    _write(tmp_path, {"a/util.py": "x = 1\n", "b/util.py": "x = 1\n", "c.py": "y = 2\n"})
+    reps, copies = dedupe.group_exact(["a/util.py", "b/util.py", "c.py"], str(tmp_path))
+
+    assert reps == ["a/util.py", "c.py"]
+    assert copies == {"a/util.py": ["b/util.py"]}
+
+
+def test_loader_blob_shas_are_used_without_reading(tmp_path):
+    shas = {"a.py": "1" * 40, "b.py": "1" * 40}
+    reps, copies = dedupe.group_exact(["a.py", "b.py"], str(tmp_path), shas)
+
+    assert reps == ["a.py"]
+    assert copies == {"a.py": ["b.py"]}
+
+
+def test_same_content_of_different_types_stays_apart(tmp_path):
+    _write(tmp_path, {"a.py": "", "b.py": "", "c.json": "", "d.PY": ""})
+    reps, copies = dedupe.group_exact(["a.py", "b.py", "c.json", "d.PY"], str(tmp_path))
+
+    assert reps == ["a.py", "c.json"]
+    assert copies == {"a.py": ["b.py", "d.PY"]}
+
+
+def test_git_blob_sha_matches_git():
+    assert dedupe.git_blob_sha(b"") == "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+
+
+def test_near_duplicates_group_by_name(tmp_path):
+    body = "".join(f"def f{i}(x):\n    return x + {i}\n\n" for i in range(20))
+    _write(tmp_path, {
+        "svc1/handler.py": body,
+        "svc2/handler.py": body.replace("x + 3", "x + 33"),
+        "svc3/other.py": body,
+    })
+    paths = ["svc1/handler.py", "svc2/handler.py", "svc3/other.py"]
+    reps, siblings = dedupe.group_near(paths, str(tmp_path))
+
+    assert reps == ["svc1/handler.py", "svc3/other.py"]
+    assert siblings == {"svc1/handler.py": ["svc2/handler.py"]}
+
+
+def test_transfer_edit_replays_on_sibling():
+    rep = "".join(f"v{i} = {i}\n" for i in range(10))
+    new = rep.replace("v1 = 1\n", "v1 = 1  # one\n")
+    sibling = rep.replace("v9 = 9", "v9 = 99")
+
+    assert dedupe.transfer_edit(rep, new, sibling) == sibling.replace("v1 = 1\n", "v1 = 1  # one\n")
+    assert dedupe.transfer_edit(rep, rep, sibling) == sibling
+
+
+def test_transfer_edit_refuses_differing_context():
+    rep = "a = 1\nb = 2\nc = 3\n"
+    new = "a = 1\nb = 20\nc = 3\n"
+
+    assert dedupe.transfer_edit(rep, new, "a = 1\nb = 9\nc = 3\n") is None
@@ -0,0 +1,59 @@
+import os
+
+from refactor_ai.configuration_manager.disk_cache import ResultCache
+
+
+def _key(i):
+    return f"{i:02x}" + "0" * 62
+
+
+def _entry(i):
+    return {"code": str(i) * 200}
+
+
+def test_get_returns_what_put_stored(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=10 ** 6)
+    cache.put(_key(1), _entry(1))
+
+    assert cache.get(_key(1)) == _entry(1)
+    assert cache.get(_key(2)) is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    entry_size = len('{"code": "' + "0" * 200 + '"}')
+    cache = ResultCache(tmp_path, max_bytes=entry_size * 5)
+
+    for i in range(5):
+        cache.put(_key(i), _entry(i))
+        os.utime(cache._path(_key(i)), (i, i))
+    # Reading entry 0 makes it the most recently used.
+    cache.get(_key(0))
+    cache.put(_key(5), _entry(5))
+
+    assert cache.stats["evictions"] >= 1
+    assert cache.get(_key(0)) is not None
+    assert cache.get(_key(1)) is None
+    assert cache._size == cache._scan_size() <= cache.max_bytes
+
+
+def test_disabled_and_refresh_modes(tmp_path):
+    off = ResultCache(tmp_path / "off", max_bytes=10 ** 6, enabled=False)
+    off.put(_key(1), _entry(1))
+    assert not (tmp_path / "off").exists()
+
+    refresh = ResultCache(tmp_path, max_bytes=10 ** 6, read=False)
+    refresh.put(_key(1), _entry(1))
+    assert refresh.get(_key(1)) is None
+    assert ResultCache(tmp_path, max_bytes=10 ** 6).get(_key(1)) == _entry(1)
+
+
+def test_overwriting_an_entry_keeps_the_size_exact(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=10 ** 6)
+
+    for _ in range(3):
+        cache.put(_key(1), _entry(1))
+    cache.put(_key(1), {"code": "short"})
+
+    assert cache._size == cache._scan_size()
+    assert cache.stats["evictions"] == 0
@@ -0,0 +1,68 @@
+import base64
+import os
+
+from refactor_ai.enhancer.code_enhancer.file_filter import FileFilter
+
+
+def _write(root, files):
+    for path, data in files.items():
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data if isinstance(data, bytes) else data.encode("utf-8"))
+
+
+def test_path_rules():
+    sniffer = FileFilter()
+
+    assert sniffer.classify_path("img/logo.PNG") == "binary"
+    assert sniffer.classify_path("yarn.lock") == "lockfile"
+    assert sniffer.classify_path("web/package-lock.json") == "lockfile"
+    assert sniffer.classify_path("node_modules/x/index.js") == "vendored"
+    assert sniffer.classify_path("api/service_pb2.py") == "generated"
+    assert sniffer.classify_path("src/app.py") is None
+
+
+def test_gitattributes_rules_follow_git_order():
+    attrs = "docs/** linguist-generated\ndocs/keep.md -linguist-generated\n*.js linguist-vendored\n"
+    sniffer = FileFilter(attrs)
+
+    assert sniffer.classify_path("docs/api.md") == "generated"
+    assert sniffer.classify_path("docs/keep.md") is None
+    assert sniffer.classify_path("deep/lib.js") == "vendored"
+
+
+def test_gitattributes_match_repo_paths_under_a_base_path():
+    sniffer = FileFilter("/pkg/gen/** linguist-generated", base_path="pkg")
+
+    assert sniffer.classify_path("gen/a.py") == "generated"
+    assert sniffer.classify_path("src/a.py") is None
+
+
+def test_content_rules(tmp_path):
+    blob = base64.b64encode(os.urandom(6000)).decode()
+    _write(tmp_path, {
+        "nul.dat.py": b"abc\0def",
+        "latin1.py": "caf\xe9 = 1\n".encode("latin-1") + b"x = 2\n" * 10,
+        "gen.py": "# Code generated by protoc. DO NOT EDIT.\nx = 1\n",
+        "bundle.js": "var a=1;" * 400,
+        "blob.py": "\n".join(blob[i:i + 76] for i in range(0, len(blob), 76)),
+        "ok.py": "def f():\n    return 1\n" * 100,
+    })
+    sniffer = FileFilter()
+    paths = ["nul.dat.py", "latin1.py", "gen.py", "bundle.js", "blob.py", "ok.py", "missing.py"]
+
+    kept, skipped = sniffer.partition(paths, str(tmp_path))
+
+    assert kept == ["ok.py"]
+    assert skipped == {
+        "binary": ["nul.dat.py", "latin1.py", "missing.py"],
+        "generated": ["gen.py"],
+        "minified": ["bundle.js"],
+        "data": ["blob.py"],
+    }
+
+
+def test_cut_multibyte_character_at_sniff_boundary_is_text():
+    data = ("é" * 100).encode("utf-8")[:-1]
+
+    assert FileFilter().classify_content(data) is None
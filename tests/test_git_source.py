@@ -0,0 +1,124 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import git_source
+
+
+def _git(cwd, *args, when=None):
+    env = dict(os.environ, GIT_AUTHOR_NAME="Dev", GIT_AUTHOR_EMAIL="dev@example.com",
+               GIT_COMMITTER_NAME="Dev", GIT_COMMITTER_EMAIL="dev@example.com")
+    if when is not None:
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = f"@{when} +0000"
+    return subprocess.run(["git", *args], cwd=cwd, env=env, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def _commit(repo, files, when):
+    for path, content in files.items():
+        (repo / path).parent.mkdir(parents=True, exist_ok=True)
+        (repo / path).write_text(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", f"change at {when}", when=when)
+
+
+@pytest.fixture
+def checkout(tmp_path):
+    repo = tmp_path / "checkout"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    _commit(repo, {"README.md": "# demo\n", "docs/guide.md": "Guide\n", "src/app.py": "print('v1')\n", "src/util.py": "X = 1\n"}, 1_000_000)
+    _commit(repo, {"src/app.py": "print('v2')\n"}, 2_000_000)
+    os.symlink("app.py", repo / "src" / "link.py")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "add a link", when=3_000_000)
+    return repo
+
+
+def _prepare(target, tmp_path, run_id="run1"):
+    metadata_path = tmp_path / f"{run_id}.json"
+    res = git_source.prepare(str(target), str(tmp_path / run_id), run_id, str(metadata_path))
+    assert res["status"] == "success", res["message"]
+    return res, json.loads(metadata_path.read_text())
+
+
+def test_sources_are_told_apart_from_github_urls(checkout):
+    assert git_source.is_git_source(str(checkout))
+    assert git_source.is_git_source("git@example.com:team/repo.git")
+    assert git_source.is_git_source("ssh://example.com/team/repo")
+    assert git_source.is_git_source("https://example.com/team/repo.git")
+    assert not git_source.is_git_source("https://github.com/team/repo")
+    assert git_source._split_subdir("file:///srv/repo.git//src/lib") == ("file:///srv/repo.git", "src/lib")
+    assert git_source._split_subdir("git@host:repo") == ("git@host:repo", "")
+
+
+def test_checkout_gets_its_own_worktree_and_branch(checkout, tmp_path):
+    res, metadata = _prepare(checkout / "src", tmp_path)
+
+    assert metadata["source_kind"] == "checkout"
+    assert metadata["base_path"] == "src"
+    assert metadata["branch"] == "refactor-ai/run1"
+    assert metadata["source_branch"] == "main"
+    # The symlink is tracked but is not a regular file.
+    assert sorted(metadata["downloaded_files"]) == ["app.py", "util.py"]
+    assert metadata["blob_shas"]["app.py"] == _git(checkout, "rev-parse", "HEAD:src/app.py")
+    assert res["data"]["local_path"] == os.path.join(tmp_path / "run1", "src")
+    # The user's own working tree stays on its branch.
+    assert _git(checkout, "rev-parse", "--abbrev-ref", "HEAD") == "main"
+
+
+def test_recently_changed_files_keeps_the_newest_time_per_path(checkout, tmp_path):
+    _, metadata = _prepare(checkout, tmp_path)
+
+    paths = git_source.recently_changed_files(metadata)["data"]["paths"]
+
+    assert paths["src/app.py"] == 2_000_000
+    assert paths["src/util.py"] == 1_000_000
+    assert paths["src/link.py"] == 3_000_000
+    assert git_source.recently_changed_files(metadata, max_commits=1)["data"]["paths"] == {"src/link.py": 3_000_000}
+
+
+def test_commits_stay_on_the_run_branch_after_cleanup(checkout, tmp_path):
+    _, metadata = _prepare(checkout, tmp_path)
+
+    res = git_source.commit_file(metadata, "src/util.py", "X = 2\n", "Enhance util.py")
+    assert res["status"] == "success", res["message"]
+    assert git_source.unpushed_commits(metadata) == 0
+
+    hint = git_source.cleanup(metadata)
+
+    assert "1 commit(s) on branch refactor-ai/run1" in hint
+    assert not os.path.exists(metadata["work_tree"])
+    assert _git(checkout, "show", "refactor-ai/run1:src/util.py") == "X = 2"
+    assert (checkout / "src" / "util.py").read_text() == "X = 1\n"
+
+
+def test_cleanup_drops_a_branch_without_commits(checkout, tmp_path):
+    _, metadata = _prepare(checkout, tmp_path)
+
+    assert git_source.cleanup(metadata) is None
+    assert _git(checkout, "branch", "--list", "refactor-ai/*") == ""
+
+
+def test_clone_pushes_the_run_branch_once(checkout, tmp_path):
+    _, metadata = _prepare(f"file://{checkout}", tmp_path)
+    assert metadata["source_kind"] == "clone"
+    assert metadata["repo_name"] == "checkout"
+
+    git_source.commit_file(metadata, "README.md", "# better demo\n", "Enhance README.md")
+    git_source.commit_file(metadata, "src/app.py", "print('v3')\n", "Enhance app.py")
+    assert git_source.unpushed_commits(metadata) == 2
+
+    assert git_source.push(metadata)["status"] == "success"
+    assert git_source.unpushed_commits(metadata) == 0
+    assert _git(checkout, "show", "refactor-ai/run1:src/app.py") == "print('v3')"
+
+
+def test_sparse_clone_only_checks_out_the_folder(checkout, tmp_path):
+    _, metadata = _prepare(f"file://{checkout}//src", tmp_path)
+
+    assert metadata["base_path"] == "src"
+    assert sorted(metadata["downloaded_files"]) == ["app.py", "util.py"]
+    assert not os.path.exists(os.path.join(metadata["work_tree"], "docs", "guide.md"))
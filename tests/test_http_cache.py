@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from refactor_ai.github_manager import http_cache, repo_files_loader
+
+URL = "https://github.com/octo/demo"
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """A fresh, not yet installed cache under tmp_path."""
+    monkeypatch.setattr(http_cache, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(http_cache, "_store", None)
+    monkeypatch.setattr(http_cache, "_sessions", {})
+    monkeypatch.setattr(http_cache, "stats", {"hits": 0, "misses": 0})
+    return tmp_path / "cache"
+
+
+def test_repeat_download_is_answered_with_304s(fake_github, cache_dir, tmp_path):
+    services, repo = fake_github
+
+    first = repo_files_loader.download_repo_content(URL, str(tmp_path / "one"), engine="contents")
+    fetched = services.counts["github"]
+    second = repo_files_loader.download_repo_content(URL, str(tmp_path / "two"), engine="contents")
+
+    assert first["status"] == second["status"] == "success"
+    assert services.counts["github 304"] > 0
+    assert http_cache.stats["hits"] == services.counts["github 304"]
+    assert http_cache.stats["misses"] == fetched
+    assert (tmp_path / "two/src/app.py").read_bytes() == repo.files["src/app.py"]
+    assert "% hit rate" in http_cache.summary()
+    assert any(cache_dir.rglob("*"))
+
+
+def test_zero_cache_mb_disables_the_cache(fake_github, cache_dir, tmp_path):
+    prefs = tmp_path / "preferences.json"
+    data = json.loads(prefs.read_text())
+    data.setdefault("github", {})["cache_mb"] = 0
+    prefs.write_text(json.dumps(data))
+
+    assert http_cache.install() is False
+    assert http_cache._store is None
+    assert http_cache.summary() is None
+
+
+def test_cache_key_depends_on_token_and_accept_header():
+    url = "https://api.github.com/repos/octo/demo"
+    base = http_cache._cache_key(url, {"Authorization": "token a"})
+
+    assert http_cache._cache_key(url, {"authorization": "token a"}) == base
+    assert http_cache._cache_key(url, {"Authorization": "token b"}) != base
+    assert http_cache._cache_key(url, {"Authorization": "token a", "Accept": "application/vnd.github.raw"}) != base
+    assert http_cache._cache_key(url + "/contents", {"Authorization": "token a"}) != base
+
+
+def test_cached_response_takes_fresh_headers_from_the_304():
+    entry = {
+        "status": 200,
+        "headers": {"ETag": '"abc"', "X-RateLimit-Remaining": "10", "Content-Type": "application/json"},
+        "body": '{"name": "demo"}',
+    }
+    fresh = {"X-RateLimit-Remaining": "9", "Content-Length": "0", "Date": "today"}
+
+    response = http_cache._CachedResponse(entry, fresh)
+
+    assert response.status == 200
+    assert response.headers["X-RateLimit-Remaining"] == "9"
+    assert response.headers["Date"] == "today"
+    assert "Content-Length" not in response.headers
+    assert response.read() == '{"name": "demo"}'
+    assert b"".join(response.iter_content(5)) == b'{"name": "demo"}'
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.import_budget import DEFAULT_BUDGET_MS, FORBIDDEN, parse_importtime
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def _import_main():
+    """Best of three `-X importtime` runs of `import refactor_ai.main`."""
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    best = None
+    for _ in range(3):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import refactor_ai.main"],
+            capture_output=True, text=True, env=env, cwd=REPO_ROOT, check=True,
+        )
+        total, modules = parse_importtime(proc.stderr)
+        if best is None or total < best[0]:
+            best = (total, modules)
+    return best
+
+
+def test_cli_import_skips_heavy_modules_and_fits_the_budget():
+    total, modules = _import_main()
+
+    loaded = [m for m in FORBIDDEN if m in modules]
+    assert loaded == [], f"CLI startup imports {loaded}"
+    assert total < DEFAULT_BUDGET_MS, f"CLI startup imports took {total:.0f} ms"
@@ -0,0 +1,128 @@
+import os
+import time
+
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import journal
+
+
+@pytest.fixture
+def runs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "RUNS_DIR", tmp_path)
+    return tmp_path
+
+
+def _result(path, status, code=None):
+    return {"path": path, "status": status, "code": code, "message": "msg" if code else None}
+
+
+def test_state_keeps_the_latest_record_per_file(runs_dir):
+    run = journal.open_journal()
+    run.append("start", repo_url="https://github.com/o/r")
+    run.append("downloaded", files=["a.py", "b.py", "c.py"])
+    run.record_result(_result("a.py", "changed", "new a"))
+    run.record_result(_result("b.py", "unchanged"))
+    run.append("committed", path="a.py", commit_sha="abc")
+    run.record_result(_result("c.py", "changed", "new c"))
+
+    state = journal.open_journal(run.run_id).state()
+
+    assert state["start"]["repo_url"] == "https://github.com/o/r"
+    assert state["download"]["files"] == ["a.py", "b.py", "c.py"]
+    assert state["files"]["a.py"]["status"] == "committed"
+    assert state["files"]["a.py"]["code"] == "new a"
+    assert state["files"]["b.py"]["status"] in journal.DONE_STATES
+    assert state["files"]["c.py"]["status"] in journal.REPLAY_STATES
+    assert state["files"]["c.py"]["code"] == "new c"
+    assert not state["finished"]
+
+
+def test_torn_last_line_is_ignored(runs_dir):
+    run = journal.open_journal()
+    run.record_result(_result("a.py", "unchanged"))
+    with open(run.path, "a", encoding="utf-8") as f:
+        f.write('{"event": "enhanced", "path": "b.p')
+
+    assert [e["path"] for e in run.events()] == ["a.py"]
+
+
+def test_finish_drops_the_working_copy(runs_dir):
+    run = journal.open_journal()
+    run.files_dir.mkdir(parents=True)
+    (run.files_dir / "a.py").write_text("x = 1\n")
+
+    run.finish()
+
+    assert not run.files_dir.exists()
+    assert run.state()["finished"]
+
+
+def test_missing_journal_is_empty(runs_dir):
+    run = journal.open_journal("20240101-000000-abcdef")
+
+    assert not run.exists
+    assert run.events() == []
+
+
+def _saved_run(days_old, *events):
+    run = journal.open_journal()
+    run.append("start", repo_url="https://github.com/o/r")
+    for event in events:
+        run.append(event)
+    run.files_dir.mkdir(parents=True)
+    (run.files_dir / "a.py").write_text("x = 1\n")
+    when = time.time() - days_old * 86400
+    os.utime(run.path, (when, when))
+    return run
+
+
+def test_prune_removes_runs_past_the_age_limit(runs_dir):
+    old = _saved_run(30, "downloaded")
+    recent = _saved_run(2, "downloaded")
+
+    pruned = journal.prune_runs(keep_days=14, keep_last=20)
+
+    assert pruned == {"removed": [old.run_id], "trimmed": []}
+    assert not old.dir.exists()
+    assert recent.files_dir.exists()
+
+
+def test_prune_keeps_only_the_newest_runs(runs_dir):
+    runs = [_saved_run(days, "downloaded") for days in (1, 2, 3, 4)]
+
+    pruned = journal.prune_runs(keep_days=14, keep_last=2)
+
+    assert sorted(pruned["removed"]) == sorted(r.run_id for r in runs[2:])
+    assert [r.run_id for r in journal.list_runs()] == [r.run_id for r in runs[:2]]
+
+
+def test_prune_trims_working_copies_nothing_will_resume(runs_dir):
+    finished = _saved_run(1, "downloaded", "finished")
+    never_downloaded = _saved_run(1)
+    pending = _saved_run(1, "downloaded")
+
+    pruned = journal.prune_runs(keep_days=14, keep_last=20)
+
+    assert sorted(pruned["trimmed"]) == sorted([finished.run_id, never_downloaded.run_id])
+    assert not finished.files_dir.exists() and finished.exists
+    assert not never_downloaded.files_dir.exists()
+    assert pending.files_dir.exists()
+
+
+def test_prune_skips_active_and_excluded_runs(runs_dir):
+    active = _saved_run(0, "finished")
+    excluded = _saved_run(30)
+
+    pruned = journal.prune_runs(keep_days=1, keep_last=0, exclude={excluded.run_id})
+
+    assert pruned == {"removed": [], "trimmed": []}
+    assert active.files_dir.exists()
+    assert excluded.files_dir.exists()
+
+
+def test_prune_limits_come_from_preferences(runs_dir, monkeypatch):
+    prefs = {"keep_days": "1", "keep_last": "20"}
+    monkeypatch.setattr(journal.secrets_manager, "get_preference", lambda section, key: prefs.get(key))
+    old = _saved_run(3, "downloaded")
+
+    assert journal.prune_runs()["removed"] == [old.run_id]
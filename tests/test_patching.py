@@ -0,0 +1,129 @@
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import patching
+
+ORIGINAL = """def add(a, b):
+    return a + b
+
+
+def sub(a, b):
+    return a - b
+"""
+
+
+def test_edit_blocks_replace_in_order():
+    payload = """<<<<<<< SEARCH
+def add(a, b):
+    return a + b
+=======
+def add(a, b):
+    \"\"\"Sum of a and b.\"\"\"
+    return a + b
+>>>>>>> REPLACE
+<<<<<<< SEARCH
+    return a - b
+=======
+    return a - b  # difference
+>>>>>>> REPLACE
+"""
+    result = patching.apply_edit_blocks(ORIGINAL, payload)
+
+    assert '"""Sum of a and b."""' in result
+    assert "return a - b  # difference" in result
+    assert result.endswith("\n")
+
+
+def test_edit_blocks_tolerate_whitespace_drift():
+    payload = """<<<<<<< SEARCH
+def add(a, b):
+  return a + b
+=======
+def add(a, b):
+    return b + a
+>>>>>>> REPLACE
+"""
+    assert "return b + a" in patching.apply_edit_blocks(ORIGINAL, payload)
+
+
+def test_edit_block_not_found_raises():
+    payload = """<<<<<<< SEARCH
+def mul(a, b):
+=======
+def mul(x, y):
+>>>>>>> REPLACE
+"""
+    with pytest.raises(patching.PatchError):
+        patching.apply_edit_blocks(ORIGINAL, payload)
+
+
+def test_unterminated_edit_block_raises():
+    with pytest.raises(patching.PatchError):
+        patching.parse_edit_blocks("<<<<<<< SEARCH\nx\n=======\ny\n")
+
+
+def test_unified_diff_applies_by_context():
+    diff = """--- a/m.py
++++ b/m.py
+@@ -4,2 +4,3 @@
+ 
+ def sub(a, b):
++    \"\"\"Difference of a and b.\"\"\"
+     return a - b
+"""
+    result = patching.apply_unified_diff(ORIGINAL, diff)
+
+    assert result.splitlines()[5] == '    """Difference of a and b."""'
+
+
+def test_unified_diff_exact_only_rejects_drifted_context():
+    diff = """@@ -1,2 +1,2 @@
+ def add(a, b):
+-  return a + b
++    return b + a
+"""
+    with pytest.raises(patching.PatchError):
+        patching.apply_unified_diff(ORIGINAL, diff, exact_only=True)
+
+
+def test_unified_diff_keeps_dash_and_plus_lines_inside_hunks():
+    original = "a = 1\n-- old note\nb = 2\n"
+    diff = """--- a/q.sql
++++ b/q.sql
+@@ -1,3 +1,3 @@
+ a = 1
+--- old note
++++ new note
+ b = 2
+"""
+    assert patching.parse_unified_diff(diff) == [(0, ["a = 1", "-- old note", "b = 2"], ["a = 1", "++ new note", "b = 2"])]
+    assert patching.apply_unified_diff(original, diff) == "a = 1\n++ new note\nb = 2\n"
+
+
+def test_unified_diff_skips_file_headers_between_hunks():
+    # The first hunk undercounts its lines, as model-written diffs often do.
+    diff = """--- a/m.py
++++ b/m.py
+@@ -1,1 +1,1 @@
+ def add(a, b):
+-    return a + b
++    return b + a
+--- a/m.py
++++ b/m.py
+@@ -5 +5 @@
+-    return a - b
++    return -(b - a)
+"""
+    hunks = patching.parse_unified_diff(diff)
+
+    assert [h[1] for h in hunks] == [["def add(a, b):", "    return a + b"], ["    return a - b"]]
+    assert [h[2] for h in hunks] == [["def add(a, b):", "    return b + a"], ["    return -(b - a)"]]
+
+
+def test_apply_response_accepts_either_format():
+    blocks = "<<<<<<< SEARCH\n    return a + b\n=======\n    return b + a\n>>>>>>> REPLACE\n"
+    diff = "@@ -2 +2 @@\n-    return a + b\n+    return b + a\n"
+
+    assert patching.apply_response(ORIGINAL, blocks, "diff") == patching.apply_response(ORIGINAL, diff, "edits")
+    assert patching.apply_response(ORIGINAL, "  ", "edits") == ORIGINAL
+    with pytest.raises(patching.PatchError):
+        patching.apply_response(ORIGINAL, "no edits here", "edits")
@@ -0,0 +1,66 @@
+import pytest
+
+from refactor_ai.configuration_manager import secrets_manager
+from refactor_ai.enhancer.code_enhancer import provider_clients
+
+
+class FakeAdapter(provider_clients.ProviderAdapter):
+    name = "fake"
+
+    def __init__(self, api_key, base_url=None):
+        super().__init__(api_key, base_url)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    current = {"key": "k1", "base_url": None}
+    monkeypatch.setattr(provider_clients, "_adapters", {})
+    monkeypatch.setattr(secrets_manager, "get_key", lambda provider: current["key"])
+    monkeypatch.setattr(secrets_manager, "get_preference", lambda provider, key: current.get(key))
+    return current
+
+
+def test_refresh_keeps_adapters_whose_settings_did_not_change(settings):
+    adapter = FakeAdapter("k1")
+    provider_clients._adapters["fake"] = adapter
+
+    provider_clients.refresh_adapters()
+
+    assert provider_clients._adapters["fake"] is adapter
+    assert not adapter.closed
+
+
+@pytest.mark.parametrize("changed", [{"key": "k2"}, {"base_url": "http://localhost:1"}])
+def test_refresh_drops_adapters_with_a_new_key_or_base_url(settings, changed):
+    adapter = FakeAdapter("k1")
+    provider_clients._adapters["fake"] = adapter
+    settings.update(changed)
+
+    provider_clients.refresh_adapters()
+
+    assert "fake" not in provider_clients._adapters
+    assert adapter.closed
+
+
+@pytest.mark.parametrize("provider, model, limit", [
+    ("anthropic", None, 4096),
+    ("anthropic", "claude-3-haiku-20240307", 4096),
+    ("anthropic", "claude-3-5-sonnet-20240620", 4096),
+    ("anthropic", "claude-3-5-sonnet-20241022", 8192),
+    ("anthropic", "claude-3-5-haiku-latest", 8192),
+    ("openai", "gpt-4o", 16384),
+    ("openai", "gpt-4o-2024-05-13", 4096),
+    ("google", None, 8192),
+])
+def test_output_limit_is_keyed_by_model(settings, provider, model, limit):
+    assert provider_clients.output_limit(provider, model) == limit
+
+
+def test_output_limit_preference_wins(settings):
+    settings["max_output_tokens"] = "2000"
+
+    assert provider_clients.output_limit("anthropic", "claude-3-5-sonnet-20241022") == 2000
@@ -0,0 +1,173 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from refactor_ai.github_manager import repo_files_loader
+
+URL = "https://github.com/octo/demo"
+
+
+def _metadata(res):
+    with open(res["data"]["metadata"], "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _local_files(root):
+    return sorted(
+        str(p.relative_to(root)) for p in root.rglob("*")
+        if p.is_file() and p.name != "repo_metadata.json"
+    )
+
+
+def test_archive_engine_downloads_everything_in_one_request(fake_github, tmp_path):
+    services, repo = fake_github
+    out = tmp_path / "out"
+
+    res = repo_files_loader.download_repo_content(URL, str(out), engine="archive")
+    meta = _metadata(res)
+
+    assert res["status"] == "success", res["message"]
+    assert res["data"]["engine"] == "archive"
+    assert services.counts["codeload"] == 1
+    assert _local_files(out) == sorted(repo.files)
+    assert (out / "src/app.py").read_bytes() == repo.files["src/app.py"]
+    assert meta["blob_shas"] == repo.shas
+    assert meta["commit_sha"] == repo.head
+    assert meta["gitattributes"] == "docs/** linguist-generated\n"
+
+
+def test_archive_engine_extracts_only_the_requested_folder(fake_github, tmp_path):
+    _, repo = fake_github
+    out = tmp_path / "out"
+
+    res = repo_files_loader.download_repo_content(
+        URL + "/tree/main/src", str(out), engine="archive", metadata_scope="all"
+    )
+    meta = _metadata(res)
+
+    assert _local_files(out) == ["app.py", "lib/copy.py", "lib/util.py"]
+    assert meta["blob_shas"]["lib/util.py"] == repo.shas["src/lib/util.py"]
+    # The metadata tree still describes the whole repository.
+    assert sorted(meta["repo_all_files"]) == sorted(repo.files)
+
+
+@pytest.mark.parametrize("engine", ["contents", "archive", "tree"])
+def test_engines_produce_the_same_files(fake_github, tmp_path, engine):
+    _, repo = fake_github
+    out = tmp_path / engine
+
+    res = repo_files_loader.download_repo_content(URL, str(out), engine=engine)
+
+    assert res["data"]["engine"] == engine
+    assert _local_files(out) == sorted(repo.files)
+    assert _metadata(res)["blob_shas"] == repo.shas
+
+
+def test_broken_archive_falls_back_to_the_contents_api(fake_github, tmp_path, monkeypatch):
+    _, repo = fake_github
+
+    def broken(*args, **kwargs):
+        raise OSError("truncated archive")
+
+    monkeypatch.setattr(repo_files_loader, "_download_archive", broken)
+    res = repo_files_loader.download_repo_content(URL, str(tmp_path / "out"), engine="archive")
+
+    assert res["status"] == "success"
+    assert res["data"]["engine"] == "contents"
+    assert "truncated archive" in res["data"]["fallback"]
+    assert _local_files(tmp_path / "out") == sorted(repo.files)
+
+
+def test_tree_engine_fetches_only_wanted_blobs(fake_github, tmp_path):
+    services, repo = fake_github
+    out = tmp_path / "out"
+
+    res = repo_files_loader.download_repo_content(
+        URL, str(out), engine="tree", include=["src/**", "*.md"], max_file_size=12,
+    )
+
+    assert res["data"]["engine"] == "tree"
+    # docs/guide.md (17 bytes) and src/app.py (39 bytes) are over the size limit.
+    assert _local_files(out) == ["README.md", "src/lib/copy.py", "src/lib/util.py"]
+    assert res["data"]["skipped"] == 3
+    assert services.counts["codeload"] == 0
+
+
+def test_tree_engine_downloads_a_folder_or_a_single_file(fake_github, tmp_path):
+    _, repo = fake_github
+
+    folder = repo_files_loader.download_repo_content(URL + "/tree/main/src/lib", str(tmp_path / "lib"), engine="tree")
+    single = repo_files_loader.download_repo_content(URL + "/blob/main/src/app.py", str(tmp_path / "one"), engine="tree")
+
+    assert _local_files(tmp_path / "lib") == ["copy.py", "util.py"]
+    assert _metadata(folder)["blob_shas"] == {"copy.py": repo.shas["src/lib/copy.py"], "util.py": repo.shas["src/lib/util.py"]}
+    assert _local_files(tmp_path / "one") == ["app.py"]
+    assert _metadata(single)["downloaded_files"] == ["app.py"]
+
+
+def test_truncated_tree_falls_back_to_the_contents_api(fake_github, tmp_path, monkeypatch):
+    _, repo = fake_github
+
+    def truncated(*args, **kwargs):
+        raise ValueError("the tree listing was truncated")
+
+    monkeypatch.setattr(repo_files_loader, "_list_subtree", truncated)
+    res = repo_files_loader.download_repo_content(URL, str(tmp_path / "out"), engine="tree")
+
+    assert res["data"]["engine"] == "contents"
+    assert "truncated" in res["data"]["fallback"]
+    assert _local_files(tmp_path / "out") == sorted(repo.files)
+
+
+def test_incremental_download_fetches_only_changed_files(fake_github, tmp_path, monkeypatch):
+    services, repo = fake_github
+    monkeypatch.setattr(
+        repo_files_loader, "_changed_paths",
+        lambda gh_repo, base, head: ["src/app.py", "README.md"] if head == repo.head else [],
+    )
+
+    res = repo_files_loader.download_repo_content(URL, str(tmp_path / "out"), changed_since="0" * 40)
+    meta = _metadata(res)
+
+    assert res["data"]["engine"] == "tree"
+    assert _local_files(tmp_path / "out") == ["README.md", "src/app.py"]
+    assert meta["commit_sha"] == repo.head
+    assert meta["changed_since"] == "0" * 40
+    assert sorted(meta["repo_all_files"]) == sorted(repo.files)
+    assert services.counts["codeload"] == 0
+
+
+class _CompareRepo:
+    """Compare and tree answers for _changed_paths, without a server."""
+
+    def __init__(self, files, trees, status="ahead"):
+        self.files, self.trees, self.status = files, trees, status
+
+    def compare(self, base, head):
+        return SimpleNamespace(status=self.status, files=self.files)
+
+    def get_git_tree(self, sha, recursive):
+        return SimpleNamespace(tree=[
+            SimpleNamespace(path=path, sha=blob, type="blob") for path, blob in self.trees[sha].items()
+        ])
+
+
+def test_changed_paths_skip_removed_files_and_diff_trees_past_the_limit():
+    small = _CompareRepo([SimpleNamespace(filename="a.py", status="modified"),
+                          SimpleNamespace(filename="b.py", status="removed")], {})
+    assert repo_files_loader._changed_paths(small, "base", "head") == ["a.py"]
+
+    listed = [SimpleNamespace(filename=f"f{i}", status="added") for i in range(repo_files_loader.COMPARE_FILE_LIMIT)]
+    trees = {"base": {"same.py": "1", "edited.py": "2"}, "head": {"same.py": "1", "edited.py": "3", "new.py": "4"}}
+    assert repo_files_loader._changed_paths(_CompareRepo(listed, trees), "base", "head") == ["edited.py", "new.py"]
+
+    with pytest.raises(ValueError):
+        repo_files_loader._changed_paths(_CompareRepo([], {}, status="diverged"), "base", "head")
+
+
+def test_unknown_engine_is_an_error(fake_github, tmp_path):
+    res = repo_files_loader.download_repo_content(URL, str(tmp_path), engine="rsync")
+
+    assert res["status"] == "error"
+    assert "Unknown download engine" in res["message"]
@@ -0,0 +1,17 @@
+from refactor_ai.enhancer.code_enhancer import result_cache
+
+
+def test_key_changes_with_every_input():
+    base = ("openai", "gpt-4o", "enhance", "p" * 64, "f" * 64)
+    key = result_cache.make_key(*base)
+
+    assert key == result_cache.make_key(*base)
+    for i in range(len(base)):
+        changed = list(base)
+        changed[i] = "other"
+        assert result_cache.make_key(*changed) != key
+
+
+def test_content_hash_depends_on_the_text():
+    assert result_cache.content_hash("a") == result_cache.content_hash("a")
+    assert result_cache.content_hash("a") != result_cache.content_hash("b")
@@ -0,0 +1,93 @@
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import scheduler
+from refactor_ai.enhancer.code_enhancer.scheduler import AdaptiveLimiter, ProviderScheduler
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def test_limiter_halves_on_throttle_and_grows_additively():
+    limiter = AdaptiveLimiter(8)
+
+    limiter.acquire()
+    limiter.release(throttled=True, success=False)
+    assert limiter.limit == 4
+
+    # About one extra slot per window of `limit` successes.
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release()
+    assert 5 <= limiter.limit < 5.5
+
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release()
+    assert limiter.limit == 8
+
+
+def test_limiter_never_drops_below_one():
+    limiter = AdaptiveLimiter(2)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(throttled=True, success=False)
+    assert limiter.limit == 1
+
+
+def test_plain_failures_do_not_change_the_limit():
+    limiter = AdaptiveLimiter(4)
+    limiter.acquire()
+    limiter.release(success=False)
+    assert limiter.limit == 4
+
+
+def test_throttle_info_reads_retry_after():
+    class Response:
+        headers = {"retry-after-ms": "1500"}
+
+    error = RateLimitError()
+    error.response = Response()
+
+    assert scheduler.throttle_info(error) == (True, 1.5)
+    assert scheduler.throttle_info(ValueError("boom")) == (False, None)
+
+
+def test_scheduler_retries_throttled_calls(monkeypatch):
+    monkeypatch.setattr(scheduler, "backoff_delay", lambda attempt: 0.0)
+    sched = ProviderScheduler(4)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitError()
+        return "ok"
+
+    assert sched.call(flaky) == "ok"
+    assert sched.stats["throttled"] == 2
+    assert sched.limiter.limit < 4
+
+
+def test_scheduler_raises_other_errors_at_once():
+    sched = ProviderScheduler(2)
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        sched.call(broken)
+    assert sched.stats["requests"] == 1
+
+
+def test_registry_shares_one_scheduler_per_model():
+    first = scheduler.get_scheduler("test", "m", 4, rpm=60)
+
+    assert scheduler.get_scheduler("test", "m", 4, rpm=60) is first
+    assert scheduler.get_scheduler("test", "other", 4, rpm=60) is not first
+
+
+def test_registry_replaces_scheduler_when_limits_change():
+    first = scheduler.get_scheduler("test", "limits", 4, rpm=60)
+
+    assert scheduler.get_scheduler("test", "limits", 8, rpm=60) is not first
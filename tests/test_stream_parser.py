@@ -0,0 +1,70 @@
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import stream_parser
+from refactor_ai.enhancer.code_enhancer.stream_parser import (
+    CODE_END,
+    CODE_START,
+    COMMIT_MESSAGE,
+    MalformedResponseError,
+    StreamingTagParser,
+)
+
+RESPONSE = f"{CODE_START}\nprint('hi')\n{CODE_END}\n{COMMIT_MESSAGE}\nSay hi\n"
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(RESPONSE)])
+def test_tags_found_across_chunk_boundaries(size):
+    parser = StreamingTagParser()
+    for chunk in _chunks(RESPONSE, size):
+        parser.feed(chunk)
+
+    assert parser.text == RESPONSE
+    assert parser.code_closed
+    for tag in (CODE_START, CODE_END, COMMIT_MESSAGE):
+        assert parser.positions[tag] == RESPONSE.index(tag)
+
+
+def test_tags_only_match_in_protocol_order():
+    parser = StreamingTagParser()
+    parser.feed(f"{CODE_END} {CODE_START} body")
+
+    assert parser.positions[CODE_START] == len(CODE_END) + 1
+    assert parser.positions[CODE_END] is None
+
+
+def test_long_preamble_stops_the_stream_early():
+    parser = StreamingTagParser(max_preamble=10)
+    with pytest.raises(MalformedResponseError):
+        parser.feed("x" * 11)
+
+
+def test_consume_stream_returns_text_and_stats():
+    text, stats = stream_parser.consume_stream(iter(_chunks(RESPONSE, 4)))
+
+    assert text == RESPONSE
+    assert stats["chars"] == len(RESPONSE)
+    assert stats["ttft"] <= stats["seconds"]
+
+
+def test_consume_stream_closes_abandoned_generator():
+    closed = []
+
+    def gen():
+        try:
+            yield "preamble " * 10
+            yield CODE_START
+        finally:
+            closed.append(True)
+
+    with pytest.raises(MalformedResponseError):
+        stream_parser.consume_stream(gen(), max_preamble=20)
+    assert closed == [True]
+
+
+def test_consume_stream_without_code_raises():
+    with pytest.raises(MalformedResponseError):
+        stream_parser.consume_stream(["just text"])
@@ -0,0 +1,79 @@
+import pytest
+
+from refactor_ai.enhancer.code_enhancer import validation
+
+ORIGINAL = """
+def public(a, b=1, *, c):
+    return a
+
+
+def _private(x):
+    return x
+
+
+class Service:
+    def __init__(self, client):
+        self.client = client
+
+    def run(self, job, **options):
+        return job
+"""
+
+
+def test_documented_python_passes():
+    new = ORIGINAL.replace("    return a\n", '    """Returns a."""\n    return a\n', 1)
+
+    assert validation.validate("m.py", ORIGINAL, new) is None
+
+
+def test_syntax_errors_are_reported():
+    error = validation.validate("m.py", ORIGINAL, ORIGINAL + "\ndef broken(:\n")
+
+    assert error.startswith("SyntaxError")
+
+
+@pytest.mark.parametrize("old, new, message", [
+    ("def public(a, b=1, *, c):", "def public(a, b, *, c):", "Signature of 'public'"),
+    ("def public(a, b=1, *, c):", "def public_api(a, b=1, *, c):", "'public' was removed"),
+    ("def run(self, job, **options):", "def run(self, job):", "Signature of 'Service.run'"),
+    ("def __init__(self, client):", "def __init__(self, client, retries):", "Service.__init__"),
+])
+def test_public_signature_changes_are_rejected(old, new, message):
+    error = validation.validate("m.py", ORIGINAL, ORIGINAL.replace(old, new))
+
+    assert message in error
+
+
+def test_private_and_annotation_changes_are_allowed():
+    new = ORIGINAL.replace("def _private(x):", "def _private(x, y=2):")
+    new = new.replace("def public(a, b=1, *, c):", "def public(a: int, b: int = 1, *, c: str) -> int:")
+
+    assert validation.validate("m.py", ORIGINAL, new) is None
+
+
+def test_data_files_must_parse():
+    assert validation.validate("a.json", "{}", '{"a": 1}') is None
+    assert validation.validate("a.json", "{}", "{'a': 1}").startswith("Invalid JSON")
+    assert validation.validate("notes.txt", "", "anything {") is None
+
+
+@pytest.mark.skipif(validation.tomllib is None, reason="no TOML parser")
+def test_toml_must_parse():
+    assert validation.validate("p.toml", "", "[tool]\nx = 1\n") is None
+    assert validation.validate("p.toml", "", "[tool\n").startswith("Invalid TOML")
+
+
+def test_validator_pool_matches_in_process_checks():
+    validator = validation.Validator(max_workers=1)
+    try:
+        assert validator.check("m.py", ORIGINAL, ORIGINAL) is None
+        assert validator.check("m.py", ORIGINAL, "def (") is not None
+    finally:
+        validator.close()
+
+
+def test_validator_falls_back_when_the_pool_is_broken():
+    validator = validation.Validator()
+    validator._broken = True
+
+    assert validator.check("a.json", "{}", "[") is not None